@@ -74,10 +74,10 @@ const commands = {
     'compliance': path.join(baseDir, 'compliance.sh'),
     'lint':       path.join(baseDir, 'tools', 'hook-lint.sh'),
     'route':      path.join(baseDir, 'tools', 'task-router.sh'),
-    'bind-context': path.join(baseDir, 'tools', 'task-memory-binding.sh'),
+    'bind-context': path.join(baseDir, 'tools', 'task-memory-binding.py'),
     'validate-context': path.join(baseDir, 'tools', 'validate-shared-context.sh'),
     'swarm':      path.join(baseDir, 'tools', 'swarm-dispatch.sh'),
-    'swarm-lock': path.join(baseDir, 'tools', 'swarm-lock.sh'),
+    'swarm-lock': path.join(baseDir, 'tools', 'swarm-lock.py'),
     'permit':     path.join(baseDir, 'tools', 'permit.sh'),
     'generate-rules': path.join(baseDir, 'tools', 'generate-rules.sh'),
     'shared-context-merge': path.join(baseDir, 'tools', 'shared-context-merge.sh'),
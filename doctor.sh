@@ -515,7 +515,7 @@ else
     check "INFO" "No T3-summary.md" "Run 'python3 tools/generate-t3-summaries.py' to map codebase."
 fi
 
-if [ -f "$TARGET_ABS/.bestai/vector-store.json" ] || [ -d "$TARGET_ABS/.bestai/chroma" ]; then
+if [ -f "$TARGET_ABS/.bestai/vector-store/meta.json" ] || [ -f "$TARGET_ABS/.bestai/vector-store.json" ] || [ -d "$TARGET_ABS/.bestai/chroma" ]; then
     check "OK" "RAG Vector Store detected"
 else
     check "INFO" "No Vector Store (RAG) found" "Run 'python3 tools/vectorize-codebase.py' if using semantic memory."
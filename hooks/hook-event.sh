@@ -13,6 +13,9 @@
 # Env vars:
 #   BESTAI_EVENT_LOG — override log path (default: ~/.cache/bestai/events.jsonl)
 #   BESTAI_EVENT_LOG_DISABLED=1 — disable event logging entirely
+#   BESTAI_EVENT_AGENT — ingest agent path prefix (default: ${XDG_RUNTIME_DIR:-/tmp}/bestai-events-$UID);
+#       while tools/event-ingest.py serves <prefix>.fifo, events are handed to it with a single
+#       time-bounded printf and written in batches, otherwise they are appended directly
 
 # Guard against double-sourcing
 [ "${_BESTAI_HOOK_EVENT_LOADED:-0}" = "1" ] && return 0
@@ -31,10 +34,14 @@ _bestai_project_hash() {
     fi
 }
 
-_BESTAI_PROJECT_HASH=$(_bestai_project_hash)
+# Computed on first direct append; the ingest agent hashes (and caches) project dirs itself.
+_BESTAI_PROJECT_HASH=""
 
 # Timestamp at source-time for latency measurement (nanoseconds if available, seconds otherwise)
-if date +%s%N >/dev/null 2>&1 && [ "$(date +%s%N)" != "%N" ]; then
+if [ -n "${EPOCHREALTIME:-}" ]; then
+    _BESTAI_START_NS="${EPOCHREALTIME//[!0-9]/}000"
+    _BESTAI_HAS_NS=1
+elif date +%s%N >/dev/null 2>&1 && [ "$(date +%s%N)" != "%N" ]; then
     _BESTAI_START_NS=$(date +%s%N)
     _BESTAI_HAS_NS=1
 else
@@ -44,7 +51,10 @@ fi
 
 # Returns elapsed milliseconds since hook-event.sh was sourced.
 _bestai_elapsed_ms() {
-    if [ "$_BESTAI_HAS_NS" = "1" ]; then
+    if [ -n "${EPOCHREALTIME:-}" ] && [ "$_BESTAI_HAS_NS" = "1" ]; then
+        local now_ns="${EPOCHREALTIME//[!0-9]/}000"
+        echo $(( (10#$now_ns - 10#$_BESTAI_START_NS) / 1000000 ))
+    elif [ "$_BESTAI_HAS_NS" = "1" ]; then
         local now_ns
         now_ns=$(date +%s%N)
         echo $(( (now_ns - _BESTAI_START_NS) / 1000000 ))
@@ -62,10 +72,28 @@ else
     _BESTAI_EVENT_DIR="${BESTAI_EVENT_LOG%/*}"
 fi
 
-# Resolve the tool name from hook input if available.
-# Callers may set _BESTAI_TOOL_NAME before sourcing or calling emit_event.
-_bestai_resolve_tool() {
-    echo "${_BESTAI_TOOL_NAME:-unknown}"
+_BESTAI_EVENT_AGENT="${BESTAI_EVENT_AGENT:-${XDG_RUNTIME_DIR:-/tmp}/bestai-events-${UID:-$(id -u)}}"
+
+# _bestai_send_to_agent TS HOOK ACTION TOOL ELAPSED_MS DETAIL
+# Hands one event to the ingest agent; fails (caller appends directly) when no agent
+# is serving or the event cannot travel as one atomic FIFO write.
+_bestai_send_to_agent() {
+    local fifo="$_BESTAI_EVENT_AGENT.fifo" pid msg LC_ALL=C
+    [ -p "$fifo" ] && [[ "$BESTAI_EVENT_LOG" == /* ]] || return 1
+    read -r pid < "$_BESTAI_EVENT_AGENT.pid" 2>/dev/null || return 1
+    kill -0 "$pid" 2>/dev/null || return 1
+    # The agent derives project hashes with md5; elsewhere the shell fallback differs.
+    command -v md5sum >/dev/null 2>&1 || command -v md5 >/dev/null 2>&1 || return 1
+    case "$*$BESTAI_EVENT_LOG${CLAUDE_PROJECT_DIR:-.}" in *$'\n'*|*$'\t'*) return 1 ;; esac
+    printf -v msg 'E1\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\n' \
+        "$BESTAI_EVENT_LOG" "$1" "$2" "$3" "$4" "$5" "${CLAUDE_PROJECT_DIR:-.}" "$6"
+    # Writes up to PIPE_BUF (4 KiB on Linux, 512 bytes by POSIX) never interleave.
+    [ "${#msg}" -le 4000 ] || return 1
+    # Read-write open of a FIFO never blocks, even if the agent exits meanwhile, but the
+    # write does once a stalled agent lets the pipe fill up. Bound it: such a write is
+    # all-or-nothing, so a killed one left nothing behind and the caller appends directly.
+    command -v timeout >/dev/null 2>&1 || return 1
+    timeout 0.2 printf '%s' "$msg" 1<>"$fifo" 2>/dev/null
 }
 
 # emit_event HOOK_NAME ACTION [DETAIL_JSON]
@@ -80,11 +108,16 @@ emit_event() {
     local detail="${3:-{\}}"
     local ts tool elapsed_ms
 
-    ts=$(date -u +"%Y-%m-%dT%H:%M:%SZ")
-    tool=$(_bestai_resolve_tool)
+    if ! TZ=UTC printf -v ts '%(%Y-%m-%dT%H:%M:%SZ)T' -1 2>/dev/null; then
+        ts=$(date -u +"%Y-%m-%dT%H:%M:%SZ")
+    fi
+    tool="${_BESTAI_TOOL_NAME:-unknown}"
     elapsed_ms=$(_bestai_elapsed_ms)
 
+    _bestai_send_to_agent "$ts" "$hook" "$action" "$tool" "$elapsed_ms" "$detail" && return 0
+
     mkdir -p "$_BESTAI_EVENT_DIR" 2>/dev/null || return 0
+    [ -n "$_BESTAI_PROJECT_HASH" ] || _BESTAI_PROJECT_HASH=$(_bestai_project_hash)
 
     if command -v jq >/dev/null 2>&1; then
         jq -cn \
@@ -106,10 +139,20 @@ emit_event() {
 
 # Convenience: rotate event log when it exceeds MAX_EVENTS lines.
 # Call from Stop hooks or periodically.
+# With tools/event-store.py available the live log is sealed into compressed
+# segments (<log>.segments/) and rolled up by a background compactor;
+# otherwise the oldest 20% is moved to <log>-archive.jsonl.
 rotate_event_log() {
     local max_events="${1:-5000}"
     [ ! -f "$BESTAI_EVENT_LOG" ] && return 0
 
+    local store_tool="${BASH_SOURCE[0]%/*}/../tools/event-store.py"
+    if command -v python3 >/dev/null 2>&1 && [ -f "$store_tool" ] \
+        && python3 "$store_tool" --log "$BESTAI_EVENT_LOG" seal --max-events "$max_events" >/dev/null 2>&1; then
+        (python3 "$store_tool" --log "$BESTAI_EVENT_LOG" compact >/dev/null 2>&1 &)
+        return 0
+    fi
+
     local count
     count=$(wc -l < "$BESTAI_EVENT_LOG" 2>/dev/null | tr -d ' ')
     [ "$count" -le "$max_events" ] && return 0
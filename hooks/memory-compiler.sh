@@ -3,17 +3,19 @@
 # Memory Compiler: scores, indexes, and garbage-collects memory files.
 #
 # Pipeline:
-#   1. Increment session counter
+#   1. Increment session counter, fold .usage-log.delta into .usage-log
 #   2. Score each memory entry: base_weight + recency_bonus + usage_count - age_penalty
 #   3. Generate context-index.md (sorted index with topic clusters)
 #   4. Enforce 200-line cap on MEMORY.md (overflow → topic files)
 #   5. Generational GC: young/mature/old/permanent
 #      - Old [AUTO] entries without references → gc-archive.md
 #      - [USER] entries are NEVER auto-deleted
+#   6. Refresh the inverted trigram index (.memory-index.sqlite, optional)
 #
 # Env vars:
 #   MEMORY_COMPILER_DRY_RUN=1  — print actions without executing
 #   MEMORY_COMPILER_GC_AGE=20  — sessions without use before GC (default: 20)
+#   MEMORY_COMPILER_ENGINE=bash — skip tools/memory-compiler.py and run the shell pipeline
 
 set -euo pipefail
 
@@ -32,6 +34,29 @@ MAX_MEMORY_LINES=200
 
 # --- E-Tag cache library ---
 ETAG_LIB="$(cd "$(dirname "$0")" && pwd)/../modules/etag-cache-lib.sh"
+
+# --- Python engine ---
+# Same pipeline and output, but .usage-log and each memory file are read once and
+# every output file is written once. MEMORY_COMPILER_ENGINE=bash forces the shell path.
+# Only exit 3 (engine not loadable, nothing written) falls through to the shell
+# pipeline: after any other failure the counter or delta log may already have moved.
+COMPILER_TOOL="$(dirname "$0")/../tools/memory-compiler.py"
+if [ "${MEMORY_COMPILER_ENGINE:-python}" != "bash" ] && command -v python3 >/dev/null 2>&1 && [ -f "$COMPILER_TOOL" ]; then
+    compiler_args=(run --memory-dir "$MEMORY_DIR")
+    [ -f "$ETAG_LIB" ] || compiler_args+=(--no-etag)
+    compiler_status=0
+    python3 "$COMPILER_TOOL" "${compiler_args[@]}" || compiler_status=$?
+    if [ "$compiler_status" -eq 0 ]; then
+        [ "${BESTAI_OPENCLAW:-0}" = "1" ] || emit_event "memory-compiler" "DONE" "{\"dry_run\":$DRY_RUN}" 2>/dev/null || true
+        exit 0
+    fi
+    if [ "$compiler_status" -ne 3 ]; then
+        echo "memory-compiler: tools/memory-compiler.py failed (exit $compiler_status)" >&2
+        emit_event "memory-compiler" "ERROR" "{\"exit\":$compiler_status}" 2>/dev/null || true
+        exit 1
+    fi
+fi
+
 ETAG_AVAILABLE=0
 if [ -f "$ETAG_LIB" ]; then
     source "$ETAG_LIB"
@@ -44,6 +69,12 @@ GC_ARCHIVE="$MEMORY_DIR/gc-archive.md"
 CONTEXT_INDEX="$MEMORY_DIR/context-index.md"
 USAGE_LOG="$MEMORY_DIR/.usage-log"
 
+# One compiler per memory dir at a time (parallel Stop hooks of swarm agents).
+if [ "$DRY_RUN" = "0" ] && command -v flock >/dev/null 2>&1; then
+    exec 9>"$MEMORY_DIR/.memory-compiler.lock"
+    flock -w 30 9 || exit 0
+fi
+
 # --- Step 1: Increment session counter ---
 CURRENT_SESSION=0
 if [ -f "$SESSION_COUNTER" ]; then
@@ -55,6 +86,112 @@ if [ "$DRY_RUN" = "0" ]; then
     echo "$CURRENT_SESSION" > "$SESSION_COUNTER"
 fi
 
+# Usage deltas: preprocess-prompt.sh never rewrites .usage-log; each prompt appends
+# "file<TAB>session<TAB>hits<TAB>tag" lines to .usage-log.delta. Here the live delta is
+# sealed (renamed to .usage-log.delta.<id>) and folded in. .usage-log.delta.done records
+# how many lines of each sealed file are already in .usage-log; a sealed file is deleted
+# one run later, once appends that raced the rename have been folded as well.
+# Dry runs fold everything pending (live delta included) into a temporary copy.
+USAGE_DELTA="$USAGE_LOG.delta"
+USAGE_DELTA_DONE="$USAGE_DELTA.done"
+fold_usage_deltas() {
+    local -A done_lines=() now_lines=() hits=() last=() tags=() found=()
+    local -a order=()
+    local name lines sealed fname sess n tag h id pending merged
+
+    if [ -f "$USAGE_DELTA_DONE" ]; then
+        while IFS=$'\t' read -r name lines; do
+            [[ "$lines" =~ ^[0-9]+$ ]] && done_lines[$name]=$lines
+        done < "$USAGE_DELTA_DONE"
+    fi
+    if [ "$DRY_RUN" = "0" ] && [ -f "$USAGE_DELTA" ]; then
+        printf -v id '%s%07d' "$(date +%s)" "$$"
+        while [ -e "$USAGE_DELTA.$id" ]; do id=$((id + 1)); done
+        mv "$USAGE_DELTA" "$USAGE_DELTA.$id" 2>/dev/null || true
+    fi
+
+    pending=$(mktemp)
+    for sealed in "$USAGE_DELTA".[0-9]*; do
+        [ -f "$sealed" ] || continue
+        name="${sealed##*/}"
+        lines=$(wc -l < "$sealed" | tr -d ' ')
+        now_lines[$name]=$lines
+        n="${done_lines[$name]:-0}"
+        [ "$lines" -gt "$n" ] && sed -n "$((n + 1)),${lines}p" "$sealed" >> "$pending"
+    done
+    if [ "$DRY_RUN" != "0" ] && [ -f "$USAGE_DELTA" ]; then
+        lines=$(wc -l < "$USAGE_DELTA" | tr -d ' ')
+        [ "$lines" -gt 0 ] && head -n "$lines" "$USAGE_DELTA" >> "$pending"
+    fi
+
+    while IFS=$'\t' read -r fname sess n tag; do
+        [ -n "$fname" ] || continue
+        [[ "$sess" =~ ^[0-9]+$ ]] || sess=0
+        [[ "$n" =~ ^[0-9]+$ ]] || n=1
+        if [ -z "${hits[$fname]+x}" ]; then
+            order+=("$fname")
+            hits[$fname]=0
+            tags[$fname]="AUTO"
+        fi
+        h="${hits[$fname]}"
+        hits[$fname]=$((h + 10#$n))
+        last[$fname]="$sess"
+        [ "$tag" = "USER" ] && tags[$fname]="USER"
+    done < "$pending"
+    rm -f "$pending"
+
+    if [ "${#order[@]}" -gt 0 ]; then
+        # Same row update update_usage_from_retrieval used to apply per prompt.
+        merged=$(mktemp)
+        if [ -f "$USAGE_LOG" ]; then
+            while IFS=$'\t' read -r fname sess n tag; do
+                [ -z "$fname" ] && continue
+                [[ "$sess" =~ ^[0-9]+$ ]] || sess=0
+                [[ "$n" =~ ^[0-9]+$ ]] || n=0
+                [ -z "${tag:-}" ] && tag="AUTO"
+                if [ -n "${hits[$fname]+x}" ]; then
+                    [ "${tags[$fname]}" = "USER" ] && tag="USER"
+                    h="${hits[$fname]}"
+                    printf '%s\t%s\t%s\t%s\n' "$fname" "${last[$fname]}" "$((n + h))" "$tag" >> "$merged"
+                    found[$fname]=1
+                else
+                    printf '%s\t%s\t%s\t%s\n' "$fname" "$sess" "$n" "$tag" >> "$merged"
+                fi
+            done < "$USAGE_LOG"
+        fi
+        for fname in "${order[@]}"; do
+            [ -n "${found[$fname]+x}" ] && continue
+            printf '%s\t%s\t%s\t%s\n' "$fname" "${last[$fname]}" "${hits[$fname]}" "${tags[$fname]}" >> "$merged"
+        done
+        if [ "$DRY_RUN" = "0" ]; then
+            mv "$merged" "$USAGE_LOG"
+        else
+            USAGE_LOG="$merged"
+            trap 'rm -f "$USAGE_LOG"' EXIT
+        fi
+    fi
+    [ "$DRY_RUN" = "0" ] || return 0
+
+    local done_tmp
+    done_tmp=$(mktemp)
+    # Sorted like UsageDeltas.commit in tools/memory_compiler.py, so both write the same file.
+    while IFS= read -r name; do
+        [ -n "$name" ] || continue
+        sealed="$MEMORY_DIR/$name"
+        if [ "${done_lines[$name]:-x}" = "${now_lines[$name]}" ] && [ -z "$(tail -c 1 "$sealed")" ]; then
+            rm -f "$sealed"
+        else
+            printf '%s\t%s\n' "$name" "${now_lines[$name]}" >> "$done_tmp"
+        fi
+    done < <(printf '%s\n' "${!now_lines[@]}" | LC_ALL=C sort)
+    if [ -s "$done_tmp" ]; then
+        mv "$done_tmp" "$USAGE_DELTA_DONE"
+    else
+        rm -f "$done_tmp" "$USAGE_DELTA_DONE"
+    fi
+}
+fold_usage_deltas
+
 # --- Step 2: Score memory entries ---
 # Score format in usage-log: filename<TAB>last_used_session<TAB>use_count<TAB>tag
 # tag is USER or AUTO
@@ -337,11 +474,22 @@ run_gc() {
     fi
 }
 
+# --- Step 6: Refresh inverted trigram index ---
+# Incremental: only files whose mtime/size changed are re-tokenized.
+MEMORY_INDEX_TOOL="$(dirname "$0")/../tools/memory-index.py"
+refresh_memory_index() {
+    [ "$DRY_RUN" = "0" ] || return 0
+    [ -f "$MEMORY_INDEX_TOOL" ] || return 0
+    command -v python3 >/dev/null 2>&1 || return 0
+    python3 "$MEMORY_INDEX_TOOL" build --memory-dir "$MEMORY_DIR" >/dev/null 2>&1 || true
+}
+
 # --- OpenClaw Integration (v8.0 Total Recall) ---
 OPENCLAW="${BESTAI_OPENCLAW:-0}"
 if [ "$OPENCLAW" = "1" ]; then
     echo "[bestAI] [OPENCLAW] Total Recall active. Bypassing GC and Memory Trimming." >&2
     generate_index
+    refresh_memory_index
     exit 0
 fi
 
@@ -350,6 +498,7 @@ fi
 run_gc
 generate_index
 enforce_memory_cap
+refresh_memory_index
 
 emit_event "memory-compiler" "DONE" "{\"dry_run\":$DRY_RUN}" 2>/dev/null || true
 exit 0
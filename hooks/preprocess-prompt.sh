@@ -4,7 +4,7 @@
 # Security model: retrieved text is DATA, never executable instructions.
 #
 # Scoring dimensions:
-#   1. Keyword grep matches (original)
+#   1. Keyword grep matches (original), or BM25F points with SMART_CONTEXT_RANKER=bm25
 #   2. Trigram similarity scoring (catches morphological variants & typos)
 #   3. Intent-to-topic routing (intent-aware file priority)
 #   4. Recency boost (files modified <24h get +3)
@@ -34,8 +34,37 @@ MEMORY_DIR_DEFAULT="$HOME/.claude/projects/$PROJECT_KEY/memory"
 MEMORY_DIR="${SMART_CONTEXT_MEMORY_DIR:-$MEMORY_DIR_DEFAULT}"
 [ -d "$MEMORY_DIR" ] || exit 0
 USAGE_LOG="$MEMORY_DIR/.usage-log"
+USAGE_DELTA="$USAGE_LOG.delta"
 SESSION_COUNTER="$MEMORY_DIR/.session-counter"
 
+MAX_FILES=${SMART_CONTEXT_MAX_FILES:-3}
+MAX_TOKENS=${SMART_CONTEXT_MAX_TOKENS:-1200}
+MIN_SCORE=${SMART_CONTEXT_MIN_SCORE:-3}
+# default: keyword line-match counts; bm25: BM25F points from the memory index
+RANKER=${SMART_CONTEXT_RANKER:-default}
+
+# --- Smart Context daemon (optional, tools/smart-context-daemon.py) ---
+# A running daemon answers with the same block the bash pipeline below builds;
+# exit 3 (no daemon / error) falls through to bash scoring.
+SMART_CONTEXT_SOCKET="${BESTAI_SMART_CONTEXT_SOCKET:-${XDG_RUNTIME_DIR:-/tmp}/bestai-smart-context-$UID.sock}"
+SMART_CONTEXT_CLIENT="$(dirname "$0")/../tools/smart-context-daemon.py"
+if [ "${SMART_CONTEXT_DAEMON:-1}" != "0" ] && [ -S "$SMART_CONTEXT_SOCKET" ] && [ -f "$SMART_CONTEXT_CLIENT" ]; then
+    DAEMON_STATUS=0
+    DAEMON_OUTPUT=$(printf '%s' "$PROMPT" | python3 "$SMART_CONTEXT_CLIENT" query \
+        --socket "$SMART_CONTEXT_SOCKET" --memory-dir "$MEMORY_DIR" 2>/dev/null) || DAEMON_STATUS=$?
+    if [ "$DAEMON_STATUS" -eq 0 ]; then
+        [ -z "$DAEMON_OUTPUT" ] && exit 0
+        printf '%s\n' "$DAEMON_OUTPUT"
+        TOP_SCORE=0
+        SCOPE=""
+        [[ "$DAEMON_OUTPUT" =~ top_score=([0-9]+) ]] && TOP_SCORE="${BASH_REMATCH[1]}"
+        SCOPE_RE=$'\nscope: ([^\n]*)'
+        [[ "$DAEMON_OUTPUT" =~ $SCOPE_RE ]] && SCOPE="${BASH_REMATCH[1]}"
+        emit_event "preprocess-prompt" "INJECT" "{\"top_score\":$TOP_SCORE,\"scope\":\"$SCOPE\"}" 2>/dev/null || true
+        exit 0
+    fi
+fi
+
 # --- E-Tag cache library (optional, for accelerated scoring) ---
 ETAG_LIB="$(cd "$(dirname "$0")" && pwd)/../modules/etag-cache-lib.sh"
 ETAG_AVAILABLE=0
@@ -45,10 +74,6 @@ if [ -f "$ETAG_LIB" ]; then
     ETAG_AVAILABLE=1
 fi
 
-MAX_FILES=${SMART_CONTEXT_MAX_FILES:-3}
-MAX_TOKENS=${SMART_CONTEXT_MAX_TOKENS:-1200}
-MIN_SCORE=${SMART_CONTEXT_MIN_SCORE:-3}
-
 # --- Keyword extraction (extended with trigram support) ---
 
 extract_keywords() {
@@ -114,14 +139,13 @@ sanitize_line() {
     echo "$line" | cut -c1-240
 }
 
+# update_usage_from_retrieval FILENAME...
+# Records every source injected for this prompt as "file<TAB>session<TAB>1<TAB>tag"
+# lines appended to .usage-log.delta in a single O_APPEND write, so parallel prompts
+# never rewrite (or lose) each other's updates. memory-compiler.sh folds the deltas
+# into .usage-log.
 update_usage_from_retrieval() {
-    local filename="$1"
-    [ -z "$filename" ] && return 0
-
-    local file_tag="AUTO"
-    if [ -f "$MEMORY_DIR/$filename" ] && grep -q '\[USER\]' "$MEMORY_DIR/$filename" 2>/dev/null; then
-        file_tag="USER"
-    fi
+    local filename file_tag lines=""
 
     local session_ref=0
     if [ -f "$SESSION_COUNTER" ]; then
@@ -129,34 +153,17 @@ update_usage_from_retrieval() {
         [[ "$session_ref" =~ ^[0-9]+$ ]] || session_ref=0
     fi
 
-    local tmp
-    tmp=$(mktemp)
-    local found=0
-
-    if [ -f "$USAGE_LOG" ]; then
-        while IFS=$'\t' read -r fname last_sess count tag; do
-            [ -z "$fname" ] && continue
-            [[ "$last_sess" =~ ^[0-9]+$ ]] || last_sess=0
-            [[ "$count" =~ ^[0-9]+$ ]] || count=0
-            [ -z "${tag:-}" ] && tag="AUTO"
-
-            if [ "$fname" = "$filename" ]; then
-                if [ "$tag" = "USER" ] || [ "$file_tag" = "USER" ]; then
-                    tag="USER"
-                fi
-                printf '%s\t%s\t%s\t%s\n' "$fname" "$session_ref" "$((count + 1))" "$tag" >> "$tmp"
-                found=1
-            else
-                printf '%s\t%s\t%s\t%s\n' "$fname" "$last_sess" "$count" "$tag" >> "$tmp"
-            fi
-        done < "$USAGE_LOG"
-    fi
-
-    if [ "$found" -eq 0 ]; then
-        printf '%s\t%s\t%s\t%s\n' "$filename" "$session_ref" "1" "$file_tag" >> "$tmp"
-    fi
+    for filename in "$@"; do
+        case "$filename" in ''|*$'\t'*|*$'\n'*) continue ;; esac
+        file_tag="AUTO"
+        if [ -f "$MEMORY_DIR/$filename" ] && grep -q '\[USER\]' "$MEMORY_DIR/$filename" 2>/dev/null; then
+            file_tag="USER"
+        fi
+        lines+="$filename"$'\t'"$session_ref"$'\t1\t'"$file_tag"$'\n'
+    done
+    [ -z "$lines" ] && return 0
 
-    mv "$tmp" "$USAGE_LOG"
+    printf '%s' "$lines" >> "$USAGE_DELTA" 2>/dev/null || true
 }
 
 # --- Intent detection with topic routing ---
@@ -275,14 +282,36 @@ if [ "$ETAG_AVAILABLE" = "1" ]; then
     PROMPT_TRIGRAMS_SORTED=$(echo "$PROMPT_TRIGRAMS" | tr ' ' '\n' | grep -v '^$' | sort -u)
 fi
 
+# Inverted trigram index (built by memory-compiler.sh): one pass scores every
+# indexed file; files missing from the output (stale/new) use the paths below.
+# With SMART_CONTEXT_RANKER=bm25 the same call returns BM25F points, which
+# replace the grep line-match count for those files.
+declare -A INDEX_TRI=()
+declare -A INDEX_BM25=()
+MEMORY_INDEX_TOOL="$(dirname "$0")/../tools/memory-index.py"
+if [ -f "$MEMORY_DIR/.memory-index.sqlite" ] && [ -f "$MEMORY_INDEX_TOOL" ] && command -v python3 >/dev/null 2>&1; then
+    INDEX_ARGS=()
+    [ "$RANKER" = "bm25" ] && INDEX_ARGS=(--bm25-keywords "$KEYWORD_FILE")
+    while IFS=$'\t' read -r tri_count tri_name bm25_points; do
+        [ -n "$tri_name" ] || continue
+        INDEX_TRI["$tri_name"]="$tri_count"
+        [ -n "$bm25_points" ] && INDEX_BM25["$tri_name"]="$bm25_points"
+    done < <(printf '%s' "$PROMPT" | python3 "$MEMORY_INDEX_TOOL" trigram-scores --memory-dir "$MEMORY_DIR" \
+        ${INDEX_ARGS[@]+"${INDEX_ARGS[@]}"} 2>/dev/null || true)
+fi
+
 # Rank by keyword hits + trigram score + file importance + [USER] + recency + ghost.
 for file in "${CANDIDATES[@]}"; do
     [ -f "$file" ] || continue
 
-    MATCHES=$(grep -icFf "$KEYWORD_FILE" "$file" 2>/dev/null) || MATCHES=0
-
     BASENAME=$(basename "$file")
 
+    if [ -n "${INDEX_BM25[$BASENAME]+x}" ]; then
+        MATCHES=${INDEX_BM25[$BASENAME]}
+    else
+        MATCHES=$(grep -icFf "$KEYWORD_FILE" "$file" 2>/dev/null) || MATCHES=0
+    fi
+
     # Determine cache status for this file
     CACHE_HIT=""
     if [ "$ETAG_AVAILABLE" = "1" ]; then
@@ -290,7 +319,9 @@ for file in "${CANDIDATES[@]}"; do
     fi
 
     # Trigram scoring (cap at 5 to avoid overwhelming keyword signal)
-    if [ "$CACHE_HIT" = "valid" ]; then
+    if [ -n "${INDEX_TRI[$BASENAME]+x}" ]; then
+        TRI_SCORE=${INDEX_TRI[$BASENAME]}
+    elif [ "$CACHE_HIT" = "valid" ]; then
         TRI_FILE=$(etag_get_field "$BASENAME" "trigram_file")
         if [ -n "$TRI_FILE" ] && [ -f "$MEMORY_DIR/$TRI_FILE" ]; then
             # Set intersection via comm (both inputs must be sorted)
@@ -359,6 +390,7 @@ SCOPE=$(echo "$KEYWORDS" | head -n 4 | paste -sd', ' -)
 TOKENS=0
 PACKED=""
 SOURCE_LIST=""
+USED_SOURCES=()
 FULL=0
 
 append_line() {
@@ -383,7 +415,7 @@ while IFS=$'\t' read -r score file; do
 
     BASENAME=$(basename "$file")
     SOURCE_LIST+="- $BASENAME (score=$score)"$'\n'
-    update_usage_from_retrieval "$BASENAME"
+    USED_SOURCES+=("$BASENAME")
 
     mapfile -t line_numbers < <(grep -inFf "$KEYWORD_FILE" "$file" 2>/dev/null | cut -d: -f1 | head -n 4)
 
@@ -413,6 +445,8 @@ while IFS=$'\t' read -r score file; do
     [ "$FULL" -eq 1 ] && break
 done < "$SELECTED_FILE"
 
+update_usage_from_retrieval "${USED_SOURCES[@]}"
+
 [ -z "$PACKED" ] && exit 0
 
 echo "[SMART_CONTEXT]"
@@ -252,7 +252,39 @@ echo ""
 
 # ── Event Log (JSONL) ──
 echo -e "${BOLD}Event Log${NC}"
-if [ -f "$EVENT_LOG" ] && command -v jq >/dev/null 2>&1; then
+EVENT_LOG_TOOL="$_STATS_SCRIPT_DIR/tools/event-log.py"
+if [ -f "$EVENT_LOG" ] && command -v jq >/dev/null 2>&1 && command -v python3 >/dev/null 2>&1 && [ -f "$EVENT_LOG_TOOL" ] \
+    && PROJ_COUNTS=$(python3 "$EVENT_LOG_TOOL" --log "$EVENT_LOG" count --by hook,action \
+        --project "$(_bestai_project_hash "$PROJECT_DIR")" --json 2>/dev/null); then
+    # Served by the event log index: appended lines are indexed once, not re-grepped per query.
+    PROJ_HASH=$(_bestai_project_hash "$PROJECT_DIR")
+    TOTAL_EVENTS=$(python3 "$EVENT_LOG_TOOL" --log "$EVENT_LOG" count --by '' 2>/dev/null | cut -f1)
+    PROJ_EVENTS=$(printf '%s' "$PROJ_COUNTS" | jq '[.[].count] | add // 0')
+    PROJ_BLOCKS=$(printf '%s' "$PROJ_COUNTS" | jq '[.[] | select(.action == "BLOCK") | .count] | add // 0')
+
+    echo "  Event log:          $EVENT_LOG"
+    echo "  Total events:       ${TOTAL_EVENTS:-0} (all projects)"
+    echo "  This project:       $PROJ_EVENTS events, $PROJ_BLOCKS blocks"
+
+    if [ "$PROJ_EVENTS" -gt 0 ]; then
+        echo ""
+        echo "  Events by hook:"
+        printf '%s' "$PROJ_COUNTS" \
+            | jq -r 'group_by(.hook) | map({hook: .[0].hook, count: (map(.count) | add)})
+                     | sort_by(-.count, .hook) | .[:5][] | "    \(.hook): \(.count)"'
+
+        LAST_EVENT_TS=$(python3 "$EVENT_LOG_TOOL" --log "$EVENT_LOG" tail -n 1 --project "$PROJ_HASH" 2>/dev/null | jq -r '.ts' 2>/dev/null)
+        [ -n "$LAST_EVENT_TS" ] && echo -e "  Last event:         ${DIM}$LAST_EVENT_TS${NC}"
+
+        LATENCY_DATA=$(python3 "$EVENT_LOG_TOOL" --log "$EVENT_LOG" latency --project "$PROJ_HASH" --json 2>/dev/null \
+            | jq -r 'to_entries[] | "    \(.key): avg=\(.value.avg_ms)ms p95=\(.value.p95_ms)ms max=\(.value.max_ms)ms (n=\(.value.n))"' 2>/dev/null || true)
+        if [ -n "$LATENCY_DATA" ]; then
+            echo ""
+            echo "  Hook latency (ms):"
+            echo "$LATENCY_DATA"
+        fi
+    fi
+elif [ -f "$EVENT_LOG" ] && command -v jq >/dev/null 2>&1; then
     PROJ_HASH=$(_bestai_project_hash "$PROJECT_DIR")
     TOTAL_EVENTS=$(wc -l < "$EVENT_LOG" | tr -d ' ')
     PROJ_EVENTS=$(grep -c "\"project\":\"$PROJ_HASH\"" "$EVENT_LOG" 2>/dev/null || echo 0)
@@ -446,6 +446,699 @@ else
     skip_test "setup + doctor strict baseline" "setup.sh or doctor.sh not found"
 fi
 
+echo ""
+echo "=== vectorize-codebase binary store ==="
+VEC_SRC="$TMP_ROOT/vec-src"
+VEC_STORE="$TMP_ROOT/vec-store"
+mkdir -p "$VEC_SRC"
+cat > "$VEC_SRC/auth.md" <<'MD'
+# Auth
+Use JWT for auth tokens and rotate signing keys monthly.
+MD
+cat > "$VEC_SRC/util.py" <<'PY'
+def parse_token(raw):
+    return raw.strip()
+PY
+VEC_OUTPUT=$(python3 "$ROOT_DIR/tools/vectorize-codebase.py" --dir "$VEC_SRC" --out "$VEC_STORE" \
+    --export-json "$TMP_ROOT/vec-store.json" 2>&1)
+VEC_CODE=$?
+assert_exit "vectorize-codebase exits 0" "0" "$VEC_CODE"
+if [ "$VEC_CODE" = "0" ]; then
+    assert_jq "binary store meta has rows + dtype" "$(cat "$VEC_STORE/meta.json")" '.rows == 2 and .dtype == "float32" and .dims == 384'
+    VEC_BYTES=$(wc -c < "$VEC_STORE/embeddings.bin" | tr -d ' ')
+    assert_exit "embeddings.bin is rows x dims x 4 bytes" "3072" "$VEC_BYTES"
+    assert_jq "JSON export keeps legacy layout" "$(cat "$TMP_ROOT/vec-store.json")" '(.rows|length) == 2 and (.rows[0].embedding|length) == 384 and .meta.indexed_files == 2'
+    VEC_ROW=$(cd "$ROOT_DIR/tools" && python3 -c 'import sys, vector_store; s = vector_store.open_store(sys.argv[1]); print(s.row(0)["content"])' "$VEC_STORE" 2>&1)
+    assert_contains "loader reads chunk content back" "$VEC_ROW" "Use JWT for auth"
+
+    printf 'def refresh_token(raw):\n    return raw\n' >> "$VEC_SRC/util.py"
+    cat > "$VEC_SRC/new.md" <<'MD'
+Session cookies are httpOnly.
+MD
+    VEC_INC=$(python3 "$ROOT_DIR/tools/vectorize-codebase.py" --dir "$VEC_SRC" --out "$VEC_STORE" --incremental 2>&1)
+    assert_contains "incremental run reuses unchanged files" "$VEC_INC" "Incremental: 1 unchanged, 2 re-embedded, 0 removed"
+    assert_jq "manifest records mtime/size/etag per file" "$(cat "$VEC_STORE/meta.json")" '(.files|length) == 3 and ([.files[] | has("mtime_ns") and has("size") and has("etag")] | all)'
+
+    VEC_QUERY=$(python3 "$ROOT_DIR/tools/vector-query.py" --store "$VEC_STORE" -k 1 "Use JWT for auth tokens" 2>&1)
+    assert_jq "vector-query ranks the matching chunk first" "$VEC_QUERY" '(.results|length) == 1 and (.results[0].path|endswith("auth.md")) and .results[0].score > 0.5'
+    assert_jq "vector-query reports chunk line ranges" "$VEC_QUERY" '.results[0].start_line == 1 and .results[0].end_line == 2'
+    VEC_FILTERED=$(python3 "$ROOT_DIR/tools/vector-query.py" --store "$VEC_STORE" --path '*.py' --min-score -1 "Use JWT for auth tokens" 2>&1)
+    assert_jq "vector-query honours path globs" "$VEC_FILTERED" '(.results|length) == 1 and (.results[0].path|endswith("util.py"))'
+    VEC_BATCH=$(printf 'Use JWT for auth tokens\n\nUse JWT for auth tokens\n' \
+        | python3 "$ROOT_DIR/tools/vector-query.py" --store "$VEC_STORE" -k 1 --batch 2>&1)
+    assert_jq "vector-query --batch answers each stdin line like a single query" "$(printf '%s\n' "$VEC_BATCH" | jq -s '.')" \
+        "length == 2 and ([.[].results] | unique | length) == 1 and .[0].results == $(printf '%s' "$VEC_QUERY" | jq -c '.results')"
+    VEC_PAR=$(python3 "$ROOT_DIR/tools/vectorize-codebase.py" --dir "$VEC_SRC" --out "$TMP_ROOT/vec-par" \
+        --workers 2 --batch-size 2 2>&1)
+    assert_contains "parallel pipeline reports throughput" "$VEC_PAR" "chunks/sec, batch=2, workers=2"
+    if cmp -s "$VEC_STORE/embeddings.bin" "$TMP_ROOT/vec-par/embeddings.bin"; then
+        echo -e "  ${GREEN}PASS${NC} parallel pipeline matches sequential embeddings"
+        PASS=$((PASS + 1))
+    else
+        echo -e "  ${RED}FAIL${NC} parallel pipeline matches sequential embeddings"
+        FAIL=$((FAIL + 1))
+    fi
+fi
+
+echo ""
+echo "=== structure-aware chunker ==="
+CHUNK_SRC="$TMP_ROOT/chunk-src"
+mkdir -p "$CHUNK_SRC"
+cat > "$CHUNK_SRC/service.py" <<'PY'
+import os
+
+
+class TokenService:
+    """Issue and validate tokens for the auth middleware layer."""
+
+    def issue(self, user_id, ttl_seconds):
+        payload = {"sub": user_id, "ttl": ttl_seconds, "iat": os.getpid()}
+        return sign_payload(payload, key=os.environ.get("SIGNING_KEY", "dev"))
+
+    def validate(self, token, now_seconds):
+        claims = decode_payload(token, key=os.environ.get("SIGNING_KEY", "dev"))
+        return claims["iat"] + claims["ttl"] > now_seconds
+PY
+cat > "$CHUNK_SRC/notes.md" <<'MD'
+# Auth notes
+JWT access tokens live fifteen minutes and refresh tokens live thirty days.
+
+# Deploy notes
+Blue green deploys run behind the load balancer with health checks enabled.
+MD
+CHUNK_OUTPUT=$(python3 "$ROOT_DIR/tools/vectorize-codebase.py" --dir "$CHUNK_SRC" --out "$TMP_ROOT/chunk-store" \
+    --max-tokens 24 --export-json "$TMP_ROOT/chunk-store.json" 2>&1)
+assert_exit "vectorize-codebase structure chunker exits 0" "0" "$?"
+CHUNK_JSON="$(cat "$TMP_ROOT/chunk-store.json" 2>/dev/null)"
+assert_jq "python chunks start at method boundaries" "$CHUNK_JSON" '[.rows[] | select(.path|endswith("service.py")) | .start_line] == [1, 7, 11]'
+assert_jq "markdown chunks start at headings" "$CHUNK_JSON" '[.rows[] | select(.path|endswith("notes.md")) | .content | split("\n")[0]] == ["# Auth notes", "# Deploy notes"]'
+assert_jq "python chunk line ranges tile the file" "$CHUNK_JSON" '[.rows[] | select(.path|endswith("service.py")) | .end_line] == [6, 10, 13]'
+CHUNK_SPAN=$(sed -n 7,10p "$CHUNK_SRC/service.py")
+CHUNK_TEXT=$(printf '%s' "$CHUNK_JSON" | jq -r '[.rows[] | select(.path|endswith("service.py"))][1].content')
+if [ -n "$CHUNK_SPAN" ] && [ "$CHUNK_SPAN" = "$CHUNK_TEXT" ]; then
+    echo -e "  ${GREEN}PASS${NC} chunk content equals its sed -n line span"
+    PASS=$((PASS + 1))
+else
+    echo -e "  ${RED}FAIL${NC} chunk content equals its sed -n line span"
+    FAIL=$((FAIL + 1))
+fi
+
+echo ""
+echo "=== hash embedding golden vectors ==="
+GOLDEN_OUTPUT=$(cd "$ROOT_DIR/tools" && python3 - "$ROOT_DIR/tests/fixtures/hash-embedding-golden.json" <<'PY' 2>&1
+import json
+import sys
+
+import embeddings
+import vector_store
+
+cases = json.load(open(sys.argv[1], encoding="utf-8"))["cases"]
+scalar = all(embeddings.cosine_ready_hash_embedding(c["text"], dims=c["dims"]) == c["vector"] for c in cases)
+print(f"scalar={scalar}")
+
+np = vector_store.load_numpy()
+if np is None:
+    print("bulk=skipped")
+else:
+    bulk = True
+    for dims in sorted({c["dims"] for c in cases}):
+        subset = [c for c in cases if c["dims"] == dims]
+        out = np.empty((len(subset), dims), dtype=np.float64)
+        embeddings.hash_embed_many([c["text"] for c in subset], dims=dims, out=out)
+        bulk = bulk and all(row.tolist() == c["vector"] for row, c in zip(out, subset))
+    print(f"bulk={bulk}")
+PY
+)
+assert_contains "memoized hash embedding is bit-identical to golden vectors" "$GOLDEN_OUTPUT" "scalar=True"
+if printf '%s' "$GOLDEN_OUTPUT" | grep -q "bulk=skipped"; then
+    skip_test "bulk hash embedding golden vectors" "numpy not installed"
+else
+    assert_contains "bulk hash embedding is bit-identical to golden vectors" "$GOLDEN_OUTPUT" "bulk=True"
+fi
+
+echo ""
+echo "=== memory trigram index ==="
+MIDX="$ROOT_DIR/tools/memory-index.py"
+MIDX_DIR="$TMP_ROOT/memory-index"
+mkdir -p "$MIDX_DIR"
+printf '%s\n' "# Memory" "- Auth uses JWT tokens with refresh rotation" > "$MIDX_DIR/MEMORY.md"
+printf '%s\n' "# Pitfalls" "- Token refresh error: clock skew" > "$MIDX_DIR/pitfalls.md"
+printf '%s\n' "unrelated zebra notes" > "$MIDX_DIR/notes.md"
+MIDX_OUTPUT=$(python3 "$MIDX" build --memory-dir "$MIDX_DIR" 2>&1)
+assert_contains "memory-index build indexes every memory file" "$MIDX_OUTPUT" "3 files (3 updated"
+printf '%s\n' "- Deploy notes" >> "$MIDX_DIR/pitfalls.md"
+rm -f "$MIDX_DIR/notes.md"
+MIDX_OUTPUT=$(python3 "$MIDX" build --memory-dir "$MIDX_DIR" 2>&1)
+assert_contains "memory-index rebuild is incremental" "$MIDX_OUTPUT" "2 files (1 updated, 1 unchanged, 1 removed)"
+MIDX_SCORES=$(printf 'token refresh' | python3 "$MIDX" trigram-scores --memory-dir "$MIDX_DIR" 2>&1)
+assert_contains "memory-index scores all files in one query" "$MIDX_SCORES" "$(printf '8\tpitfalls.md')"
+MIDX_BENCH=$(python3 "$MIDX" bench --memory-dir "$MIDX_DIR" --runs 2 2>&1)
+assert_jq "memory-index scores match the comm path" "$MIDX_BENCH" '.scores_match == true and .files == 2'
+
+echo ""
+echo "=== smart context BM25 ranker ==="
+BM25_HOME="$TMP_ROOT/bm25-home"
+BM25_MEMORY="$TMP_ROOT/bm25-memory"
+mkdir -p "$BM25_HOME" "$BM25_MEMORY"
+for i in $(seq 1 30); do
+    echo "- session $i touched the replication config and restarted workers"
+done > "$BM25_MEMORY/session-log.md"
+printf '%s\n' "# Replication" "- Replication lag under load: pin reads to the primary after writes" > "$BM25_MEMORY/notes-replication.md"
+for topic in auth billing deploy frontend; do
+    printf '%s\n' "# ${topic}" "- notes about ${topic} conventions" > "$BM25_MEMORY/${topic}.md"
+done
+python3 "$MIDX" build --memory-dir "$BM25_MEMORY" >/dev/null 2>&1
+printf '%s\n' lag primary reads replication > "$TMP_ROOT/bm25-keywords"
+BM25_SCORES=$(printf 'replication lag primary reads' | python3 "$MIDX" trigram-scores --memory-dir "$BM25_MEMORY" \
+    --bm25-keywords "$TMP_ROOT/bm25-keywords" 2>&1)
+BM25_NOTES=$(printf '%s\n' "$BM25_SCORES" | awk -F'\t' '$2 == "notes-replication.md" {print $3}')
+BM25_LOG=$(printf '%s\n' "$BM25_SCORES" | awk -F'\t' '$2 == "session-log.md" {print $3}')
+if [ -n "$BM25_NOTES" ] && [ -n "$BM25_LOG" ] && [ "$BM25_NOTES" -gt "$BM25_LOG" ]; then
+    echo -e "  ${GREEN}PASS${NC} BM25F favours keyword coverage over repeated hits ($BM25_NOTES > $BM25_LOG)"
+    PASS=$((PASS + 1))
+else
+    echo -e "  ${RED}FAIL${NC} BM25F favours keyword coverage over repeated hits (got: $BM25_SCORES)"
+    FAIL=$((FAIL + 1))
+fi
+BM25_PROMPT='{"prompt":"why do reads lag behind the primary after replication"}'
+BM25_DEFAULT=$(printf '%s\n' "$BM25_PROMPT" | HOME="$BM25_HOME" SMART_CONTEXT_MEMORY_DIR="$BM25_MEMORY" SMART_CONTEXT_DAEMON=0 \
+    bash "$ROOT_DIR/hooks/preprocess-prompt.sh" 2>/dev/null | sed -n '/^sources:/{n;p;}')
+BM25_RANKED=$(printf '%s\n' "$BM25_PROMPT" | HOME="$BM25_HOME" SMART_CONTEXT_MEMORY_DIR="$BM25_MEMORY" SMART_CONTEXT_DAEMON=0 \
+    SMART_CONTEXT_RANKER=bm25 bash "$ROOT_DIR/hooks/preprocess-prompt.sh" 2>/dev/null | sed -n '/^sources:/{n;p;}')
+assert_contains "default ranker puts the long log first" "$BM25_DEFAULT" "session-log.md"
+assert_contains "SMART_CONTEXT_RANKER=bm25 puts the focused note first" "$BM25_RANKED" "notes-replication.md"
+
+echo ""
+echo "=== event log index ==="
+ELOG="$ROOT_DIR/tools/event-log.py"
+ELOG_FILE="$TMP_ROOT/elog/events.jsonl"
+ELOG_PROJECT="$TMP_ROOT/elog/project"
+mkdir -p "$ELOG_PROJECT"
+ELOG_HASH=$(printf '%s' "$ELOG_PROJECT" | md5sum | cut -c1-16)
+for i in 1 2 3 4 5 6 7 8 9 10; do
+    action=ALLOW; [ $((i % 3)) = 0 ] && action=BLOCK
+    printf '{"ts":"2026-01-%02dT00:00:00Z","hook":"check-frozen","action":"%s","project":"%s","elapsed_ms":%d,"detail":{"reason":"File is FROZEN"}}\n' \
+        "$i" "$action" "$ELOG_HASH" "$((i * 10))"
+done > "$ELOG_FILE"
+printf '{"ts":"2026-01-11T00:00:00Z","hook":"secret-guard","action":"BLOCK","project":"other","elapsed_ms":5}\nnot json\n' >> "$ELOG_FILE"
+ELOG_COUNTS=$(python3 "$ELOG" --log "$ELOG_FILE" count --by action --project "$ELOG_HASH" --json 2>&1)
+assert_jq "event-log counts by action for one project" "$ELOG_COUNTS" '. == [{"action":"ALLOW","count":7},{"action":"BLOCK","count":3}]'
+ELOG_SINCE=$(python3 "$ELOG" --log "$ELOG_FILE" count --by hook --since 2026-01-09T00:00:00Z 2>&1)
+assert_contains "event-log count honours --since" "$ELOG_SINCE" "$(printf '2\tcheck-frozen')"
+ELOG_LATENCY=$(python3 "$ELOG" --log "$ELOG_FILE" latency --project-dir "$ELOG_PROJECT" --json 2>&1)
+assert_jq "event-log reports p95 elapsed_ms per hook" "$ELOG_LATENCY" '.["check-frozen"] == {"n":10,"avg_ms":55,"max_ms":100,"p50_ms":50,"p95_ms":100}'
+printf '{"ts":"2026-01-12T00:00:00Z","hook":"wal-logger","action":"LOG","project":"%s","elapsed_ms":1}\n' "$ELOG_HASH" >> "$ELOG_FILE"
+HEAL_OUTPUT=$(cd "$ELOG_PROJECT" && BESTAI_EVENT_LOG="$ELOG_FILE" CLAUDE_PROJECT_DIR="$ELOG_PROJECT" python3 "$ROOT_DIR/tools/self-heal.py" 2>&1)
+assert_contains "self-heal reads project blocks from the event log" "$HEAL_OUTPUT" "Detected recurring violation (3 times): File is FROZEN"
+ELOG_TAIL=$(python3 "$ELOG" --log "$ELOG_FILE" tail -n 2 --project "$ELOG_HASH" 2>&1)
+assert_contains "event-log index picks up appended lines" "$ELOG_TAIL" '"hook":"wal-logger"'
+ELOG_INDEX=$(python3 "$ELOG" --log "$ELOG_FILE" index 2>&1)
+assert_contains "event-log indexes every line incrementally" "$ELOG_INDEX" "13 lines (12 events)"
+tail -n 1 "$ELOG_FILE" > "$ELOG_FILE.new" && mv "$ELOG_FILE.new" "$ELOG_FILE"
+ELOG_INDEX=$(python3 "$ELOG" --log "$ELOG_FILE" index 2>&1)
+assert_contains "event-log re-indexes a rotated log" "$ELOG_INDEX" "1 lines (1 events)"
+echo ""
+echo "=== segmented event store ==="
+ESTORE="$ROOT_DIR/tools/event-store.py"
+ESTORE_LOG="$TMP_ROOT/estore/events.jsonl"
+mkdir -p "$TMP_ROOT/estore"
+for i in $(seq 1 25); do
+    project=p1; [ "$i" -gt 20 ] && project=p2
+    printf '{"ts":"2026-02-%02dT%02d:00:00Z","hook":"check-frozen","action":"ALLOW","project":"%s","elapsed_ms":%d}\n' \
+        "$(( (i + 1) / 2 ))" "$((i % 24))" "$project" "$i"
+done > "$ESTORE_LOG"
+BESTAI_EVENT_LOG="$ESTORE_LOG" BESTAI_EVENT_SEGMENT_LINES=10 \
+    bash -c "source '$ROOT_DIR/hooks/hook-event.sh' && rotate_event_log 10" >/dev/null 2>&1
+ESTORE_SEGMENTS=$(python3 "$ESTORE" --log "$ESTORE_LOG" segments 2>&1 | wc -l | tr -d ' ')
+assert_exit "rotate_event_log seals the live log into fixed-size segments" "3" "$ESTORE_SEGMENTS"
+assert_exit "event-store leaves an empty live log for emit_event" "0" "$(wc -c < "$ESTORE_LOG" | tr -d ' ')"
+ESTORE_FOOTERS=$(python3 "$ESTORE" --log "$ESTORE_LOG" segments 2>&1 | jq -sc '[.[] | {lines, min_ts, projects}]')
+assert_jq "event-store footers record time range and project hashes" "$ESTORE_FOOTERS" \
+    '.[0] == {"lines":10,"min_ts":"2026-02-01T01:00:00Z","projects":["p1"]} and .[1].projects == ["p1"] and .[2].projects == ["p2"]'
+ESTORE_QUERY=$(python3 "$ESTORE" --log "$ESTORE_LOG" query --project p2 2>&1)
+assert_contains "event-store query skips segments by footer" "$ESTORE_QUERY" "1 segments read, 2 skipped by footer"
+python3 "$ESTORE" --log "$ESTORE_LOG" compact --segment-lines 10 >/dev/null 2>&1  # waits for the background run
+ESTORE_DAILY=$(python3 "$ESTORE" --log "$ESTORE_LOG" rollups --granularity day 2>&1)
+assert_jq "event-store compactor writes daily rollups with latency histograms" "$ESTORE_DAILY" \
+    '([.[].count] | add) == 25 and (.[0] | .bucket == "2026-02-01" and .count == 2 and .avg_ms == 1 and .p95_ms_le == 2)'
+ESTORE_COMPACT=$(python3 "$ESTORE" --log "$ESTORE_LOG" compact --segment-lines 100 2>&1)
+assert_contains "event-store compactor merges undersized segments" "$ESTORE_COMPACT" "1 segments (0 rolled up, 2 merged away)"
+ESTORE_DAILY=$(python3 "$ESTORE" --log "$ESTORE_LOG" rollups --granularity day 2>&1)
+assert_jq "event-store rollups are not double counted after a merge" "$ESTORE_DAILY" '([.[].count] | add) == 25'
+ESTORE_CRASH_LOG="$TMP_ROOT/estore-crash/events.jsonl"
+mkdir -p "$TMP_ROOT/estore-crash"
+for i in $(seq 1 25); do
+    printf '{"ts":"2026-02-%02dT00:00:00Z","hook":"h","action":"ALLOW","project":"p"}\n' "$i"
+done > "$ESTORE_CRASH_LOG"
+python3 "$ESTORE" --log "$ESTORE_CRASH_LOG" seal --max-events 1 --segment-lines 10 >/dev/null 2>&1
+python3 "$ESTORE" --log "$ESTORE_CRASH_LOG" compact --segment-lines 10 >/dev/null 2>&1
+# Die right after the merge commits: the merged segment is in place, the old ones are not removed yet.
+(cd "$ROOT_DIR/tools" && python3 - "$ESTORE_CRASH_LOG" <<'PY' >/dev/null 2>&1
+import os, sys
+import event_store
+def crash(path, *args, **kwargs):
+    raise SystemExit(1)
+os.unlink = crash
+event_store.compact(sys.argv[1], segment_lines=100)
+PY
+)
+assert_exit "event-store finishes an interrupted merge without duplicates" "25" \
+    "$(python3 "$ESTORE" --log "$ESTORE_CRASH_LOG" query 2>/dev/null | grep -c '"ts"')"
+ESTORE_DAILY=$(python3 "$ESTORE" --log "$ESTORE_CRASH_LOG" rollups --granularity day 2>&1)
+assert_jq "event-store rollups survive an interrupted merge" "$ESTORE_DAILY" '([.[].count] | add) == 25'
+echo ""
+echo "=== usage delta log ==="
+for engine in python bash; do
+    UD_DIR="$TMP_ROOT/usage-delta-$engine"
+    mkdir -p "$UD_DIR"
+    printf '# A [USER]\n' > "$UD_DIR/a.md"
+    printf '# B\n' > "$UD_DIR/b.md"
+    printf '3\n' > "$UD_DIR/.session-counter"
+    for writer in 1 2 3 4 5 6 7 8; do
+        python3 -c "
+import sys
+sys.path.insert(0, '$ROOT_DIR/tools')
+from smart_context import update_usage_from_retrieval
+for _ in range(50):
+    update_usage_from_retrieval('$UD_DIR', [('a.md', True), ('b.md', False)], b'3')
+" &
+    done
+    wait
+    SMART_CONTEXT_MEMORY_DIR="$UD_DIR" MEMORY_COMPILER_ENGINE=$engine BESTAI_EVENT_LOG_DISABLED=1 \
+        bash "$ROOT_DIR/hooks/memory-compiler.sh" >/dev/null 2>&1
+    assert_exit "usage deltas from 8 parallel writers all land in .usage-log ($engine compactor)" \
+        "$(printf 'a.md\t3\t400\tUSER\nb.md\t3\t400\tAUTO')" "$(cat "$UD_DIR/.usage-log" 2>&1)"
+done
+printf '# C\n' > "$UD_DIR/c.md"
+printf 'c.md\t4\t7\tAUTO\n' >> "$UD_DIR/.usage-log.delta"
+UD_DRY=$(SMART_CONTEXT_MEMORY_DIR="$UD_DIR" MEMORY_COMPILER_DRY_RUN=1 BESTAI_EVENT_LOG_DISABLED=1 \
+    bash "$ROOT_DIR/hooks/memory-compiler.sh" 2>&1)
+assert_contains "dry-run compiler merges pending deltas on the fly" "$UD_DRY" '`c.md` (score=15)'
+assert_contains "dry-run compiler leaves the delta log in place" "$(cat "$UD_DIR/.usage-log.delta" 2>&1)" "c.md"
+# The shell pipeline only stands in when the Python engine could not load (exit 3).
+MCF_DIR="$TMP_ROOT/compiler-fallback"
+mkdir -p "$MCF_DIR/bin" "$MCF_DIR/memory"
+printf '# A\n' > "$MCF_DIR/memory/a.md"
+printf '5\n' > "$MCF_DIR/memory/.session-counter"
+for status in 1 3; do
+    printf '#!/bin/bash\nexit %s\n' "$status" > "$MCF_DIR/bin/python3"
+    chmod +x "$MCF_DIR/bin/python3"
+    PATH="$MCF_DIR/bin:$PATH" SMART_CONTEXT_MEMORY_DIR="$MCF_DIR/memory" BESTAI_EVENT_LOG_DISABLED=1 \
+        bash "$ROOT_DIR/hooks/memory-compiler.sh" >/dev/null 2>&1
+    MCF_EXIT=$?
+    MCF_COUNTER=$(cat "$MCF_DIR/memory/.session-counter")
+    if [ "$status" = "1" ]; then
+        assert_exit "memory-compiler reports a failed Python run" "1" "$MCF_EXIT"
+        assert_exit "memory-compiler does not re-run a failed Python run in bash" "5" "$MCF_COUNTER"
+    else
+        assert_exit "memory-compiler falls back to bash when the engine cannot load" "6" "$MCF_COUNTER"
+    fi
+done
+echo ""
+echo "=== event ingest agent ==="
+INGEST="$ROOT_DIR/tools/event-ingest.py"
+INGEST_DIR="$TMP_ROOT/ingest"
+mkdir -p "$INGEST_DIR"
+INGEST_EMIT="source '$ROOT_DIR/hooks/hook-event.sh'; _BESTAI_TOOL_NAME=Bash; emit_event demo BLOCK '{\"reason\":\"x y\",\"n\":[1,2]}'; emit_event demo ALLOW"
+BESTAI_EVENT_AGENT="$INGEST_DIR/agent" BESTAI_EVENT_LOG="$INGEST_DIR/direct.jsonl" CLAUDE_PROJECT_DIR=/ingest/proj \
+    bash -c "$INGEST_EMIT" >/dev/null 2>&1
+python3 "$INGEST" serve --base "$INGEST_DIR/agent" --background >/dev/null 2>&1
+assert_exit "event-ingest agent starts in the background" "0" "$?"
+BESTAI_EVENT_AGENT="$INGEST_DIR/agent" BESTAI_EVENT_LOG="$INGEST_DIR/agent.jsonl" CLAUDE_PROJECT_DIR=/ingest/proj \
+    bash -c "$INGEST_EMIT" >/dev/null 2>&1
+INGEST_STATUS=$(python3 "$INGEST" stop --base "$INGEST_DIR/agent" 2>&1)
+assert_jq "emit_event hands events to the running agent" "$INGEST_STATUS" '.received == 2'
+assert_exit "agent writes the same lines as the direct jq append" \
+    "$(jq -c 'del(.ts, .elapsed_ms)' "$INGEST_DIR/direct.jsonl")" "$(jq -c 'del(.ts, .elapsed_ms)' "$INGEST_DIR/agent.jsonl" 2>&1)"
+BESTAI_EVENT_AGENT="$INGEST_DIR/agent" BESTAI_EVENT_LOG="$INGEST_DIR/after.jsonl" bash -c "$INGEST_EMIT" >/dev/null 2>&1
+assert_exit "emit_event falls back to a direct append once the agent stops" "2" "$(wc -l < "$INGEST_DIR/after.jsonl" | tr -d ' ')"
+# A stalled agent: the FIFO is held open and full, so emit_event must not wait on it.
+mkfifo "$INGEST_DIR/stuck.fifo"
+sleep 30 <>"$INGEST_DIR/stuck.fifo" &
+INGEST_STUCK=$!
+echo "$INGEST_STUCK" > "$INGEST_DIR/stuck.pid"
+timeout 1 cat /dev/zero 1<>"$INGEST_DIR/stuck.fifo" 2>/dev/null
+STUCK_START=$SECONDS
+BESTAI_EVENT_AGENT="$INGEST_DIR/stuck" BESTAI_EVENT_LOG="$INGEST_DIR/stuck.jsonl" timeout 10 bash -c "$INGEST_EMIT" >/dev/null 2>&1
+STUCK_SECS=$((SECONDS - STUCK_START))
+kill "$INGEST_STUCK" 2>/dev/null; wait "$INGEST_STUCK" 2>/dev/null
+assert_exit "emit_event appends directly when the agent's FIFO is full" "2" "$(wc -l < "$INGEST_DIR/stuck.jsonl" | tr -d ' ')"
+assert_exit "emit_event does not block on a full FIFO" "1" "$([ "$STUCK_SECS" -le 2 ] && echo 1 || echo 0)"
+INGEST_BENCH=$(python3 "$INGEST" bench --events 400 --senders 4 --shell-events 3 2>&1)
+assert_jq "event-ingest bench reports burst throughput" "$INGEST_BENCH" \
+    '.complete == true and .events == 400 and .ingest_events_per_sec > 0 and .agent_shell_lines == 3'
+echo ""
+echo "=== session replay ==="
+REPLAY="$ROOT_DIR/tools/session-replay.py"
+REPLAY_LOG="$TMP_ROOT/session.jsonl"
+{
+    printf '{"role":"user","content":"fix the login bug"}\n'
+    printf '{"role":"assistant","content":"","tool_calls":[{"id":"c1","function":{"name":"Bash","arguments":"{}"}}]}\n'
+    printf '{"role":"tool","tool_call_id":"c1","content":"12345"}\n'
+    printf 'not json\n\n'
+    printf '{"role":"assistant","content":"","tool_calls":[{"id":"c2","function":{"name":"Read","arguments":"{}"}}]}\n'
+    printf '{"role":"tool","tool_call_id":"c2","content":"abc"}\n'
+    printf '{"role":"user","content":"thanks"}\n'
+} > "$REPLAY_LOG"
+REPLAY_OUTPUT=$(python3 "$REPLAY" "$REPLAY_LOG" --no-delay --index --from 5 --until 6 2>&1)
+assert_contains "session-replay seeks to --from N" "$REPLAY_OUTPUT" "#5 \\[AGENT\\]"
+assert_not_contains "session-replay stops at --until N" "$REPLAY_OUTPUT" "thanks"
+[ -s "$REPLAY_LOG.replay-idx" ]
+assert_exit "session-replay --index writes the offset sidecar" "0" "$?"
+REPLAY_OUTPUT=$(python3 "$REPLAY" "$REPLAY_LOG" --no-delay --role tool --tool-name Read 2>&1)
+assert_contains "session-replay names TOOL results by tool_call_id" "$REPLAY_OUTPUT" "#6 \\[SYSTEM\\]"
+assert_not_contains "session-replay filters out other tools" "$REPLAY_OUTPUT" "12345"
+REPLAY_OUTPUT=$(python3 "$REPLAY" "$REPLAY_LOG" --no-delay --grep 'log[a-z]+ bug' 2>&1)
+assert_contains "session-replay --grep matches event content" "$REPLAY_OUTPUT" "#1 \\[USER\\]"
+assert_not_contains "session-replay --grep drops other events" "$REPLAY_OUTPUT" "thanks"
+REPLAY_SUMMARY=$(python3 "$REPLAY" "$REPLAY_LOG" --summary --json 2>&1)
+assert_jq "session-replay summary counts calls and output bytes per tool" "$REPLAY_SUMMARY" \
+    '.events == 6 and .last == 7 and .tools.Bash.calls == 1 and .tools.Bash.output_bytes == 5 and .tools.Read.max_output_bytes == 3'
+echo ""
+echo "=== mcp server ==="
+MCP="$ROOT_DIR/tools/mcp-server.py"
+MCP_PROJECT="$TMP_ROOT/mcp-project"
+mkdir -p "$MCP_PROJECT/.bestai" "$TMP_ROOT/mcp-memory"
+cp "$ROOT_DIR/templates/gps-template.json" "$MCP_PROJECT/.bestai/GPS.json"
+printf '# Auth [USER]\n- token refresh bug in the login flow\n' > "$TMP_ROOT/mcp-memory/auth.md"
+printf 'auth.md\t42\t3\tAUTO\n' > "$TMP_ROOT/mcp-memory/.usage-log"
+mcp_call() {
+    printf '%s\n' "$@" | SMART_CONTEXT_MEMORY_DIR="$TMP_ROOT/mcp-memory" \
+        python3 "$MCP" --project-dir "$MCP_PROJECT" --event-log "$EVENT_LOG" 2>/dev/null
+}
+MCP_OUTPUT=$(mcp_call '{"method":"get_project_state"}' \
+    '[{"jsonrpc":"2.0","id":1,"method":"get_version"},{"jsonrpc":"2.0","method":"get_version"},{"jsonrpc":"2.0","id":2,"method":"nope"}]' \
+    '{broken')
+assert_jq "mcp-server answers legacy requests with the whole GPS document" "$(printf '%s\n' "$MCP_OUTPUT" | sed -n 1p)" \
+    '.result.project.owner == "team-or-person-responsible"'
+assert_jq "mcp-server answers batches, skipping notifications" "$(printf '%s\n' "$MCP_OUTPUT" | grep '^\[')" \
+    'length == 2 and .[0].id == 1 and .[1].error.code == -32601'
+assert_jq "mcp-server reports parse errors" "$(printf '%s\n' "$MCP_OUTPUT" | grep -- '-32700')" '.id == null'
+MCP_OUTPUT=$(mcp_call '{"method":"nope"}' '{"jsonrpc":"2.0","id":"s","method":"event_stats","params":{"quantile":"high"}}')
+assert_exit "mcp-server keeps the legacy error shape" '{"error": "Method not supported"}' "$(printf '%s\n' "$MCP_OUTPUT" | sed -n 1p)"
+assert_jq "mcp-server rejects a non-numeric quantile as invalid params" "$(printf '%s\n' "$MCP_OUTPUT" | grep '"s"')" \
+    '.error.code == -32602'
+mkdir -p "$TMP_ROOT/mcp-empty"
+assert_exit "mcp-server answers a legacy GPS request without GPS.json as before" '{"result": {"error": "GPS.json not found"}}' \
+    "$(printf '{"method":"get_project_state"}\n' | python3 "$MCP" --project-dir "$TMP_ROOT/mcp-empty" 2>/dev/null)"
+MCP_ETAGS=$(mcp_call '{"jsonrpc":"2.0","id":1,"method":"get_project_state","params":{"etag":""}}' | jq -c '.result.etags')
+MCP_ETAG=$(mcp_call '{"jsonrpc":"2.0","id":1,"method":"get_project_state","params":{"etag":""}}' | jq -r '.result.etag')
+assert_jq "mcp-server replies not_modified for an unchanged GPS etag" \
+    "$(mcp_call "{\"jsonrpc\":\"2.0\",\"id\":1,\"method\":\"get_project_state\",\"params\":{\"etag\":\"$MCP_ETAG\"}}")" \
+    '.result.not_modified == true'
+jq '.blockers = ["db down"]' "$MCP_PROJECT/.bestai/GPS.json" > "$MCP_PROJECT/.bestai/GPS.json.tmp" \
+    && mv "$MCP_PROJECT/.bestai/GPS.json.tmp" "$MCP_PROJECT/.bestai/GPS.json"
+assert_jq "mcp-server sends only the GPS sections that changed" \
+    "$(mcp_call "{\"jsonrpc\":\"2.0\",\"id\":1,\"method\":\"get_project_state\",\"params\":{\"etags\":$MCP_ETAGS}}")" \
+    '.result.changed == {"blockers": ["db down"]} and .result.removed == []'
+MCP_OUTPUT=$(mcp_call '{"jsonrpc":"2.0","id":"q","method":"smart_context_query","params":{"prompt":"fix the login token refresh bug"}}' \
+    '{"jsonrpc":"2.0","id":"m","method":"list_memory_files"}' '{"jsonrpc":"2.0","id":"e","method":"event_stats"}')
+assert_jq "mcp-server runs smart-context queries" "$(printf '%s\n' "$MCP_OUTPUT" | grep '"q"')" \
+    '.result.scores[0].file == "auth.md" and (.result.output | contains("[SMART_CONTEXT]"))'
+assert_jq "mcp-server lists memory files" "$(printf '%s\n' "$MCP_OUTPUT" | grep '"m"')" \
+    '.result.files[0].name == "auth.md" and .result.files[0].user == true'
+assert_jq "mcp-server reads .usage-log rows as file, last session, count, tag" "$(printf '%s\n' "$MCP_OUTPUT" | grep '"m"')" \
+    '.result.files[0].usage == {"uses": 3, "last_session": 42, "tag": "AUTO"}'
+assert_jq "mcp-server reports event-log stats" "$(printf '%s\n' "$MCP_OUTPUT" | grep '"e"')" \
+    '.result.total >= 0 and (.result.counts | type) == "array"'
+echo ""
+echo "=== t3 summaries ==="
+T3_ROOT="$TMP_ROOT/t3"
+mkdir -p "$T3_ROOT/src/app" "$T3_ROOT/node_modules/pkg" "$T3_ROOT/build" "$T3_ROOT/logs"
+printf 'node_modules/\nbuild\n*.log\n' > "$T3_ROOT/.gitignore"
+printf '!keep.log\n' > "$T3_ROOT/logs/.gitignore"
+printf 'a\nb\nc\n' > "$T3_ROOT/src/app/main.py"
+printf 'echo hi\n' > "$T3_ROOT/src/app/run.sh"
+printf 'x\n' > "$T3_ROOT/node_modules/pkg/index.js"
+printf 'x\n' > "$T3_ROOT/build/out.js"
+printf 'x\n' > "$T3_ROOT/logs/drop.log"
+printf 'x\n' > "$T3_ROOT/logs/keep.log"
+T3_OUT="$T3_ROOT/.bestai/T3-summary.md"
+python3 "$ROOT_DIR/tools/generate-t3-summaries.py" --dir "$T3_ROOT" --out "$T3_OUT" >/dev/null 2>&1
+assert_exit "t3 summary generator exits 0" "0" "$?"
+T3_SUMMARY=$(cat "$T3_OUT" 2>&1)
+assert_contains "t3 summary reports lines, bytes and languages" "$T3_SUMMARY" \
+    'src/app/`: Contains 2 files (.py, .sh). 4 lines, 14 B; Shell 57%, Python 43%'
+assert_not_contains "t3 summary prunes .gitignore'd directories" "$T3_SUMMARY" "node_modules\\|build"
+assert_contains "t3 summary honours nested .gitignore negation" "$T3_SUMMARY" 'logs/`: Contains 1 files'
+printf 'a\nb\nc\nd\n' > "$T3_ROOT/src/app/main.py"
+python3 - "$T3_OUT.cache.json" <<'PY'
+import json, sys
+path = sys.argv[1]
+data = json.load(open(path))
+data["dirs"]["logs"]["lines"] = 99  # unchanged directory: must come from the cache
+json.dump(data, open(path, "w"))
+PY
+python3 "$ROOT_DIR/tools/generate-t3-summaries.py" --dir "$T3_ROOT" --out "$T3_OUT" >/dev/null 2>&1
+T3_SUMMARY=$(cat "$T3_OUT" 2>&1)
+assert_contains "t3 summary reuses cached stats for unchanged directories" "$T3_SUMMARY" 'logs/`: Contains 1 files (.log). 99 lines'
+assert_contains "t3 summary rescans directories whose files changed" "$T3_SUMMARY" 'src/app/`: Contains 2 files (.py, .sh). 5 lines'
+echo ""
+echo "=== conductor in-process commands ==="
+COND_PROJECT="$TMP_ROOT/conductor-project"
+COND_HOME="$TMP_ROOT/conductor-home"
+COND_LOG="$TMP_ROOT/conductor-events.jsonl"
+COND_MEMORY="$COND_HOME/.claude/projects/$(printf '%s' "$COND_PROJECT" | tr '/' '-')/memory"
+mkdir -p "$COND_PROJECT/.bestai" "$COND_MEMORY"
+cp "$ROOT_DIR/templates/gps-template.json" "$COND_PROJECT/.bestai/GPS.json"
+printf '# Decisions [USER]\n' > "$COND_MEMORY/decisions.md"
+printf '# Notes\n' > "$COND_MEMORY/notes.md"
+printf '{"usage":{"input_tokens":900},"output_tokens":100}\n' > "$COND_MEMORY/../cache-usage.jsonl"
+printf '{"vendor":"codex","depth":"deep","ts":"t1"}\n{"route":{"vendor":"claude","depth":"fast"}}\n' \
+    > "$COND_PROJECT/.bestai/router-decisions.jsonl"
+for action in BLOCK ALLOW ALLOW; do
+    CLAUDE_PROJECT_DIR="$COND_PROJECT" BESTAI_EVENT_LOG="$COND_LOG" \
+        bash -c "source '$ROOT_DIR/hooks/hook-event.sh'; emit_event demo $action" >/dev/null 2>&1
+done
+COND_SH=$(cd "$COND_PROJECT" && HOME="$COND_HOME" BESTAI_EVENT_LOG="$COND_LOG" bash "$ROOT_DIR/tools/cockpit.sh" --json 2>&1)
+COND_PY=$(cd "$COND_PROJECT" && HOME="$COND_HOME" BESTAI_EVENT_LOG="$COND_LOG" \
+    python3 "$ROOT_DIR/tools/conductor.py" --command "/status --json" 2>&1)
+assert_exit "conductor /status --json matches cockpit.sh --json" "$COND_SH" "$COND_PY"
+COND_SH=$(cd "$COND_PROJECT" && HOME="$COND_HOME" BESTAI_EVENT_LOG="$COND_LOG" bash "$ROOT_DIR/tools/cockpit.sh" 2>&1)
+COND_PY=$(cd "$COND_PROJECT" && HOME="$COND_HOME" BESTAI_EVENT_LOG="$COND_LOG" \
+    python3 "$ROOT_DIR/tools/conductor.py" --command /status --command /events 2>&1)
+assert_contains "conductor /status renders the cockpit text view" "$COND_PY" "$(printf '%s\n' "$COND_SH" | grep '^routing(vendors)')"
+assert_contains "conductor /events reports per-hook counts in-process" "$COND_PY" "2  demo ALLOW"
+COND_PY=$(cd "$COND_PROJECT" && HOME="$COND_HOME" BESTAI_EVENT_LOG="$COND_LOG" \
+    python3 "$ROOT_DIR/tools/conductor.py" --command '/nexus "unbalanced' --command /events 2>&1)
+assert_contains "conductor reports an unbalanced quote instead of exiting" "$COND_PY" "Cannot parse arguments (No closing quotation)"
+assert_contains "conductor keeps going after a bad command line" "$COND_PY" "2  demo ALLOW"
+echo ""
+echo "=== self-heal clustering ==="
+HEAL="$ROOT_DIR/tools/self-heal.py"
+HEAL_PROJECT="$TMP_ROOT/heal/project"
+HEAL_LOG="$TMP_ROOT/heal/events.jsonl"
+mkdir -p "$HEAL_PROJECT/memory"
+HEAL_HASH=$(printf '%s' "$HEAL_PROJECT" | md5sum | cut -c1-16)
+heal_block() {
+    printf '{"ts":"%s","hook":"check-frozen","action":"BLOCK","project":"%s","detail":{"reason":"%s"}}\n' "$1" "$HEAL_HASH" "$2" >> "$HEAL_LOG"
+}
+heal_block 2026-02-01T10:00:00Z "blocked rm -rf /tmp/a"
+heal_block 2026-02-01T11:00:00Z "blocked rm -rf /tmp/b"
+heal_block 2026-02-01T12:00:00Z "Secret found in config.py line 12"
+heal_run() { (cd "$HEAL_PROJECT" && CLAUDE_PROJECT_DIR="$HEAL_PROJECT" python3 "$HEAL" --log "$HEAL_LOG" "$@" 2>&1); }
+HEAL_OUTPUT=$(heal_run)
+assert_contains "self-heal clusters reasons that differ only by path" "$HEAL_OUTPUT" "Detected recurring violation (2 times): blocked rm -rf /tmp/a"
+assert_not_contains "self-heal leaves one-off reasons alone" "$HEAL_OUTPUT" "recurring violation (1 times)"
+HEAL_OUTPUT=$(heal_run)
+assert_contains "self-heal skips pitfalls already recorded" "$HEAL_OUTPUT" "Already recorded in memory/pitfalls.md"
+assert_exit "self-heal appends each pitfall once" "1" "$(grep -c 'AUTO-HEAL' "$HEAL_PROJECT/memory/pitfalls.md")"
+heal_block 2026-02-02T09:00:00Z "blocked rm -rf /var/tmp/c"
+HEAL_OUTPUT=$(heal_run)
+assert_contains "self-heal only reads blocks past its checkpoint" "$HEAL_OUTPUT" "Scanned 1 new block(s)"
+assert_contains "self-heal keeps counts across runs" "$HEAL_OUTPUT" "Detected recurring violation (3 times): blocked rm -rf /tmp/a"
+heal_block 2026-03-20T09:00:00Z "Secret found in config.py line 3"
+HEAL_OUTPUT=$(heal_run --full)
+assert_contains "self-heal windows end at the newest block" "$HEAL_OUTPUT" "24h=1 7d=1 30d=1 total=2  Secret found in config.py line 12"
+# A full cluster table must still make room for a new recurring reason.
+HEAL_FULL_LOG="$TMP_ROOT/heal/full.jsonl"
+python3 - "$HEAL_HASH" > "$HEAL_FULL_LOG" <<'PY'
+import json, string, sys
+letters = string.ascii_lowercase
+for i in range(300):
+    word = letters[i // 26 % 26] + letters[i % 26] + "zone"
+    reason = f"{word}-guard"
+    print(json.dumps({"ts": "2026-02-01T10:00:00Z", "hook": "check-frozen", "action": "BLOCK",
+                      "project": sys.argv[1], "detail": {"reason": reason}}))
+for hour in (11, 12):
+    print(json.dumps({"ts": f"2026-02-01T{hour}:00:00Z", "hook": "check-frozen", "action": "BLOCK",
+                      "project": sys.argv[1], "detail": {"reason": "sudo requested without approval"}}))
+PY
+HEAL_OUTPUT=$(heal_run --log "$HEAL_FULL_LOG" --state "$TMP_ROOT/heal/full-state.json")
+assert_contains "self-heal tracks new reasons once the cluster table is full" "$HEAL_OUTPUT" "Detected recurring violation (2 times): sudo requested without approval"
+echo ""
+echo "=== secret scanner ==="
+SSCAN="$ROOT_DIR/tools/secret-scan.py"
+SS_FIXTURES="$ROOT_DIR/tests/fixtures/secret-scanner"
+SS_OUTPUT=$(python3 "$SSCAN" "$SS_FIXTURES/false-positives.txt" 2>&1)
+assert_exit "secret-scan passes the false-positive fixtures" "0" "$?"
+assert_exit "secret-scan reports nothing on the false-positive fixtures" "0" "$(printf '%s' "$SS_OUTPUT" | grep -c .)"
+SS_EXPECTED=$(awk '!/^#/ { print NR ": secret/" $1 }' "$SS_FIXTURES/true-positives.txt")
+SS_OUTPUT=$(python3 "$SSCAN" "$SS_FIXTURES/true-positives.txt" 2>&1 | sed 's/^.*true-positives\.txt://')
+[ "$SS_OUTPUT" = "$SS_EXPECTED" ]
+assert_exit "secret-scan names the rule for every true positive" "0" "$?"
+SS_AGREE=yes
+while IFS= read -r line; do
+    case "$line" in '#'*) continue ;; esac
+    jq -cn --arg c "${line#* }" '{tool_name:"Write",tool_input:{file_path:"notes.txt",content:$c}}' \
+        | bash "$ROOT_DIR/hooks/secret-guard.sh" >/dev/null 2>&1
+    [ "$?" = "2" ] || SS_AGREE="no: $line"
+done < "$SS_FIXTURES/true-positives.txt"
+while IFS= read -r line; do
+    jq -cn --arg c "$line" '{tool_name:"Write",tool_input:{file_path:"notes.txt",content:$c}}' \
+        | bash "$ROOT_DIR/hooks/secret-guard.sh" >/dev/null 2>&1
+    [ "$?" = "0" ] || SS_AGREE="no: $line"
+done < "$SS_FIXTURES/false-positives.txt"
+assert_exit "secret-guard.sh agrees with the scanner on both fixture sets" "yes" "$SS_AGREE"
+SS_BIG="$TMP_ROOT/secret-scan-big.txt"
+python3 - "$SS_BIG" <<'PY'
+import sys
+with open(sys.argv[1], "w") as fh:
+    for n in range(1, 60001):
+        fh.write("secret_manager.get(name)  # ordinary line of code, nothing to see here\n" if n != 45678 else "DB_PASSWORD=hunter2hunter2\n")
+    fh.write("x" * 300000 + " token=abcdefghijklmnopq " + "y" * 300000 + "\n")
+    # The value runs past the cut: the match stands without the text after it.
+    fh.write("x " * 40000 + "token=" + "A" * 200000 + "\n")
+PY
+SS_OUTPUT=$(python3 "$SSCAN" --chunk-size 65536 "$SS_BIG" 2>&1 | sed 's/^.*secret-scan-big\.txt://')
+[ "$SS_OUTPUT" = "$(printf '45678: secret/password-assignment\n60001: secret/token-assignment\n60002: secret/token-assignment')" ]
+assert_exit "secret-scan streams chunks and keeps line numbers, long lines included" "0" "$?"
+SS_CUTS=$(python3 -c "
+import sys
+sys.path.insert(0, '$ROOT_DIR/tools')
+from secret_scanner import FAMILIES, scan_text
+family = FAMILIES['secret-file']
+# A key path longer than the overlap must be rescanned from its start.
+cases = [(needle, pad, tail) for needle in (' id_rsa', ' ' + 'k' * 700 + '.pem')
+         for pad in range(1900, 3200) for tail in ('x', ' y', '')]
+for needle, pad, tail in cases:
+    line = 'q ' * (pad // 2) + 'q' * (pad % 2) + needle + tail
+    chunked = [f.rule for f in scan_text(line, ('secret-file',), first=True, chunk_size=1024)]
+    if chunked != ([family.match(line)] if family.match(line) else []):
+        print(len(needle), pad, repr(tail), chunked)
+" 2>&1)
+assert_exit "secret-scan settles matches that end at a chunk cut like one whole-line search" "" "$SS_CUTS"
+SS_OUTPUT=$(python3 "$SSCAN" --bench --size 1 --repeat 1 2>&1)
+assert_contains "secret-scan --bench reports throughput" "$SS_OUTPUT" "MB/s"
+echo ""
+echo "=== swarm lock manager ==="
+SLOCK="$ROOT_DIR/tools/swarm-lock.sh"
+SL_DIR="$TMP_ROOT/swarm-lock"
+mkdir -p "$SL_DIR/.bestai"
+printf '{"legacy.ts":{"agent":"old","locked_at":"x","locked_at_unix":%s},"stale.ts":{"agent":"old","locked_at":"x","locked_at_unix":1}}\n' "$(date +%s)" \
+    > "$SL_DIR/.bestai/swarm_locks.json"
+sl() { (cd "$SL_DIR" && bash "$SLOCK" "$@" 2>&1); }
+SL_OUTPUT=$(sl --lock src/app.ts src/util.ts --agent codex)
+assert_exit "swarm-lock locks a batch of paths" "0" "$?"
+assert_contains "swarm-lock keeps the old OK message" "$SL_OUTPUT" "OK: Locked src/util.ts for codex (TTL: 300s)"
+SL_OUTPUT=$(sl --lock ./src//app.ts --agent claude)
+assert_exit "swarm-lock refuses a path held by another agent" "1" "$?"
+assert_contains "swarm-lock names the holder" "$SL_OUTPUT" "BLOCKED: src/app.ts is already locked by codex"
+SL_OUTPUT=$(sl --lock src/ --agent claude)
+assert_contains "swarm-lock refuses a directory lock over a held file" "$SL_OUTPUT" "is already locked by codex (via src/app.ts)"
+sl --lock docs/ --agent claude >/dev/null
+SL_OUTPUT=$(sl --lock README.md docs/guide.md --agent codex)
+assert_contains "swarm-lock refuses a file inside a locked directory" "$SL_OUTPUT" "docs/guide.md is already locked by claude (via docs/)"
+SL_OUTPUT=$(sl --status)
+assert_not_contains "swarm-lock batches are all or nothing" "$SL_OUTPUT" "README.md"
+sl --renew src/app.ts --agent claude >/dev/null
+assert_exit "swarm-lock only renews the holder's lease" "1" "$?"
+SL_OUTPUT=$(SWARM_LOCK_TTL=900 sl --renew src/app.ts --agent codex)
+assert_contains "swarm-lock renews a lease" "$SL_OUTPUT" "OK: Renewed src/app.ts for codex (TTL: 900s)"
+sl --unlock src/app.ts --agent claude >/dev/null
+assert_exit "swarm-lock --unlock --agent leaves other agents' locks" "1" "$?"
+sl --unlock src/app.ts >/dev/null
+SL_OUTPUT=$(sl --status)
+assert_contains "swarm-lock imports live locks from swarm_locks.json" "$SL_OUTPUT" '"legacy.ts"'
+assert_not_contains "swarm-lock drops expired legacy locks" "$SL_OUTPUT" '"stale.ts"'
+assert_not_contains "swarm-lock --unlock releases" "$SL_OUTPUT" '"src/app.ts"'
+sl --lock short.ts --agent a --ttl 1 >/dev/null
+sleep 1.1
+SL_OUTPUT=$(sl --lock short.ts --agent b)
+assert_contains "swarm-lock leases expire" "$SL_OUTPUT" "OK: Locked short.ts for b"
+SL_OUTPUT=$(cd "$SL_DIR" && python3 "$ROOT_DIR/tools/swarm-lock.py" --stress 64 --ops 5 2>&1)
+assert_exit "swarm-lock keeps mutual exclusion across 64 acquirers" "0" "$?"
+assert_contains "swarm-lock stress reports throughput" "$SL_OUTPUT" "ops/s"
+assert_contains "swarm-lock stress counts every update" "$SL_OUTPUT" "counter=320 expected=320 overlaps=0"
+echo ""
+echo "=== routing stats cache ==="
+RS_DIR="$TMP_ROOT/route-stats"
+RS_LOG="$RS_DIR/router-decisions.jsonl"
+mkdir -p "$RS_DIR/nopython"
+awk '/^read_route_history\(\) \{/,/^}/' "$ROUTER" > "$RS_DIR/read-route-history.sh"
+rs_row() {
+    printf '{"task":"%s","complexity":"%s","vendor":"%s","depth":"%s","confidence":%s}\n' "$@" >> "$RS_LOG"
+}
+rs_compare() {
+    local label="$1" window="$2" jq_out py_out
+    jq_out=$(_ROUTER_SCRIPT_DIR="$RS_DIR/nopython" bash -c '. "$1"; read_route_history "$2" "audit auth module" high "$3"' _ \
+        "$RS_DIR/read-route-history.sh" "$RS_LOG" "$window")
+    py_out=$(python3 "$ROOT_DIR/tools/route-stats.py" --log "$RS_LOG" --task-norm "audit auth module" --complexity high --window "$window")
+    assert_exit "$label" "$jq_out" "$py_out"
+}
+rs_row "Audit AUTH module" high claude deep 80
+rs_row "audit auth module!" high codex deep 91
+echo 'not json' >> "$RS_LOG"
+rs_row "fix bug" low codex fast 55
+rs_row "Audit auth module" high codex balanced 70
+rs_compare "route-stats matches the jq history on a fresh log" 4
+RS_OFFSET=$(jq '.offset' "$RS_DIR/router-decisions.stats.json")
+rs_row "deploy" high gemini deep 60
+rs_row "audit auth module" medium claude fast 65
+rs_compare "route-stats evicts lines that leave the window" 4
+assert_exit "route-stats resumes from its saved offsets without copying rows" "1" "$(jq --argjson old "$RS_OFFSET" '(.offset > $old) and .count == 4 and (has("lines") | not) | if . then 1 else 0 end' "$RS_DIR/router-decisions.stats.json")"
+rs_compare "route-stats rebuilds when the window changes" 240
+: > "$RS_LOG"
+rs_row "audit auth module" high gemini fast 40
+rs_compare "route-stats rebuilds after the log is truncated" 240
+echo ""
+echo "=== memory binding index ==="
+MB_HOME="$TMP_ROOT/binding-home"
+MB_PROJECT="$TMP_ROOT/binding-project"
+MB_MEMORY="$MB_HOME/.claude/projects/$(printf '%s' "$MB_PROJECT" | tr '/' '-')/memory"
+mkdir -p "$MB_MEMORY" "$MB_PROJECT/.bestai"
+cat > "$MB_MEMORY/decisions-2020-01-02.md" <<'MBEOF'
+# Decisions
+[HARD] auth tokens must rotate weekly
+Auth cache	is   shared across workers 2031/05/06
+old auth note without its own date
+MBEOF
+printf 'nothing relevant here\n' > "$MB_MEMORY/unrelated.md"
+printf '{"goal":"ship the auth refactor"}\n' > "$MB_PROJECT/.bestai/GPS.json"
+mb() { HOME="$MB_HOME" bash "$BINDING" --project-dir "$MB_PROJECT" "$@" 2>&1; }
+MB_OUTPUT=$(mb --task "Review auth token rotation" --json)
+assert_exit "task-memory-binding survives files without matches" "0" "$?"
+assert_jq "task-memory-binding classifies HARD/SOFT lines" "$MB_OUTPUT" '.hard_count == 1 and .soft_count == 3 and .metadata.soft_count == 3'
+assert_jq "task-memory-binding ranks files by matching lines" "$MB_OUTPUT" '[.bindings[].source] == ["decisions-2020-01-02.md:2","decisions-2020-01-02.md:3","decisions-2020-01-02.md:4",".bestai/GPS.json:1"]'
+assert_jq "task-memory-binding cleans excerpts and reads line dates" "$MB_OUTPUT" '.bindings[1] | .excerpt == "Auth cache is shared across workers 2031/05/06" and .decision_date == "2031-05-06" and .age_days == 0'
+assert_jq "task-memory-binding falls back to the file name date" "$MB_OUTPUT" '.bindings[2] | .decision_date == "2020-01-02" and .date_status == "dated" and .confidence == 0.84'
+MB_OUTPUT=$(BESTAI_BINDING_SOFT_TTL_DAYS=30 mb --task "Review auth token rotation" --json)
+assert_jq "task-memory-binding drops expired SOFT lines" "$MB_OUTPUT" '.dropped_expired_count == 1 and .soft_count == 2 and .hard_count == 1'
+MB_OUTPUT=$(BESTAI_BINDING_ALLOW_HARD_OVERRIDE=1 mb --task "Review auth token rotation" --json)
+assert_jq "task-memory-binding marks overridden HARD lines" "$MB_OUTPUT" '.overridden_count == 1 and .hard_count == 0 and .bindings[0].confidence == 0.45'
+MB_OUTPUT=$(mb --task "Review auth token rotation" --max-lines 2)
+assert_contains "task-memory-binding prints the text block" "$MB_OUTPUT" "\[HARD\] decisions-2020-01-02.md:2 — \[HARD\] auth tokens must rotate weekly (confidence=0.92)"
+assert_exit "task-memory-binding honours --max-lines" "3" "$(printf '%s\n' "$MB_OUTPUT" | wc -l | tr -d ' ')"
+assert_jq "task-memory-binding caches the line index" "$(cat "$MB_PROJECT/.bestai/memory-binding-index.json")" '.files | length == 3'
+printf 'auth rotation [policy] moved to vault\n' >> "$MB_MEMORY/unrelated.md"
+MB_OUTPUT=$(mb --task "Review auth token rotation" --json)
+assert_jq "task-memory-binding re-indexes changed files" "$MB_OUTPUT" '.hard_count == 2 and any(.bindings[]; .source == "unrelated.md:2")'
+printf 'Review auth token rotation\nthis that with\n\nship the refactor\n' > "$MB_PROJECT/tasks.txt"
+MB_OUTPUT=$(mb --tasks-file "$MB_PROJECT/tasks.txt")
+assert_exit "task-memory-binding --tasks-file prints one object per task" "3" "$(printf '%s\n' "$MB_OUTPUT" | jq -s 'length')"
+assert_jq "task-memory-binding --tasks-file keeps task order" "$(printf '%s\n' "$MB_OUTPUT" | jq -s '.')" '[.[].task] == ["Review auth token rotation","this that with","ship the refactor"] and .[1].bindings == [] and .[2].bindings[0].source == ".bestai/GPS.json:1"'
+echo ""
+echo "=== hook latency benchmark ==="
+HBENCH="$ROOT_DIR/tools/hook-bench.py"
+HBENCH_OUTPUT=$(python3 "$HBENCH" --hook circuit-breaker-gate.sh --runs 3 --warmup 0 --tolerance 1000 --json 2>&1)
+assert_exit "hook-bench passes within a loose tolerance" "0" "$?"
+assert_jq "hook-bench reports percentiles against the manifest budget" "$HBENCH_OUTPUT" \
+    '.hooks[0].hook == "circuit-breaker-gate.sh" and .hooks[0].budget_ms == 10 and .hooks[0].p50_ms <= .hooks[0].p99_ms and .events[0].budget_ms == 200'
+python3 "$HBENCH" --hook circuit-breaker-gate.sh --runs 1 --warmup 0 --tolerance 0.0001 >/dev/null 2>&1
+assert_exit "hook-bench exits non-zero on a regression" "1" "$?"
+python3 "$HBENCH" --hook no-such-hook.sh >/dev/null 2>&1
+assert_exit "hook-bench rejects hooks missing from the manifest" "2" "$?"
+
 echo ""
 echo "=== npm package hygiene ==="
 if command -v npm >/dev/null 2>&1; then
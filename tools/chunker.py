@@ -0,0 +1,205 @@
+"""Structure-aware chunking for the bestAI vector tools.
+
+Python files are cut along AST boundaries (module statements, classes,
+functions/methods) and markdown files along headings, so one chunk holds one
+concept. Small neighbouring units are packed together up to a token budget;
+units that are still too large are split into line windows, and only those
+mid-unit cuts carry ``overlap`` tokens of context from the previous window.
+
+Every chunk records a 1-based inclusive line range, so consumers can pull the
+exact span (``sed -n START,ENDp file``) instead of the stored text.
+"""
+
+from __future__ import annotations
+
+import ast
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+HEADING_RE = re.compile(r"^#{1,6}\s")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    start_line: int
+    end_line: int
+
+
+def estimate_tokens(text: str) -> int:
+    """Same estimate the prompt hooks pack with: ceil(words * 1.3)."""
+    return (len(text.split()) * 13 + 9) // 10
+
+
+def split_lines(content: str) -> list[str]:
+    """Split on ``\n`` only (keeping it), so numbering matches sed/grep -n."""
+    parts = content.split("\n")
+    lines = [part + "\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+
+class _Lines:
+    def __init__(self, content: str):
+        self.lines = split_lines(content)
+        self._tokens = [estimate_tokens(line) for line in self.lines]
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def tokens(self, start: int, end: int) -> int:
+        """Token estimate for 0-based half-open line range ``[start, end)``."""
+        return sum(self._tokens[start:end])
+
+    def chunk(self, start: int, end: int) -> Chunk:
+        return Chunk("".join(self.lines[start:end]), start + 1, end)
+
+    def windows(self, start: int, end: int, max_tokens: int, overlap: int) -> Iterator[tuple[int, int]]:
+        """Split ``[start, end)`` into line windows under ``max_tokens``."""
+        cursor = start
+        while cursor < end:
+            stop = cursor
+            used = 0
+            while stop < end and (stop == cursor or used + self._tokens[stop] <= max_tokens):
+                used += self._tokens[stop]
+                stop += 1
+            yield cursor, stop
+            if stop >= end:
+                return
+            # Step back over trailing lines worth at most ``overlap`` tokens.
+            back = stop
+            carried = 0
+            while back - 1 > cursor and carried + self._tokens[back - 1] <= overlap:
+                back -= 1
+                carried += self._tokens[back]
+            cursor = back
+
+
+def _pack(lines: _Lines, units: list[tuple[int, int]], max_tokens: int, overlap: int) -> list[tuple[int, int]]:
+    """Greedily merge adjacent units under the budget; window oversized ones."""
+    spans: list[tuple[int, int]] = []
+    current: Optional[tuple[int, int]] = None
+    for start, end in units:
+        if lines.tokens(start, end) > max_tokens:
+            if current is not None:
+                spans.append(current)
+                current = None
+            spans.extend(lines.windows(start, end, max_tokens, overlap))
+            continue
+        if current is not None and lines.tokens(current[0], end) <= max_tokens:
+            current = (current[0], end)
+            continue
+        if current is not None:
+            spans.append(current)
+        current = (start, end)
+    if current is not None:
+        spans.append(current)
+    return spans
+
+
+def _node_span(node: ast.AST) -> tuple[int, int]:
+    first = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return first - 1, node.end_lineno or node.lineno
+
+
+def _python_units(lines: _Lines, body: list[ast.stmt], start: int, end: int, max_tokens: int) -> list[tuple[int, int]]:
+    """One unit per statement in ``body``, tiling ``[start, end)``.
+
+    Comment lines directly above a statement belong to it; blank lines stay
+    with the statement before them.
+    """
+    if not body:
+        return [(start, end)]
+    bounds = [start]
+    previous_end = start
+    for node in body[1:]:
+        boundary = max(previous_end, _node_span(node)[0])
+        while boundary > previous_end and lines.lines[boundary - 1].lstrip().startswith("#"):
+            boundary -= 1
+        bounds.append(boundary)
+        previous_end = max(boundary, _node_span(node)[1])
+    bounds.append(end)
+
+    units: list[tuple[int, int]] = []
+    for node, unit_start, unit_end in zip(body, bounds, bounds[1:]):
+        if isinstance(node, ast.ClassDef) and node.body and lines.tokens(unit_start, unit_end) > max_tokens:
+            # Oversized class: header rides with the first member, then one unit per member.
+            units.extend(_python_units(lines, node.body, unit_start, unit_end, max_tokens))
+        elif unit_end > unit_start:
+            units.append((unit_start, unit_end))
+    return units
+
+
+def chunk_python(content: str, max_tokens: int = 256, overlap: int = 32) -> list[Chunk]:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return chunk_lines(content, max_tokens, overlap)
+    lines = _Lines(content)
+    if not len(lines):
+        return [Chunk("", 1, 1)]
+    units = _python_units(lines, tree.body, 0, len(lines), max_tokens)
+    return [lines.chunk(start, end) for start, end in _pack(lines, units, max_tokens, overlap)]
+
+
+def chunk_markdown(content: str, max_tokens: int = 256, overlap: int = 32) -> list[Chunk]:
+    lines = _Lines(content)
+    if not len(lines):
+        return [Chunk("", 1, 1)]
+
+    heading_starts = [0]
+    in_fence = False
+    for number, line in enumerate(lines.lines):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and number and HEADING_RE.match(line):
+            heading_starts.append(number)
+    bounds = heading_starts + [len(lines)]
+    sections = [(bounds[i], bounds[i + 1]) for i in range(len(heading_starts))]
+
+    units: list[tuple[int, int]] = []
+    for start, end in sections:
+        if lines.tokens(start, end) <= max_tokens:
+            units.append((start, end))
+            continue
+        # Oversized section: fall back to paragraph (blank-line) boundaries.
+        paragraph_start = start
+        for number in range(start + 1, end):
+            if not lines.lines[number - 1].strip() and lines.lines[number].strip():
+                units.append((paragraph_start, number))
+                paragraph_start = number
+        units.append((paragraph_start, end))
+    return [lines.chunk(start, end) for start, end in _pack(lines, units, max_tokens, overlap)]
+
+
+def chunk_lines(content: str, max_tokens: int = 256, overlap: int = 32) -> list[Chunk]:
+    lines = _Lines(content)
+    if not len(lines):
+        return [Chunk("", 1, 1)]
+    return [lines.chunk(start, end) for start, end in lines.windows(0, len(lines), max_tokens, overlap)]
+
+
+def chunk_fixed(content: str, chunk_size: int = 1000) -> list[Chunk]:
+    """Legacy fixed-width character slices, annotated with their line ranges."""
+    chunks: list[Chunk] = []
+    line = 1
+    for offset in range(0, len(content), chunk_size):
+        text = content[offset : offset + chunk_size]
+        newlines = text.count("\n")
+        end_line = line + newlines - (1 if text.endswith("\n") else 0)
+        chunks.append(Chunk(text, line, max(line, end_line)))
+        line += newlines
+    return chunks or [Chunk("", 1, 1)]
+
+
+def chunk_file(path: Path, content: str, max_tokens: int = 256, overlap: int = 32) -> list[Chunk]:
+    suffix = path.suffix.lower()
+    if suffix == ".py":
+        return chunk_python(content, max_tokens, overlap)
+    if suffix in (".md", ".markdown"):
+        return chunk_markdown(content, max_tokens, overlap)
+    return chunk_lines(content, max_tokens, overlap)
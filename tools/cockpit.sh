@@ -78,6 +78,7 @@ PROJECT_DIR="$(cd "$TARGET" && pwd)"
 PROJECT_KEY=$(printf '%s' "$PROJECT_DIR" | tr '/' '-')
 MEMORY_DIR="$HOME/.claude/projects/$PROJECT_KEY/memory"
 EVENT_LOG="${BESTAI_EVENT_LOG:-${XDG_CACHE_HOME:-$HOME/.cache}/bestai/events.jsonl}"
+EVENT_LOG_TOOL="$(dirname "$0")/event-log.py"
 ROUTE_LOG="$PROJECT_DIR/.bestai/router-decisions.jsonl"
 GPS_FILE="$PROJECT_DIR/.bestai/GPS.json"
 USAGE_JSONL="${BESTAI_USAGE_LOG:-$HOME/.claude/projects/$PROJECT_KEY/cache-usage.jsonl}"
@@ -115,7 +116,7 @@ percent() {
 }
 
 render_once() {
-    local proj_hash total_events blocks allows block_ratio_pct
+    local proj_hash total_events blocks allows block_ratio_pct counts
     local memory_files user_files
     local active_tasks blockers milestones_total milestones_done
     local total_input total_output total_tokens token_usage_pct_json token_usage_pct
@@ -130,7 +131,13 @@ render_once() {
     total_events=0
     blocks=0
     allows=0
-    if [ -f "$EVENT_LOG" ]; then
+    if [ -f "$EVENT_LOG" ] && command -v python3 >/dev/null 2>&1 && [ -f "$EVENT_LOG_TOOL" ] \
+        && counts=$(python3 "$EVENT_LOG_TOOL" --log "$EVENT_LOG" count --by action --project "$proj_hash" --json 2>/dev/null); then
+        read -r total_events blocks allows < <(printf '%s' "$counts" | jq -r '
+            [([.[].count] | add // 0),
+             ([.[] | select(.action == "BLOCK") | .count] | add // 0),
+             ([.[] | select(.action == "ALLOW") | .count] | add // 0)] | @tsv' 2>/dev/null) || true
+    elif [ -f "$EVENT_LOG" ]; then
         total_events=$(grep -c "\"project\":\"$proj_hash\"" "$EVENT_LOG" 2>/dev/null || true)
         blocks=$(grep "\"project\":\"$proj_hash\"" "$EVENT_LOG" 2>/dev/null | grep -c '"action":"BLOCK"' || true)
         allows=$(grep "\"project\":\"$proj_hash\"" "$EVENT_LOG" 2>/dev/null | grep -c '"action":"ALLOW"' || true)
@@ -0,0 +1,309 @@
+"""In-process port of the tools/cockpit.sh dashboard for long-lived callers.
+
+``Cockpit.snapshot`` returns the payload ``cockpit.sh --json`` prints and
+``render`` its text/compact views, without the jq/grep/md5sum pipelines the
+script forks per source. Every source (event-log counts, memory files,
+GPS.json, token usage and router logs) is cached on the file's
+(mtime_ns, size, inode) signature through ``StatCache``, so a warm snapshot
+only stats files, and the probes run concurrently when a thread pool is
+given.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional
+
+import event_log
+
+
+class StatCache:
+    """Values derived from files, rebuilt only when (mtime_ns, size, inode) changes."""
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple, tuple[tuple, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def signature(path: str) -> Optional[tuple]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self, path: str, build: Callable[[str], Any], key: Any = None) -> Any:
+        """``build(path)`` for the current file version; None when the file is missing."""
+        signature = self.signature(path)
+        slot = (path, key)
+        with self._lock:
+            cached = self._entries.get(slot)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        value = build(path) if signature is not None else None
+        with self._lock:
+            self._entries[slot] = (signature, value)
+        return value
+
+
+def _jsonl(path: str) -> list:
+    rows = []
+    with open(path, "rb") as fh:
+        for line in fh:
+            if line.strip():
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue
+    return rows
+
+
+def _alt(*values: Any) -> Any:
+    """jq's ``a // b``: the first value that is neither null nor false."""
+    for value in values:
+        if value is not None and value is not False:
+            return value
+    return None
+
+
+def _number(value: Any) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _breakdown(values: list[str], key: str) -> list[dict[str, Any]]:
+    # jq: group_by (key order), then a stable sort_by(-.count)
+    counts = Counter(values)
+    return [{key: name, "count": n} for name, n in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+
+
+def _percent(numerator: int, denominator: int) -> int:
+    return numerator * 100 // denominator if denominator > 0 else 0
+
+
+class Cockpit:
+    def __init__(
+        self, project_dir: str, env: Optional[dict] = None, cache: Optional[StatCache] = None
+    ) -> None:
+        env = os.environ if env is None else env
+        self.project_dir = os.path.abspath(project_dir)
+        project_key = self.project_dir.replace("/", "-")
+        home = env.get("HOME") or os.path.expanduser("~")
+        self.memory_dir = os.path.join(home, ".claude", "projects", project_key, "memory")
+        self.event_log = event_log.default_log_path(env)
+        self.route_log = os.path.join(self.project_dir, ".bestai", "router-decisions.jsonl")
+        self.gps_file = os.path.join(self.project_dir, ".bestai", "GPS.json")
+        self.usage_log = env.get("BESTAI_USAGE_LOG") or os.path.join(
+            home, ".claude", "projects", project_key, "cache-usage.jsonl"
+        )
+        self.token_limit = _number(env.get("BESTAI_TOKEN_LIMIT", "1000000"))
+        self.project_hash = event_log.project_hash(self.project_dir)
+        self.cache = cache or StatCache()
+
+    # --- probes -------------------------------------------------------------------
+
+    def events(self) -> dict[str, int]:
+        def build(path: str) -> dict[str, int]:
+            counts = event_log.count(path, by=("action",), projects=[self.project_hash])
+            return {
+                "total": sum(counts.values()),
+                "blocks": counts.get(("BLOCK",), 0),
+                "allows": counts.get(("ALLOW",), 0),
+            }
+
+        events = self.cache.get(self.event_log, build, key=self.project_hash) or {"total": 0, "blocks": 0, "allows": 0}
+        return dict(events, block_ratio_pct=_percent(events["blocks"], events["total"]))
+
+    def knowledge(self) -> dict[str, int]:
+        memory_files = user_files = 0
+        try:
+            with os.scandir(self.memory_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False):
+                        memory_files += 1
+                        if self.cache.get(entry.path, self._has_user):
+                            user_files += 1
+        except OSError:
+            pass
+        return {"memory_files": memory_files, "user_tagged_files": user_files}
+
+    @staticmethod
+    def _has_user(path: str) -> bool:
+        with open(path, "rb") as fh:
+            return b"[USER]" in fh.read()
+
+    def gps_document(self) -> Optional[dict]:
+        """Parsed GPS.json, or None when it is missing or not a JSON object."""
+
+        def build(path: str) -> Optional[dict]:
+            try:
+                with open(path, "rb") as fh:
+                    document = json.load(fh)
+            except (OSError, ValueError):
+                return None
+            return document if isinstance(document, dict) else None
+
+        return self.cache.get(self.gps_file, build)
+
+    def gps(self) -> dict[str, Any]:
+        document = self.gps_document()
+        name = os.path.basename(self.project_dir)
+        state = {"name": name, "objective": "", "active": 0, "blockers": 0, "milestones_done": 0, "milestones_total": 0}
+        if document is None:
+            return state
+
+        def length(value: Any) -> int:
+            return len(value) if isinstance(value, (list, dict, str)) else 0
+
+        project = document.get("project") if isinstance(document.get("project"), dict) else {}
+        milestones = document.get("milestones") if isinstance(document.get("milestones"), list) else []
+        state.update(
+            name=str(_alt(project.get("name")) or "") or name,
+            objective=str(_alt(project.get("main_objective")) or ""),
+            active=length(document.get("active_tasks")),
+            blockers=length(document.get("blockers")),
+            milestones_total=len(milestones),
+            milestones_done=sum(1 for m in milestones if isinstance(m, dict) and m.get("status") == "completed"),
+        )
+        return state
+
+    def usage(self) -> dict[str, Any]:
+        def build(path: str) -> tuple[int, int]:
+            total_in = total_out = 0
+            for row in _jsonl(path):
+                if not isinstance(row, dict):
+                    continue
+                usage = row.get("usage") if isinstance(row.get("usage"), dict) else {}
+                total_in += _number(_alt(usage.get("input_tokens"), row.get("input_tokens"), 0))
+                total_out += _number(_alt(usage.get("output_tokens"), row.get("output_tokens"), 0))
+            return total_in, total_out
+
+        totals = self.cache.get(self.usage_log, build)
+        usage = {
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "total_tokens": 0,
+            "limit_tokens": self.token_limit,
+            "usage_pct": None,
+        }
+        if totals is not None:
+            usage.update(input_tokens=totals[0], output_tokens=totals[1], total_tokens=sum(totals))
+            if self.token_limit > 0:
+                usage["usage_pct"] = _percent(usage["total_tokens"], self.token_limit)
+        return usage
+
+    def routing(self) -> dict[str, Any]:
+        def build(path: str) -> dict[str, Any]:
+            rows = [row for row in _jsonl(path) if isinstance(row, dict)]
+            route = lambda row: row.get("route") if isinstance(row.get("route"), dict) else {}  # noqa: E731
+            last = rows[-1] if rows else {}
+            return {
+                "last_vendor": str(_alt(last.get("vendor"), route(last).get("vendor"), "-")),
+                "last_depth": str(_alt(last.get("depth"), route(last).get("depth"), "-")),
+                "last_ts": str(_alt(last.get("ts"), route(last).get("ts"), "-")),
+                "total_decisions": len(rows),
+                "vendors": _breakdown(
+                    [str(_alt(r.get("vendor"), route(r).get("vendor"), "unknown")) for r in rows], "vendor"
+                ),
+                "depths": _breakdown([str(_alt(r.get("depth"), route(r).get("depth"), "unknown")) for r in rows], "depth"),
+            }
+
+        routing = self.cache.get(self.route_log, build)
+        if routing is None:
+            routing = {"last_vendor": "-", "last_depth": "-", "last_ts": "-", "total_decisions": 0, "vendors": [], "depths": []}
+        return routing
+
+    # --- payload ------------------------------------------------------------------
+
+    def snapshot(self, pool: Optional[Executor] = None) -> dict[str, Any]:
+        """The ``cockpit.sh --json`` payload; probes run concurrently on ``pool``."""
+        probes = (self.events, self.knowledge, self.gps, self.usage, self.routing)
+        if pool is None:
+            events, knowledge, gps, usage, routing = (probe() for probe in probes)
+        else:
+            events, knowledge, gps, usage, routing = (future.result() for future in [pool.submit(p) for p in probes])
+
+        notes = []
+        status = "PASS"
+        if events["total"] > 0 and events["block_ratio_pct"] >= 30:
+            status = "WARN"
+            notes.append("high_block_ratio")
+        if usage["usage_pct"] is not None and usage["usage_pct"] >= 85:
+            status = "WARN"
+            notes.append("token_budget_high")
+        if routing["total_decisions"] == 0:
+            notes.append("routing_history_empty")
+
+        return {
+            "project": {"name": gps["name"], "objective": gps["objective"], "dir": self.project_dir, "hash": self.project_hash},
+            "events": events,
+            "knowledge": knowledge,
+            "tasks": {
+                "active": gps["active"],
+                "blockers": gps["blockers"],
+                "milestones_done": gps["milestones_done"],
+                "milestones_total": gps["milestones_total"],
+            },
+            "usage": usage,
+            "routing": routing,
+            "health": {"status": status, "notes": notes or ["ok"]},
+        }
+
+
+def render(payload: dict[str, Any], compact: bool = False, cockpit: Optional[Cockpit] = None) -> str:
+    """``cockpit.sh`` text (or ``--compact``) output; ``cockpit`` adds the sources block."""
+    project, events, knowledge = payload["project"], payload["events"], payload["knowledge"]
+    tasks, usage, routing, health = payload["tasks"], payload["usage"], payload["routing"], payload["health"]
+    if usage["usage_pct"] is not None:
+        usage_human = f"{usage['total_tokens']}/{usage['limit_tokens']} ({usage['usage_pct']}%)"
+    elif cockpit is not None and usage["limit_tokens"] <= 0 and os.path.exists(cockpit.usage_log):
+        usage_human = str(usage["total_tokens"])
+    else:
+        usage_human = "n/a"
+    vendors = ", ".join(f"{v['vendor']}={v['count']}" for v in routing["vendors"]) or "-"
+    depths = ", ".join(f"{d['depth']}={d['count']}" for d in routing["depths"]) or "-"
+    block_line = f"{events['blocks']}/{events['total']} ({events['block_ratio_pct']}%)"
+    task_line = (
+        f"tasks: active={tasks['active']} blockers={tasks['blockers']} "
+        f"milestones={tasks['milestones_done']}/{tasks['milestones_total']}"
+    )
+
+    if compact:
+        lines = [
+            f"bestAI cockpit — {project['name']} [compact]",
+            f"health: {health['status']} | events.block={block_line} | usage={usage_human} | "
+            f"routing={routing['last_vendor']}/{routing['last_depth']}",
+            task_line,
+            f"routing.vendors: {vendors}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    lines = [f"bestAI cockpit — {project['name']}", "=" * 40]
+    if project["objective"]:
+        lines.append(f"objective: {project['objective']}")
+    lines += [
+        f"health: status={health['status']} notes={json.dumps(health['notes'], separators=(',', ':'))}",
+        f"events: total={events['total']} allow={events['allows']} block={events['blocks']} "
+        f"({events['block_ratio_pct']}% blocked)",
+        f"knowledge: files={knowledge['memory_files']} user_tagged={knowledge['user_tagged_files']}",
+        task_line,
+        f"usage: {usage_human}",
+        f"routing(last): vendor={routing['last_vendor']} depth={routing['last_depth']} ts={routing['last_ts']}",
+        f"routing(vendors): {vendors}",
+        f"routing(depths): {depths}",
+    ]
+    if cockpit is not None:
+        lines += [
+            "sources:",
+            f"  event_log={cockpit.event_log}",
+            f"  gps={cockpit.gps_file}",
+            f"  route_log={cockpit.route_log}",
+            f"  usage_log={cockpit.usage_log}",
+        ]
+    return "\n".join(lines) + "\n"
@@ -1,18 +1,43 @@
 import argparse
+import importlib.util
 import os
 import json
+import shlex
 import subprocess
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import sys
 
+from cockpit_report import Cockpit, render
+from event_log import count, default_log_path, last, latency, matching_hashes
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_DIR = os.path.join(ROOT_DIR, "tools")
+# A prefetched /doctor report older than this is re-run instead of shown.
+DOCTOR_TTL_S = 30
+
 class OmniConsole:
     def __init__(self):
         self.project_dir = os.getcwd()
         self.gps_path = ".bestai/GPS.json"
-        self.events_path = ".claude/events.jsonl"
+        self.events_path = default_log_path()
         self.vault_dir = ".bestai/vault"
         os.makedirs(self.vault_dir, exist_ok=True)
+        # status/heal/event-stats run in-process against warm caches; only
+        # doctor and dispatch still fork, straight into their scripts.
+        self.cockpit = Cockpit(self.project_dir)
+        self.cache = self.cockpit.cache
+        self.project_hashes = matching_hashes([self.project_dir])
+        self.pool = ThreadPoolExecutor(max_workers=6)
+        self.doctor_report = None
+        self.self_heal = None
+
+    def warm_up(self):
+        """Fill the caches and start the doctor probe while the user types."""
+        self.pool.submit(self.cockpit.snapshot)
+        self.doctor_report = (time.monotonic(), self.pool.submit(self.run_doctor))
 
     def print_c(self, text, color="\033[1;34m", prefix="CONDUCTOR >"):
         print(f"{color}{prefix}\033[0m {text}")
@@ -24,49 +49,107 @@ class OmniConsole:
         if not os.path.exists(self.gps_path):
             suggestions.append("Run '/init' to setup Global Project State.")
         else:
-            try:
-                with open(self.gps_path, 'r') as f:
-                    gps = json.load(f)
-                    milestones = gps.get("milestones", [])
-                    active = [m for m in milestones if m.get("status") != "completed"]
-                    if not active:
-                        suggestions.append("You have no active milestones. Type a new goal to start a swarm.")
-                    else:
-                        suggestions.append(f"Current milestone: {active[0].get('name')}. Type '/swarm claude' to continue work.")
-            except:
-                pass
+            gps = self.cockpit.gps_document()
+            milestones = gps.get("milestones", []) if gps else []
+            if gps is not None and isinstance(milestones, list):
+                active = [m for m in milestones if isinstance(m, dict) and m.get("status") != "completed"]
+                if not active:
+                    suggestions.append("You have no active milestones. Type a new goal to start a swarm.")
+                else:
+                    suggestions.append(f"Current milestone: {active[0].get('name')}. Type '/swarm claude' to continue work.")
 
         # Check for recent blocks (Learning opportunity)
-        if os.path.exists(self.events_path):
-            try:
-                with open(self.events_path, 'r') as f:
-                    lines = f.readlines()
-                    recent_blocks = [line for line in lines[-20:] if '"type":"BLOCK"' in line]
-                    if len(recent_blocks) > 2:
-                        suggestions.append("Agents were blocked recently. Run '/heal' to analyze mistakes and update rules.")
-            except:
-                pass
+        try:
+            # Last 20 events of this project, via the event log index; cached until the log changes.
+            recent = self.cache.get(
+                self.events_path, lambda path: last(path, 20, projects=self.project_hashes), key="recent"
+            ) or []
+            recent_blocks = [e for e in recent if e.get("action") == "BLOCK"]
+            if len(recent_blocks) > 2:
+                suggestions.append("Agents were blocked recently. Run '/heal' to analyze mistakes and update rules.")
+        except (OSError, ValueError) as exc:
+            self.print_c(f"event log unavailable: {exc}", "\033[0;31m", "SYSTEM >")
 
         if suggestions:
             self.print_c("💡 Recommendations based on current state:", "\033[1;33m", "SYSTEM >")
             for s in suggestions:
                 print(f"   - {s}")
 
+    def status(self, flags):
+        payload = self.cockpit.snapshot(self.pool)
+        if "--json" in flags:
+            print(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+        else:
+            sys.stdout.write(render(payload, compact="--compact" in flags, cockpit=self.cockpit))
+
+    def event_stats(self):
+        def build(path):
+            return (
+                count(path, by=("hook", "action"), projects=self.project_hashes),
+                latency(path, projects=self.project_hashes),
+            )
+
+        counts, latencies = self.cache.get(self.events_path, build, key="stats") or ({}, {})
+        if not counts:
+            self.print_c(f"No events for this project in {self.events_path}.")
+            return
+        self.print_c(f"Events for {self.project_dir} ({sum(counts.values())} total):")
+        for (hook, action), n in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])):
+            print(f"   {n:>6}  {hook or '-'} {action or '-'}")
+        for hook, stats in sorted(latencies.items()):
+            print(f"   {hook}: n={stats['n']} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms max={stats['max_ms']}ms")
+
+    def heal(self):
+        if self.self_heal is None:
+            spec = importlib.util.spec_from_file_location("self_heal", os.path.join(TOOLS_DIR, "self-heal.py"))
+            self.self_heal = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self.self_heal)
+        self.self_heal.analyze_and_heal(self.events_path)
+
+    def run_doctor(self):
+        return subprocess.run(
+            ["bash", os.path.join(ROOT_DIR, "doctor.sh"), self.project_dir],
+            capture_output=True,
+            text=True,
+        )
+
+    def doctor(self):
+        started, future = self.doctor_report or (0.0, None)
+        self.doctor_report = None
+        if future is None or time.monotonic() - started > DOCTOR_TTL_S:
+            future = self.pool.submit(self.run_doctor)
+        result = future.result()
+        sys.stdout.write(result.stdout)
+        sys.stderr.write(result.stderr)
+
+    def run_tool(self, script, args):
+        interpreter = sys.executable if script.endswith(".py") else "bash"
+        subprocess.run([interpreter, os.path.join(TOOLS_DIR, script), *args])
+
+    def dispatch(self, vendor, task):
+        self.run_tool("swarm-dispatch.sh", ["--vendor", vendor, "--task", task])
+
     def execute_command(self, cmd_string):
         parts = cmd_string.split()
         base_cmd = parts[0].lower()
         args = " ".join(parts[1:])
 
         if base_cmd == "/doctor":
-            subprocess.run("bestai doctor", shell=True)
+            self.doctor()
         elif base_cmd == "/status" or base_cmd == "/cockpit":
-            subprocess.run("bestai cockpit", shell=True)
+            self.status(parts[1:])
+        elif base_cmd == "/events":
+            self.event_stats()
         elif base_cmd == "/heal":
-            subprocess.run("bestai self-heal", shell=True)
-        elif base_cmd == "/permit":
-            subprocess.run(f"bestai permit {args}", shell=True)
-        elif base_cmd == "/nexus":
-            subprocess.run(f"bestai nexus {args}", shell=True)
+            self.heal()
+        elif base_cmd in ("/permit", "/nexus"):
+            try:
+                tool_args = shlex.split(args)
+            except ValueError as exc:
+                # An unbalanced quote is a typo, not a reason to end the session.
+                self.print_c(f"Cannot parse arguments ({exc}). Usage: {base_cmd} <args>")
+                return
+            self.run_tool("permit.sh" if base_cmd == "/permit" else "nexus.py", tool_args)
         elif base_cmd == "/swarm":
             # Simple wrapper
             vendor = "claude"
@@ -81,16 +164,24 @@ class OmniConsole:
                 return
 
             self.print_c(f"Dispatching task to {vendor}...", "\033[1;35m")
-            subprocess.run(f"bestai swarm --vendor {vendor} --task \"{task}\"", shell=True)
+            self.dispatch(vendor, task)
         elif base_cmd == "/help":
-            self.print_c("Available internal commands: /doctor, /status, /heal, /permit, /nexus, /swarm [vendor] [task]")
+            self.print_c(
+                "Available internal commands: /doctor, /status [--json|--compact], /events, /heal, /permit, /nexus, "
+                "/swarm [vendor] [task]"
+            )
         else:
             self.print_c(f"Unknown internal command: {base_cmd}. Type /help.")
 
-    def run(self, once_task=None):
+    def run(self, once_task=None, commands=()):
         if once_task:
             self.print_c("Dispatching one-shot task to Claude (Lead Architect).", "\033[1;34m")
-            subprocess.run(f"bestai swarm --vendor claude --task \"{once_task}\"", shell=True)
+            self.dispatch("claude", once_task)
+            return 0
+
+        if commands:
+            for command in commands:
+                self.execute_command(command)
             return 0
 
         if not sys.stdin.isatty():
@@ -104,6 +195,7 @@ class OmniConsole:
         print("\033[1;36m 🛸 bestAI OMNI-CONSOLE (v14.1) - The Living Swarm \033[0m")
         print("\033[1;36m===================================================\033[0m\n")
         
+        self.warm_up()
         self.analyze_health_and_suggest()
         
         print("\nType your instructions, or use '/' for tools (e.g. /doctor, /swarm gemini). Type 'exit' to leave.\n")
@@ -123,10 +215,10 @@ class OmniConsole:
                     if "?" in user_msg and len(user_msg.split()) < 10:
                         self.print_c("I am analyzing the question against GPS. If it requires deep research, I will spawn Gemini.", "\033[1;34m")
                         # Mock fast answer or dispatch
-                        subprocess.run(f"bestai swarm --vendor gemini --task \"Answer user question: {user_msg}\"", shell=True)
+                        self.dispatch("gemini", f"Answer user question: {user_msg}")
                     else:
                         self.print_c("I am delegating this task to Claude (Lead Architect) for implementation.", "\033[1;34m")
-                        subprocess.run(f"bestai swarm --vendor claude --task \"{user_msg}\"", shell=True)
+                        self.dispatch("claude", user_msg)
                         
             except KeyboardInterrupt:
                 print()
@@ -151,10 +243,17 @@ def build_parser():
         metavar="TASK",
         help="dispatch a single task in non-interactive mode and exit",
     )
+    parser.add_argument(
+        "--command",
+        action="append",
+        default=[],
+        metavar="CMD",
+        help="run a console command (e.g. '/status --json') without a TTY; repeatable",
+    )
     return parser
 
 
 if __name__ == "__main__":
     args = build_parser().parse_args()
     console = OmniConsole()
-    raise SystemExit(console.run(once_task=args.once))
+    raise SystemExit(console.run(once_task=args.once, commands=args.command))
@@ -0,0 +1,155 @@
+"""Embedding providers shared by vectorize-codebase.py and vector-query.py.
+
+Indexing and querying must embed text through the same code path, otherwise
+scores between a prompt and the stored chunks are meaningless.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Optional, Sequence
+
+from vector_store import load_numpy
+
+
+TOKEN_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def token_slot(token: str, dims: int) -> tuple[int, float]:
+    """Bucket index and sign for one token; memoized since code repeats identifiers."""
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    idx = int.from_bytes(digest[:4], "big") % dims
+    sign = -1.0 if digest[4] % 2 else 1.0
+    return idx, sign
+
+
+def _token_weights(text: str, dims: int) -> tuple[list[int], list[float]]:
+    indices: list[int] = []
+    weights: list[float] = []
+    for token, count in Counter(text.lower().split()).items():
+        idx, sign = token_slot(token, dims)
+        indices.append(idx)
+        weights.append(sign * count)
+    return indices, weights
+
+
+def cosine_ready_hash_embedding(text: str, dims: int = 384) -> list[float]:
+    """Deterministic fallback embedding (no external model dependency).
+
+    Each token adds +/-1 to a SHA-256-chosen bucket, then the vector is L2
+    normalized. Bucket sums are small integers, so summing per distinct token
+    and skipping empty buckets gives bit-identical floats to the naive loop.
+    """
+    buckets: dict[int, float] = {}
+    for idx, weight in zip(*_token_weights(text, dims)):
+        buckets[idx] = buckets.get(idx, 0.0) + weight
+
+    vec = [0.0] * dims
+    # L2 normalize to make cosine similarity meaningful.
+    norm = sum(v * v for v in buckets.values()) ** 0.5
+    if norm > 0:
+        for idx, value in buckets.items():
+            vec[idx] = value / norm
+    return vec
+
+
+def hash_embed_many(texts: Sequence[str], dims: int = 384, out: Optional[Any] = None) -> Any:
+    """Embed ``texts`` into rows of a preallocated ``(len(texts), dims)`` matrix.
+
+    ``out`` may be any float ndarray of that shape (e.g. a slice of a memmap);
+    one is allocated as float32 when omitted. Without NumPy this returns a list
+    of vectors instead.
+    """
+    np = load_numpy()
+    if np is None:
+        return [cosine_ready_hash_embedding(text, dims=dims) for text in texts]
+
+    if out is None:
+        out = np.zeros((len(texts), dims), dtype=np.float32)
+    elif out.shape != (len(texts), dims):
+        raise ValueError(f"out has shape {out.shape}, expected {(len(texts), dims)}")
+
+    flat_indices: list[int] = []
+    flat_weights: list[float] = []
+    for position, text in enumerate(texts):
+        indices, weights = _token_weights(text, dims)
+        base = position * dims
+        flat_indices.extend(base + idx for idx in indices)
+        flat_weights.extend(weights)
+
+    counts = np.bincount(
+        np.asarray(flat_indices, dtype=np.intp),
+        weights=np.asarray(flat_weights, dtype=np.float64),
+        minlength=len(texts) * dims,
+    )
+    counts = counts.astype(np.float64, copy=False).reshape(len(texts), dims)
+    # Python's ``** 0.5`` (not np.sqrt) keeps norms bit-identical to the scalar path.
+    norms = np.array([float(total) ** 0.5 for total in np.einsum("ij,ij->i", counts, counts)])
+    norms[norms <= 0] = 1.0
+    np.divide(counts, norms[:, None], out=counts)
+    out[...] = counts
+    return out
+
+
+@lru_cache(maxsize=4)
+def load_sentence_transformer(model_name: str) -> Optional[Any]:
+    """The named model, loaded once per process (loading dominates a query)."""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except Exception:
+        return None
+    return SentenceTransformer(model_name)
+
+
+def get_embedding(text: str, model: Optional[Any], dims: int = 384) -> list[float]:
+    if model is not None:
+        result = model.encode(text, normalize_embeddings=True)
+        return [float(v) for v in result]
+    return cosine_ready_hash_embedding(text, dims=dims)
+
+
+class BatchEmbedder:
+    """Embed many texts per call.
+
+    With a model, each call is one ``encode`` over the whole batch. The hash
+    fallback is CPU-bound pure Python, so with ``workers > 1`` it fans out
+    across a process pool that lives as long as the embedder.
+    """
+
+    def __init__(self, model: Optional[Any], dims: int = 384, batch_size: int = 64, workers: int = 1):
+        self.model = model
+        self.dims = dims
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if model is None and self.workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def __enter__(self) -> "BatchEmbedder":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def embed(self, texts: Sequence[str]) -> list[Sequence[float]]:
+        if not texts:
+            return []
+        if self.model is not None:
+            return list(self.model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True))
+        if self._pool is None:
+            return list(hash_embed_many(texts, dims=self.dims))
+        step = max(1, -(-len(texts) // (self.workers * 4)))
+        slices = [texts[i : i + step] for i in range(0, len(texts), step)]
+        vectors: list[Sequence[float]] = []
+        for block in self._pool.map(partial(hash_embed_many, dims=self.dims), slices):
+            vectors.extend(block)
+        return vectors
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""Batched ingest agent for hook events (hooks/hook-event.sh ``emit_event``).
+
+``serve`` listens on a Unix datagram socket (``<base>.sock``) and, for shell
+senders that cannot open a socket without forking, on a FIFO
+(``<base>.fifo``). ``<base>`` is ``$BESTAI_EVENT_AGENT`` or
+``${XDG_RUNTIME_DIR:-/tmp}/bestai-events-$UID``. Events are buffered and
+appended to their log with one write per batch (every ``--batch`` events or
+``--flush-ms``), optionally mirrored into the orchestrator's SQLite
+``events`` table. Project hashes are computed once per project dir.
+
+Wire format, one event per line (tab-separated, detail last)::
+
+    E1  <log path>  <ts>  <hook>  <action>  <tool>  <elapsed_ms>  <project dir>  <detail JSON>
+
+Lines are rendered exactly like ``emit_event``'s ``jq -cn`` output; events
+whose detail is not valid JSON are dropped, as jq would. Datagrams starting
+with ``{`` are control requests (``{"op": "ping"|"flush"|"stop"}``) answered
+to the sender's bound address. ``<base>.pid`` exists while the agent accepts
+events; ``emit_event`` checks it with builtins and otherwise appends directly.
+"""
+
+from __future__ import annotations
+
+import argparse
+import errno
+import hashlib
+import json
+import multiprocessing
+import os
+import selectors
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+MAX_DATAGRAM = 64 * 1024
+HASH_CACHE_SIZE = 4096
+ORCHESTRATOR_EVENTS_DDL = """
+CREATE TABLE IF NOT EXISTS events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  type TEXT NOT NULL,
+  severity TEXT DEFAULT 'info',
+  agent_id TEXT,
+  task_id TEXT,
+  payload JSON,
+  created_at INTEGER
+)
+"""
+WARNING_ACTIONS = {"BLOCK", "OPEN", "REOPEN", "ERROR"}
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def default_base() -> str:
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.environ.get("BESTAI_EVENT_AGENT") or os.path.join(runtime, f"bestai-events-{os.getuid()}")
+
+
+def encode_event(log_path: str, ts: str, hook: str, action: str, tool: str, elapsed_ms: int, project_dir: str, detail: str) -> bytes:
+    return "\t".join(["E1", log_path, ts, hook, action, tool, str(elapsed_ms), project_dir, detail]).encode("utf-8") + b"\n"
+
+
+class Ingest:
+    """Parses wire lines into log lines and writes them in batches."""
+
+    def __init__(self, batch_size: int, flush_ms: float, orchestrator_db: Optional[str] = None):
+        self.batch_size = batch_size
+        self.flush_s = flush_ms / 1000.0
+        self.pending: dict[str, list[bytes]] = {}
+        self.pending_count = 0
+        self.oldest: Optional[float] = None
+        self.hashes: dict[str, str] = {}
+        self.stats = {"received": 0, "written": 0, "invalid": 0, "batches": 0}
+        self.db: Optional[sqlite3.Connection] = None
+        self.db_rows: list[tuple] = []
+        if orchestrator_db:
+            os.makedirs(os.path.dirname(os.path.abspath(orchestrator_db)), exist_ok=True)
+            self.db = sqlite3.connect(orchestrator_db, timeout=5)
+            self.db.execute("PRAGMA journal_mode = WAL")
+            self.db.execute(ORCHESTRATOR_EVENTS_DDL)
+
+    def project_hash(self, src: str) -> str:
+        digest = self.hashes.get(src)
+        if digest is None:
+            if len(self.hashes) >= HASH_CACHE_SIZE:
+                self.hashes.clear()
+            digest = self.hashes[src] = hashlib.md5(os.fsencode(src)).hexdigest()[:16]
+        return digest
+
+    def feed(self, line: bytes) -> None:
+        self.stats["received"] += 1
+        parts = line.decode("utf-8", "surrogateescape").split("\t", 8)
+        if len(parts) != 9 or parts[0] != "E1":
+            self.stats["invalid"] += 1
+            return
+        _, log_path, ts, hook, action, tool, elapsed, project_dir, detail = parts
+        try:
+            elapsed_ms = int(elapsed)
+            detail_obj = json.loads(detail or "{}")
+        except ValueError:
+            self.stats["invalid"] += 1
+            return
+        event = {
+            "ts": ts,
+            "hook": hook,
+            "action": action,
+            "tool": tool,
+            "project": self.project_hash(project_dir),
+            "elapsed_ms": elapsed_ms,
+            "detail": detail_obj,
+        }
+        rendered = json.dumps(event, separators=(",", ":"), ensure_ascii=False)
+        self.pending.setdefault(log_path, []).append(rendered.encode("utf-8", "surrogateescape") + b"\n")
+        if self.db is not None:
+            severity = "warning" if action in WARNING_ACTIONS else "info"
+            self.db_rows.append(("hook:event", severity, None, None, rendered, int(time.time() * 1000)))
+        self.pending_count += 1
+        if self.oldest is None:
+            self.oldest = time.monotonic()
+
+    def due(self) -> bool:
+        return self.pending_count >= self.batch_size or (
+            self.oldest is not None and time.monotonic() - self.oldest >= self.flush_s
+        )
+
+    def timeout(self) -> Optional[float]:
+        if self.oldest is None:
+            return None
+        return max(0.0, self.flush_s - (time.monotonic() - self.oldest))
+
+    def flush(self) -> None:
+        for log_path, lines in self.pending.items():
+            try:
+                os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+                fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+                try:
+                    os.write(fd, b"".join(lines))
+                finally:
+                    os.close(fd)
+                self.stats["written"] += len(lines)
+            except OSError:
+                self.stats["invalid"] += len(lines)
+        if self.db is not None and self.db_rows:
+            try:
+                with self.db:
+                    self.db.executemany(
+                        "INSERT INTO events (type, severity, agent_id, task_id, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        self.db_rows,
+                    )
+            except sqlite3.Error:
+                pass
+        if self.pending_count:
+            self.stats["batches"] += 1
+        self.pending.clear()
+        self.db_rows = []
+        self.pending_count = 0
+        self.oldest = None
+
+
+# --- server ------------------------------------------------------------------
+
+
+def control(base: str, op: str, timeout: float = 2.0) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bestai-ingest.") as tmp, socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        reply_path = os.path.join(tmp, "reply.sock")
+        sock.bind(reply_path)
+        sock.settimeout(timeout)
+        sock.sendto(json.dumps({"op": op}).encode("utf-8"), base + ".sock")
+        return json.loads(sock.recv(MAX_DATAGRAM))
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def serve(base: str, batch_size: int, flush_ms: float, orchestrator_db: Optional[str]) -> int:
+    sock_path, fifo_path, pid_path = base + ".sock", base + ".fifo", base + ".pid"
+    try:
+        control(base, "ping", timeout=0.5)
+        print(f"event-ingest: already running on {sock_path}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError):
+        pass
+    for path in (pid_path, sock_path, fifo_path):
+        _unlink(path)  # leftovers of a dead agent
+
+    ingest = Ingest(batch_size, flush_ms, orchestrator_db)
+    started = time.time()
+    old_umask = os.umask(0o077)
+    try:
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        server.bind(sock_path)
+        os.mkfifo(fifo_path, 0o600)
+    finally:
+        os.umask(old_umask)
+    server.setblocking(False)
+    try:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+    except OSError:
+        pass
+    fifo_fd = os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK)
+    # Our own writer keeps the FIFO from hitting EOF whenever a hook closes it.
+    fifo_keepalive = os.open(fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ, "socket")
+    selector.register(fifo_fd, selectors.EVENT_READ, "fifo")
+    # Signals wake the selector through a self-pipe; select() itself is restarted.
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    selector.register(wake_r, selectors.EVENT_READ, "signal")
+    signal.set_wakeup_fd(wake_w)
+    stopping = False
+    fifo_tail = b""
+
+    def on_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    with open(pid_path, "w") as fh:
+        fh.write(f"{os.getpid()}\n")
+
+    def drain_fifo() -> None:
+        nonlocal fifo_tail
+        while True:
+            try:
+                data = os.read(fifo_fd, MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            if not data:
+                return
+            lines = (fifo_tail + data).split(b"\n")
+            fifo_tail = lines.pop()
+            for line in lines:
+                if line:
+                    ingest.feed(line)
+            if ingest.pending_count >= ingest.batch_size:
+                ingest.flush()
+
+    def drain_socket() -> None:
+        nonlocal stopping
+        while True:
+            try:
+                data, addr = server.recvfrom(MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            if data.startswith(b"{"):
+                try:
+                    op = json.loads(data).get("op")
+                except ValueError:
+                    op = None
+                if op in ("flush", "stop"):
+                    drain_fifo()
+                    ingest.flush()
+                reply = {
+                    "ok": op in ("ping", "flush", "stop"),
+                    "pid": os.getpid(),
+                    "uptime_s": round(time.time() - started, 3),
+                    **ingest.stats,
+                }
+                if op == "stop":
+                    stopping = True
+                if addr:
+                    try:
+                        server.sendto(json.dumps(reply).encode("utf-8"), addr)
+                    except OSError:
+                        pass
+                continue
+            for line in data.split(b"\n"):
+                if line:
+                    ingest.feed(line)
+            if ingest.pending_count >= ingest.batch_size:
+                ingest.flush()
+
+    try:
+        while not stopping:
+            try:
+                ready = selector.select(ingest.timeout())
+            except InterruptedError:
+                ready = []
+            for key, _ in ready:
+                if key.data == "socket":
+                    drain_socket()
+                elif key.data == "fifo":
+                    drain_fifo()
+            if ingest.due():
+                ingest.flush()
+    finally:
+        # Stop advertising first, then pick up whatever was already queued.
+        _unlink(pid_path)
+        drain_fifo()
+        drain_socket()
+        ingest.flush()
+        selector.close()
+        server.close()
+        os.close(fifo_fd)
+        os.close(fifo_keepalive)
+        signal.set_wakeup_fd(-1)
+        os.close(wake_r)
+        os.close(wake_w)
+        _unlink(fifo_path)
+        _unlink(sock_path)
+    return 0
+
+
+def spawn_background(base: str, batch_size: int, flush_ms: float, orchestrator_db: Optional[str]) -> int:
+    cmd = [sys.executable, os.path.abspath(__file__), "serve", "--base", base, "--batch", str(batch_size), "--flush-ms", str(flush_ms)]
+    if orchestrator_db:
+        cmd += ["--orchestrator-db", orchestrator_db]
+    subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        if os.path.exists(base + ".pid"):
+            try:
+                control(base, "ping", timeout=0.5)
+                print(f"event-ingest: listening on {base}.sock and {base}.fifo")
+                return 0
+            except (OSError, ValueError):
+                pass
+        time.sleep(0.05)
+    print("event-ingest: agent did not come up", file=sys.stderr)
+    return 1
+
+
+# --- benchmark ---------------------------------------------------------------
+
+
+def _send_burst(sock_path: str, log_path: str, count: int, sender: int) -> None:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        for i in range(count):
+            message = encode_event(log_path, "2026-01-01T00:00:00Z", "bench", "ALLOW", "Bash", i % 50, f"/swarm/agent-{sender}", '{"i":%d}' % i)
+            while True:
+                try:
+                    sock.sendto(message, sock_path)
+                    break
+                except OSError as exc:  # receiver queue full: back off briefly
+                    if exc.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                        raise
+                    time.sleep(0.0005)
+
+
+def _emit_loop_seconds(env: dict, count: int) -> float:
+    script = (
+        f"source '{ROOT_DIR}/hooks/hook-event.sh'; "
+        f"for i in $(seq {count}); do emit_event bench ALLOW '{{\"i\":1}}'; done"
+    )
+    started = time.perf_counter()
+    subprocess.run(["bash", "-c", script], env=env, check=True)
+    return time.perf_counter() - started
+
+
+def _wait_lines(path: str, expected: int, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with open(path, "rb") as fh:
+                if fh.read().count(b"\n") >= expected:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def bench(events: int, senders: int, shell_events: int, batch_size: int, flush_ms: float) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bestai-ingest-bench.") as tmp:
+        base = os.path.join(tmp, "agent")
+        agent = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "serve", "--base", base, "--batch", str(batch_size), "--flush-ms", str(flush_ms)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.time() + 5
+            while not os.path.exists(base + ".pid") and time.time() < deadline:
+                time.sleep(0.01)
+
+            burst_log = os.path.join(tmp, "burst.jsonl")
+            per_sender = max(1, events // senders)
+            total = per_sender * senders
+            ctx = multiprocessing.get_context("fork") if hasattr(os, "fork") else multiprocessing.get_context()
+            workers = [ctx.Process(target=_send_burst, args=(base + ".sock", burst_log, per_sender, n)) for n in range(senders)]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            sent_s = time.perf_counter() - started
+            complete = _wait_lines(burst_log, total, timeout=60)
+            burst_s = time.perf_counter() - started
+            stats = control(base, "ping")
+
+            env = dict(os.environ, CLAUDE_PROJECT_DIR=tmp, BESTAI_EVENT_AGENT=base)
+            env["BESTAI_EVENT_LOG"] = os.path.join(tmp, "agent-shell.jsonl")
+            agent_shell_s = _emit_loop_seconds(env, shell_events)
+            _wait_lines(env["BESTAI_EVENT_LOG"], shell_events, timeout=10)
+            with open(env["BESTAI_EVENT_LOG"], "rb") as fh:
+                agent_lines = fh.read().count(b"\n")
+            env["BESTAI_EVENT_AGENT"] = os.path.join(tmp, "absent")
+            env["BESTAI_EVENT_LOG"] = os.path.join(tmp, "direct-shell.jsonl")
+            direct_shell_s = _emit_loop_seconds(env, shell_events)
+        finally:
+            agent.terminate()
+            agent.wait(timeout=10)
+
+    return {
+        "events": total,
+        "senders": senders,
+        "complete": complete,
+        "send_events_per_sec": round(total / sent_s),
+        "ingest_events_per_sec": round(total / burst_s),
+        "batches": stats["batches"],
+        "avg_batch": round(stats["written"] / stats["batches"], 1) if stats["batches"] else 0,
+        "shell_events": shell_events,
+        "emit_event_ms_agent": round(agent_shell_s * 1000 / shell_events, 3),
+        "emit_event_ms_direct": round(direct_shell_s * 1000 / shell_events, 3),
+        "agent_shell_lines": agent_lines,
+    }
+
+
+def main() -> int:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--base", default=default_base(), help="Path prefix for .sock/.fifo/.pid")
+    tuning = argparse.ArgumentParser(add_help=False)
+    tuning.add_argument("--batch", type=int, default=512, help="Flush after this many events (default: 512)")
+    tuning.add_argument("--flush-ms", type=float, default=50, help="Flush buffered events after N ms (default: 50)")
+    parser = argparse.ArgumentParser(description="bestAI event ingest agent")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_p = sub.add_parser("serve", parents=[common, tuning], help="Run the agent")
+    serve_p.add_argument("--background", action="store_true", help="Detach and return once listening")
+    serve_p.add_argument("--orchestrator-db", help="Also insert events into this SQLite file's events table")
+    sub.add_parser("status", parents=[common], help="Print agent counters as JSON")
+    sub.add_parser("flush", parents=[common], help="Write buffered events now")
+    sub.add_parser("stop", parents=[common], help="Flush and stop the agent")
+    bench_p = sub.add_parser("bench", parents=[tuning], help="Burst throughput with parallel senders")
+    bench_p.add_argument("--events", type=int, default=10000, help="Events in the burst (default: 10000)")
+    bench_p.add_argument("--senders", type=int, default=8, help="Parallel sender processes (default: 8)")
+    bench_p.add_argument("--shell-events", type=int, default=200, help="emit_event calls timed per path (default: 200)")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        batch = max(1, args.batch)
+        if args.background:
+            return spawn_background(args.base, batch, args.flush_ms, args.orchestrator_db)
+        return serve(args.base, batch, args.flush_ms, args.orchestrator_db)
+    if args.command == "bench":
+        print(json.dumps(bench(max(1, args.events), max(1, args.senders), max(1, args.shell_events), max(1, args.batch), args.flush_ms)))
+        return 0
+    try:
+        reply = control(args.base, "ping" if args.command == "status" else args.command)
+    except (OSError, ValueError):
+        print(f"event-ingest: not running ({args.base}.sock)", file=sys.stderr)
+        return 1
+    print(json.dumps(reply))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Query the hook event log through its sidecar index (see tools/event_log.py).
+
+    event-log.py index                                  refresh <log>.idx.sqlite, print line counts
+    event-log.py tail [-n N] [filters]                  newest N events as JSONL, oldest first
+    event-log.py count [--by hook,action] [filters]     "count<TAB>key..." lines, or --json
+    event-log.py latency [--quantile 0.95] [filters]    per-hook n/avg/max/p50/pNN elapsed_ms
+
+Filters: --project HASH, --hook NAME, --action NAME (each repeatable; values OR-ed),
+--since TS (ISO UTC, inclusive) and, for count/latency, --window N (last N log lines).
+--project-dir DIR adds the hashes hooks record for DIR (as given and absolute).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from event_log import count, default_log_path, latency, last, matching_hashes, open_index
+
+
+def projects(args: argparse.Namespace) -> list[str]:
+    return list(args.project) + matching_hashes(args.project_dir)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="bestAI event log queries")
+    parser.add_argument("--log", default=None, help="Event log (default: $BESTAI_EVENT_LOG or ~/.cache/bestai/events.jsonl)")
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("--project", action="append", default=[], metavar="HASH", help="Project hash")
+    filters.add_argument("--project-dir", action="append", default=[], metavar="DIR", help="Project directory")
+    filters.add_argument("--hook", action="append", default=[], help="Hook name")
+    filters.add_argument("--since", help="Only events with ts >= SINCE")
+    windowed = argparse.ArgumentParser(add_help=False)
+    windowed.add_argument("--window", type=int, default=None, metavar="N", help="Only the last N log lines")
+    windowed.add_argument("--json", action="store_true", help="Print JSON")
+
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("index", help="Refresh the sidecar index")
+    tail_parser = sub.add_parser("tail", parents=[filters], help="Newest events")
+    tail_parser.add_argument("-n", type=int, default=20, help="Number of events (default: 20)")
+    tail_parser.add_argument("--action", action="append", default=[], help="Action name")
+    count_parser = sub.add_parser("count", parents=[filters, windowed], help="Count events by key")
+    count_parser.add_argument("--action", action="append", default=[], help="Action name")
+    count_parser.add_argument(
+        "--by", default="hook,action", help="Comma-separated project/hook/action/tool; empty for a total"
+    )
+    latency_parser = sub.add_parser("latency", parents=[filters, windowed], help="Per-hook elapsed_ms percentiles")
+    latency_parser.add_argument("--quantile", type=float, default=0.95, help="Quantile to report (default: 0.95)")
+    args = parser.parse_args()
+
+    log_path = args.log or default_log_path()
+
+    if args.command == "index":
+        conn = open_index(log_path)
+        stats = conn.execute("SELECT COUNT(*), COALESCE(SUM(valid), 0) FROM events").fetchone()
+        conn.close()
+        print(f"event-log: {stats[0]} lines ({stats[1]} events) indexed for {log_path}")
+        return 0
+
+    if args.command == "tail":
+        events = last(log_path, max(0, args.n), projects(args), args.hook, args.action, args.since)
+        sys.stdout.write("".join(json.dumps(event, separators=(",", ":")) + "\n" for event in events))
+        return 0
+
+    window = args.window if args.window and args.window > 0 else None
+    if args.command == "count":
+        by = [column.strip() for column in args.by.split(",") if column.strip()]
+        try:
+            groups = count(log_path, by, projects(args), args.hook, args.action, args.since, window)
+        except ValueError as exc:
+            print(f"event-log: {exc}", file=sys.stderr)
+            return 2
+        ordered = sorted(groups.items(), key=lambda item: (-item[1], [str(value) for value in item[0]]))
+        if args.json:
+            print(json.dumps([{**dict(zip(by, key)), "count": total} for key, total in ordered]))
+        else:
+            sys.stdout.write("".join("\t".join([str(total), *map(str, key)]) + "\n" for key, total in ordered))
+        return 0
+
+    if not 0 < args.quantile <= 1:
+        print("event-log: --quantile must be in (0, 1]", file=sys.stderr)
+        return 2
+    stats = latency(log_path, args.quantile, projects(args), args.hook, args.since, window)
+    if args.json:
+        print(json.dumps(stats, sort_keys=True))
+    else:
+        for hook in sorted(stats):
+            row = stats[hook]
+            print(hook + "\t" + " ".join(f"{name}={value}" for name, value in row.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
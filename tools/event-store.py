@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Segmented event archive (see tools/event_store.py).
+
+    event-store.py seal [--max-events N]       live log -> sealed segments (rotate_event_log)
+    event-store.py compact                     rollups for new segments, merge small segments
+    event-store.py segments                    one footer per line (JSON)
+    event-store.py query [filters]             matching events, segments then live log (JSONL)
+    event-store.py rollups [--granularity hour|day] [filters]
+                                               hourly/daily counts + latency histograms (JSON)
+
+Filters: --since/--until TS (ISO UTC, inclusive), --project HASH, --hook NAME, --action NAME
+(repeatable). Rollups cover sealed segments only; the live log is queried directly.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+from event_log import default_log_path
+from event_store import (
+    SEGMENT_LINES,
+    available_codecs,
+    compact,
+    query,
+    read_footer,
+    rollups,
+    seal,
+    segment_paths,
+    segments_dir,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="bestAI segmented event store")
+    parser.add_argument("--log", default=None, help="Live event log (default: $BESTAI_EVENT_LOG or ~/.cache/bestai/events.jsonl)")
+    sizing = argparse.ArgumentParser(add_help=False)
+    sizing.add_argument(
+        "--segment-lines",
+        type=int,
+        default=int(os.environ.get("BESTAI_EVENT_SEGMENT_LINES") or SEGMENT_LINES),
+        help=f"Lines per sealed segment (default: $BESTAI_EVENT_SEGMENT_LINES or {SEGMENT_LINES})",
+    )
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("--since", help="Only events with ts >= SINCE")
+    filters.add_argument("--until", help="Only events with ts <= UNTIL")
+    filters.add_argument("--project", action="append", default=[], metavar="HASH", help="Project hash")
+    filters.add_argument("--hook", action="append", default=[], help="Hook name")
+    filters.add_argument("--action", action="append", default=[], help="Action name")
+
+    sub = parser.add_subparsers(dest="command", required=True)
+    seal_parser = sub.add_parser("seal", parents=[sizing], help="Seal the live log once it exceeds --max-events")
+    seal_parser.add_argument("--max-events", type=int, default=5000, help="Seal above this many lines (default: 5000)")
+    seal_parser.add_argument("--codec", default="gzip", choices=("gzip", "zstd"), help="Segment compression")
+    sub.add_parser("compact", parents=[sizing], help="Roll up new segments and merge undersized ones")
+    sub.add_parser("segments", help="List sealed segment footers")
+    query_parser = sub.add_parser("query", parents=[filters], help="Stream matching events")
+    query_parser.add_argument("--no-live", action="store_true", help="Only read sealed segments")
+    rollup_parser = sub.add_parser("rollups", parents=[filters], help="Hourly/daily rollups")
+    rollup_parser.add_argument("--granularity", default="hour", choices=("hour", "day"))
+    args = parser.parse_args()
+
+    log_path = args.log or default_log_path()
+
+    if args.command == "seal":
+        if args.codec not in available_codecs():
+            print(f"event-store: codec '{args.codec}' needs the zstandard module", file=sys.stderr)
+            return 2
+        stats = seal(log_path, max(0, args.max_events), args.segment_lines, args.codec)
+        if stats["locked"]:
+            print("event-store: another seal is running")
+        else:
+            print(f"event-store: sealed {stats['sealed_lines']} lines into {stats['segments']} segments")
+        return 0
+    if args.command == "compact":
+        stats = compact(log_path, max(1, args.segment_lines))
+        print(
+            f"event-store: {stats['segments']} segments "
+            f"({stats['rolled_up']} rolled up, {stats['merged']} merged away)"
+        )
+        return 0
+    if args.command == "segments":
+        for path in segment_paths(segments_dir(log_path)):
+            footer = read_footer(path)
+            if footer is not None:
+                print(json.dumps({"path": path, **footer}))
+        return 0
+    if args.command == "query":
+        stats: dict[str, int] = {}
+        for event in query(
+            log_path, args.since, args.until, args.project, args.hook, args.action, not args.no_live, stats
+        ):
+            sys.stdout.write(json.dumps(event, separators=(",", ":")) + "\n")
+        print(
+            f"event-store: {stats['segments_read']} segments read, {stats['segments_skipped']} skipped by footer",
+            file=sys.stderr,
+        )
+        return 0
+    print(json.dumps(rollups(log_path, args.granularity, args.since, args.until, args.project, args.hook, args.action)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
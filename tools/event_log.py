@@ -0,0 +1,446 @@
+"""Streaming reader and sidecar index for the hook event log.
+
+``hooks/hook-event.sh`` appends one JSON object per line to
+``$BESTAI_EVENT_LOG`` (default ``~/.cache/bestai/events.jsonl``); on shared
+hosts that file reaches millions of lines. Readers here never load it whole:
+
+* ``iter_events`` parses forward in fixed-size chunks,
+* ``reverse_lines`` reads backwards from EOF, so an unfiltered ``last`` costs
+  only the bytes it returns,
+* ``refresh_index`` maintains ``<log>.idx.sqlite``, one row per line::
+
+      events  offset, length, valid, ts, project, hook, action, tool, elapsed_ms
+      meta    version, inode, head (digest of the first bytes), size
+
+  keyed by (project, hook, action) and ts. Only bytes appended since the last
+  refresh are parsed; a replaced or truncated log (``rotate_event_log``)
+  is re-indexed from scratch.
+
+``last``, ``count`` and ``latency`` answer the questions stats.sh, cockpit.sh,
+task-router.sh and the conductor used to grep the log for; ``scan`` streams
+matching events past a checkpoint offset (self-heal.py).
+Legacy ``.claude/events.jsonl`` rows (``type``/``details``) are read as
+``action``/``detail``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import sqlite3
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+INDEX_SUFFIX = ".idx.sqlite"
+INDEX_VERSION = "1"
+CHUNK_SIZE = 1 << 20
+HEAD_BYTES = 256
+INSERT_BATCH = 5000
+GROUP_COLUMNS = ("project", "hook", "action", "tool")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS events (
+    offset INTEGER PRIMARY KEY,
+    length INTEGER NOT NULL,
+    valid INTEGER NOT NULL,
+    ts TEXT,
+    project TEXT,
+    hook TEXT,
+    action TEXT,
+    tool TEXT,
+    elapsed_ms INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_by_key ON events (project, hook, action);
+CREATE INDEX IF NOT EXISTS events_by_ts ON events (ts);
+"""
+
+
+def default_log_path(env: Optional[dict] = None) -> str:
+    """Same resolution as hook-event.sh."""
+    env = os.environ if env is None else env
+    if env.get("BESTAI_EVENT_LOG"):
+        return env["BESTAI_EVENT_LOG"]
+    cache = env.get("XDG_CACHE_HOME") or os.path.join(env.get("HOME", os.path.expanduser("~")), ".cache")
+    return os.path.join(cache, "bestai", "events.jsonl")
+
+
+def project_hash(path: str) -> str:
+    """``_bestai_project_hash`` (md5 branch): first 16 hex digits of md5(path)."""
+    return hashlib.md5(os.fsencode(path)).hexdigest()[:16]
+
+
+def index_path(log_path: str) -> str:
+    return log_path + INDEX_SUFFIX
+
+
+def parse_line(line: bytes) -> Optional[dict[str, Any]]:
+    """One log line as an event dict, or None when it is not a JSON object."""
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(event, dict):
+        return None
+    if "action" not in event and "type" in event:
+        event["action"] = event["type"]
+    if "detail" not in event and "details" in event:
+        event["detail"] = event["details"]
+    return event
+
+
+def _complete_lines(fh, start: int, end: int) -> Iterator[tuple[int, bytes]]:
+    """(offset, line) for every newline-terminated line in ``[start, end)``."""
+    fh.seek(start)
+    pos = start
+    pending = b""
+    while pos < end:
+        chunk = fh.read(min(CHUNK_SIZE, end - pos))
+        if not chunk:
+            break
+        pos += len(chunk)
+        data = pending + chunk
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            pending = data
+            continue
+        offset = pos - len(data)
+        for line in data[:cut].split(b"\n"):
+            yield offset, line
+            offset += len(line) + 1
+        pending = data[cut + 1 :]
+
+
+def iter_events(log_path: str, start: int = 0) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Stream (offset, event) pairs from ``start``; malformed lines are skipped."""
+    try:
+        fh = open(log_path, "rb")
+    except OSError:
+        return
+    with fh:
+        end = os.fstat(fh.fileno()).st_size
+        for offset, line in _complete_lines(fh, start, end):
+            event = parse_line(line)
+            if event is not None:
+                yield offset, event
+
+
+def reverse_lines(log_path: str, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Lines from newest to oldest, reading backwards from EOF."""
+    try:
+        fh = open(log_path, "rb")
+    except OSError:
+        return
+    with fh:
+        pos = os.fstat(fh.fileno()).st_size
+        tail = b""
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            fh.seek(pos)
+            data = fh.read(step) + tail
+            lines = data.split(b"\n")
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if tail:
+            yield tail
+
+
+def _row(offset: int, line: bytes) -> tuple:
+    event = parse_line(line)
+    if event is None:
+        return (offset, len(line), 0, None, None, None, None, None, None)
+    elapsed = event.get("elapsed_ms")
+    elapsed = int(elapsed) if isinstance(elapsed, (int, float)) and not isinstance(elapsed, bool) else None
+    fields = [event.get(key) for key in ("ts", "project", "hook", "action", "tool")]
+    fields = [value if isinstance(value, str) else None for value in fields]
+    return (offset, len(line), 1, *fields, elapsed)
+
+
+def _version(conn: sqlite3.Connection) -> Optional[str]:
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.DatabaseError:
+        return None
+    return row[0] if row else None
+
+
+def connect(log_path: str) -> sqlite3.Connection:
+    """Open (creating if needed) the sidecar index; in-memory when not writable."""
+    try:
+        conn = sqlite3.connect(index_path(log_path), timeout=5, isolation_level=None)
+        if _version(conn) != INDEX_VERSION:
+            _reset(conn)
+        return conn
+    except sqlite3.Error:
+        # Read-only cache dir or a corrupt sidecar: index this process's view in memory.
+        conn = sqlite3.connect(":memory:", isolation_level=None)
+        _reset(conn)
+        return conn
+
+
+def _reset(conn: sqlite3.Connection) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for table in ("meta", "events"):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        for statement in SCHEMA.strip().split(";"):
+            if statement.strip():
+                conn.execute(statement)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('version', ?)", (INDEX_VERSION,))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _meta(conn: sqlite3.Connection) -> dict[str, str]:
+    return dict(conn.execute("SELECT key, value FROM meta"))
+
+
+def refresh_index(conn: sqlite3.Connection, log_path: str) -> dict[str, int]:
+    """Index lines appended since the last refresh; returns {lines, added, rebuilt}."""
+    stats = {"lines": 0, "added": 0, "rebuilt": 0}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        try:
+            fh = open(log_path, "rb")
+        except OSError:
+            fh = None
+        meta = _meta(conn)
+        if fh is None:
+            if meta.get("size", "0") != "0":
+                conn.execute("DELETE FROM events")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('size', '0')")
+                stats["rebuilt"] = 1
+            conn.execute("COMMIT")
+            return stats
+        with fh:
+            st = os.fstat(fh.fileno())
+            indexed = int(meta.get("size", "0"))
+            if indexed:
+                same_file = (
+                    meta.get("inode") == str(st.st_ino)
+                    and indexed <= st.st_size
+                    and meta.get("head") == _digest(fh.read(min(indexed, HEAD_BYTES)))
+                )
+                if not same_file:
+                    conn.execute("DELETE FROM events")
+                    indexed = 0
+                    stats["rebuilt"] = 1
+            batch: list[tuple] = []
+            end = indexed
+            for offset, line in _complete_lines(fh, indexed, st.st_size):
+                batch.append(_row(offset, line))
+                end = offset + len(line) + 1
+                if len(batch) >= INSERT_BATCH:
+                    conn.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    stats["added"] += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                stats["added"] += len(batch)
+            fh.seek(0)
+            head = _digest(fh.read(min(end, HEAD_BYTES)))
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (("inode", str(st.st_ino)), ("head", head), ("size", str(end))),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    stats["lines"] = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    return stats
+
+
+def open_index(log_path: str) -> sqlite3.Connection:
+    conn = connect(log_path)
+    refresh_index(conn, log_path)
+    return conn
+
+
+def _where(
+    projects: Sequence[str] = (),
+    hooks: Sequence[str] = (),
+    actions: Sequence[str] = (),
+    since: Optional[str] = None,
+    window: Optional[int] = None,
+) -> tuple[str, list]:
+    clauses = ["valid = 1"]
+    params: list = []
+    for column, values in (("project", projects), ("hook", hooks), ("action", actions)):
+        if values:
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    if since:
+        # hook-event.sh writes fixed-width UTC "YYYY-MM-DDTHH:MM:SSZ", so text order is time order.
+        clauses.append("ts >= ?")
+        params.append(since)
+    if window:
+        clauses.append("offset >= COALESCE((SELECT offset FROM events ORDER BY offset DESC LIMIT 1 OFFSET ?), 0)")
+        params.append(window - 1)
+    return " AND ".join(clauses), params
+
+
+def last(
+    log_path: str,
+    n: Optional[int] = None,
+    projects: Sequence[str] = (),
+    hooks: Sequence[str] = (),
+    actions: Sequence[str] = (),
+    since: Optional[str] = None,
+) -> list[dict[str, Any]]:
+    """The newest ``n`` matching events (all when ``n`` is None), oldest first."""
+    if not (projects or hooks or actions or since):
+        if n is None:
+            return [event for _, event in iter_events(log_path)]
+        found: list[dict[str, Any]] = []
+        for line in reverse_lines(log_path):
+            if len(found) >= n:
+                break
+            event = parse_line(line)
+            if event is not None:
+                found.append(event)
+        found.reverse()
+        return found
+
+    conn = open_index(log_path)
+    try:
+        where, params = _where(projects, hooks, actions, since)
+        query = f"SELECT offset, length FROM events WHERE {where} ORDER BY offset DESC"
+        if n is not None:
+            query += " LIMIT ?"
+            params.append(n)
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+    found: list[dict[str, Any]] = []
+    try:
+        with open(log_path, "rb") as fh:
+            for offset, length in reversed(rows):
+                fh.seek(offset)
+                event = parse_line(fh.read(length))
+                if event is not None:
+                    found.append(event)
+    except OSError:
+        return []
+    return found
+
+
+def scan(
+    log_path: str,
+    after: int = -1,
+    projects: Sequence[str] = (),
+    hooks: Sequence[str] = (),
+    actions: Sequence[str] = (),
+) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Matching (offset, event) pairs past offset ``after``, oldest first, in constant memory."""
+    try:
+        fh = open(log_path, "rb")
+    except OSError:
+        return
+    conn = open_index(log_path)
+    try:
+        where, params = _where(projects, hooks, actions)
+        cursor = conn.execute(
+            f"SELECT offset, length FROM events WHERE {where} AND offset > ? ORDER BY offset", [*params, after]
+        )
+        with fh:
+            while True:
+                rows = cursor.fetchmany(INSERT_BATCH)
+                if not rows:
+                    break
+                for offset, length in rows:
+                    fh.seek(offset)
+                    event = parse_line(fh.read(length))
+                    if event is not None:
+                        yield offset, event
+    finally:
+        conn.close()
+
+
+def count(
+    log_path: str,
+    by: Sequence[str] = ("hook", "action"),
+    projects: Sequence[str] = (),
+    hooks: Sequence[str] = (),
+    actions: Sequence[str] = (),
+    since: Optional[str] = None,
+    window: Optional[int] = None,
+) -> dict[tuple, int]:
+    """Event counts grouped by ``by`` (any of project/hook/action/tool)."""
+    unknown = [column for column in by if column not in GROUP_COLUMNS]
+    if unknown:
+        raise ValueError(f"cannot group by: {', '.join(unknown)}")
+    conn = open_index(log_path)
+    try:
+        where, params = _where(projects, hooks, actions, since, window)
+        columns = ", ".join(by)
+        if not by:
+            total = conn.execute(f"SELECT COUNT(*) FROM events WHERE {where}", params).fetchone()[0]
+            return {(): total} if total else {}
+        rows = conn.execute(
+            f"SELECT {columns}, COUNT(*) FROM events WHERE {where} GROUP BY {columns}", params
+        ).fetchall()
+    finally:
+        conn.close()
+    return {tuple(row[:-1]): row[-1] for row in rows}
+
+
+def percentile(samples: Sequence[int], q: float) -> int:
+    """Nearest-rank percentile of already sorted samples."""
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+def latency(
+    log_path: str,
+    quantile: float = 0.95,
+    projects: Sequence[str] = (),
+    hooks: Sequence[str] = (),
+    since: Optional[str] = None,
+    window: Optional[int] = None,
+) -> dict[str, dict[str, int]]:
+    """Per-hook elapsed_ms: n, avg, max, p50 and the requested quantile."""
+    key = f"p{quantile * 100:g}_ms"
+    conn = open_index(log_path)
+    try:
+        where, params = _where(projects, hooks, (), since, window)
+        rows = conn.execute(
+            f"SELECT hook, elapsed_ms FROM events WHERE {where} AND hook IS NOT NULL AND elapsed_ms IS NOT NULL "
+            "ORDER BY hook, elapsed_ms",
+            params,
+        )
+        grouped: dict[str, list[int]] = {}
+        for hook, elapsed in rows:
+            grouped.setdefault(hook, []).append(elapsed)
+    finally:
+        conn.close()
+    return {
+        hook: {
+            "n": len(samples),
+            "avg_ms": sum(samples) // len(samples),
+            "max_ms": samples[-1],
+            "p50_ms": percentile(samples, 0.5),
+            key: percentile(samples, quantile),
+        }
+        for hook, samples in grouped.items()
+    }
+
+
+def matching_hashes(paths: Iterable[str]) -> list[str]:
+    """Project hashes for every spelling of a project dir hooks may have hashed."""
+    hashes: list[str] = []
+    for path in paths:
+        for spelling in (path, os.path.abspath(path)):
+            digest = project_hash(spelling)
+            if spelling and digest not in hashes:
+                hashes.append(digest)
+    return hashes
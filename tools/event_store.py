@@ -0,0 +1,546 @@
+"""Segmented, compacted archive for the hook event log.
+
+``events.jsonl`` stays the live ingest path (``emit_event`` appends to it).
+``seal`` replaces ``rotate_event_log``'s head/tail copy: the live log is
+renamed aside and cut into fixed-size, compressed, append-only segments in
+``<log without .jsonl>.segments/``::
+
+    seg-00000001.seg   compressed JSONL | footer JSON | uint32 footer length | b"BSG1"
+
+The footer records codec, line/event counts, the ts range and the sets of
+project hashes, hooks and actions, so ``query`` reads only the trailing bytes
+of segments that cannot match. ``compact`` (run in the background after a
+seal) folds every new segment into hourly and daily rollups in
+``rollups.sqlite`` (counts and elapsed_ms histograms per project/hook/action)
+and merges runs of undersized neighbouring segments into full ones. A merge
+stages its output as ``*.merge`` files and commits by atomically writing
+``merge.journal``; the next seal, compact or query under the store lock
+finishes a committed merge or discards an uncommitted one, so a crash never
+leaves events in both the merged and the original segments.
+
+Segments are gzip-compressed; ``zstd`` is used when requested and the optional
+``zstandard`` module is installed.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import math
+import os
+import re
+import sqlite3
+import struct
+import time
+import uuid
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence
+
+from event_log import parse_line
+
+try:  # optional
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+SEGMENT_LINES = 10000
+SEGMENT_VERSION = 1
+TRAILER = struct.Struct(">I4s")
+MAGIC = b"BSG1"
+SEGMENT_RE = re.compile(r"^seg-(\d{8})\.seg$")
+MERGE_SUFFIX = ".merge"
+MERGE_JOURNAL = "merge.journal"
+ROLLUPS_FILE = "rollups.sqlite"
+# Upper bounds (ms) of the latency histogram buckets; one overflow bucket follows.
+LATENCY_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+GRANULARITIES = {"hour": 13, "day": 10}
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    project TEXT NOT NULL,
+    hook TEXT NOT NULL,
+    action TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    latency_n INTEGER NOT NULL,
+    latency_sum INTEGER NOT NULL,
+    hist TEXT NOT NULL,
+    PRIMARY KEY (granularity, bucket, project, hook, action)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rolled (uid TEXT PRIMARY KEY);
+"""
+
+
+def segments_dir(log_path: str) -> str:
+    base = log_path[: -len(".jsonl")] if log_path.endswith(".jsonl") else log_path
+    return base + ".segments"
+
+
+def available_codecs() -> list[str]:
+    return ["gzip", "zstd"] if zstandard is not None else ["gzip"]
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # gzip container
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("segment is zstd-compressed but the zstandard module is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data, 31)
+
+
+def segment_paths(segdir: str) -> list[str]:
+    try:
+        names = sorted(name for name in os.listdir(segdir) if SEGMENT_RE.match(name))
+    except OSError:
+        return []
+    return [os.path.join(segdir, name) for name in names]
+
+
+def _next_seq(segdir: str) -> int:
+    paths = segment_paths(segdir)
+    return int(SEGMENT_RE.match(os.path.basename(paths[-1])).group(1)) + 1 if paths else 1
+
+
+def footer_for(lines: Sequence[bytes], codec: str) -> dict[str, Any]:
+    stamps: list[str] = []
+    projects: set[str] = set()
+    hooks: set[str] = set()
+    actions: set[str] = set()
+    events = 0
+    for line in lines:
+        event = parse_line(line)
+        if event is None:
+            continue
+        events += 1
+        if isinstance(event.get("ts"), str):
+            stamps.append(event["ts"])
+        for key, found in (("project", projects), ("hook", hooks), ("action", actions)):
+            if isinstance(event.get(key), str):
+                found.add(event[key])
+    return {
+        "version": SEGMENT_VERSION,
+        "uid": uuid.uuid4().hex,
+        "codec": codec,
+        "lines": len(lines),
+        "events": events,
+        "min_ts": min(stamps) if stamps else None,
+        "max_ts": max(stamps) if stamps else None,
+        "projects": sorted(projects),
+        "hooks": sorted(hooks),
+        "actions": sorted(actions),
+    }
+
+
+def write_segment(path: str, lines: Sequence[bytes], codec: str = "gzip") -> dict[str, Any]:
+    footer = footer_for(lines, codec)
+    footer_bytes = json.dumps(footer, separators=(",", ":")).encode("utf-8")
+    payload = _compress(b"".join(line + b"\n" for line in lines), codec)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        fh.write(payload)
+        fh.write(footer_bytes)
+        fh.write(TRAILER.pack(len(footer_bytes), MAGIC))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    return footer
+
+
+def read_footer(path: str) -> Optional[dict[str, Any]]:
+    """The footer of a sealed segment, reading only its last bytes."""
+    try:
+        with open(path, "rb") as fh:
+            size = fh.seek(0, os.SEEK_END)
+            if size < TRAILER.size:
+                return None
+            fh.seek(size - TRAILER.size)
+            length, magic = TRAILER.unpack(fh.read(TRAILER.size))
+            if magic != MAGIC or length > size - TRAILER.size:
+                return None
+            fh.seek(size - TRAILER.size - length)
+            footer = json.loads(fh.read(length))
+    except (OSError, ValueError):
+        return None
+    footer["payload_size"] = size - TRAILER.size - length
+    return footer
+
+
+def read_segment(path: str, footer: Optional[dict[str, Any]] = None) -> list[bytes]:
+    footer = footer or read_footer(path)
+    if footer is None:
+        return []
+    with open(path, "rb") as fh:
+        payload = fh.read(footer["payload_size"])
+    data = _decompress(payload, footer["codec"])
+    return data.split(b"\n")[:-1] if data.endswith(b"\n") else data.split(b"\n")
+
+
+@contextmanager
+def _store_lock(segdir: str, blocking: bool = False) -> Iterator[bool]:
+    with open(os.path.join(segdir, ".lock"), "a") as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def count_lines(path: str) -> int:
+    total = 0
+    try:
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                total += chunk.count(b"\n")
+    except OSError:
+        return 0
+    return total
+
+
+def _settle(path: str, attempts: int = 5, pause: float = 0.02) -> None:
+    """Give appends that opened the log just before the rename time to land."""
+    size = -1
+    for _ in range(attempts):
+        current = os.path.getsize(path)
+        if current == size:
+            return
+        size = current
+        time.sleep(pause)
+
+
+def _seal_file(segdir: str, path: str, segment_lines: int, codec: str) -> int:
+    _settle(path)
+    with open(path, "rb") as fh:
+        lines = [line for line in fh.read().split(b"\n") if line]
+    seq = _next_seq(segdir)
+    written = 0
+    for start in range(0, len(lines), segment_lines):
+        write_segment(os.path.join(segdir, f"seg-{seq:08d}.seg"), lines[start : start + segment_lines], codec)
+        seq += 1
+        written += 1
+    os.unlink(path)
+    return written
+
+
+def seal(
+    log_path: str, max_events: int = 5000, segment_lines: int = SEGMENT_LINES, codec: str = "gzip"
+) -> dict[str, Any]:
+    """Move the live log into sealed segments once it holds more than ``max_events`` lines."""
+    if codec not in available_codecs():
+        raise ValueError(f"codec not available: {codec}")
+    segdir = segments_dir(log_path)
+    stats: dict[str, Any] = {"sealed_lines": 0, "segments": 0, "locked": False}
+    os.makedirs(segdir, exist_ok=True)
+    with _store_lock(segdir) as locked:
+        if not locked:
+            stats["locked"] = True
+            return stats
+        _recover(segdir)
+        # Leftovers of an interrupted seal come first so segment order stays chronological.
+        pending = sorted(
+            os.path.join(segdir, name) for name in os.listdir(segdir) if name.startswith("pending-")
+        )
+        lines = count_lines(log_path)
+        if lines > max_events:
+            target = os.path.join(segdir, f"pending-{time.time_ns():020d}.jsonl")
+            os.replace(log_path, target)
+            open(log_path, "ab").close()
+            pending.append(target)
+            stats["sealed_lines"] = lines
+        for path in pending:
+            stats["segments"] += _seal_file(segdir, path, max(1, segment_lines), codec)
+    return stats
+
+
+def _matches(footer: dict[str, Any], since, until, projects, hooks, actions) -> bool:
+    if footer.get("events", 0) == 0:
+        return False
+    if since and footer.get("max_ts") and footer["max_ts"] < since:
+        return False
+    if until and footer.get("min_ts") and footer["min_ts"] > until:
+        return False
+    for wanted, present in ((projects, "projects"), (hooks, "hooks"), (actions, "actions")):
+        if wanted and not set(wanted) & set(footer.get(present, ())):
+            return False
+    return True
+
+
+def query(
+    log_path: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    projects: Sequence[str] = (),
+    hooks: Sequence[str] = (),
+    actions: Sequence[str] = (),
+    include_live: bool = True,
+    stats: Optional[dict[str, int]] = None,
+) -> Iterator[dict[str, Any]]:
+    """Matching events from sealed segments (oldest first), then the live log."""
+    stats = stats if stats is not None else {}
+    stats.setdefault("segments_read", 0)
+    stats.setdefault("segments_skipped", 0)
+
+    def wanted(event: dict[str, Any]) -> bool:
+        ts = event.get("ts") if isinstance(event.get("ts"), str) else ""
+        return (
+            (not since or ts >= since)
+            and (not until or ts <= until)
+            and (not projects or event.get("project") in projects)
+            and (not hooks or event.get("hook") in hooks)
+            and (not actions or event.get("action") in actions)
+        )
+
+    segdir = segments_dir(log_path)
+    if os.path.exists(os.path.join(segdir, MERGE_JOURNAL)):
+        # A compactor died mid-merge: finish it before reading, unless one is running now.
+        with _store_lock(segdir) as locked:
+            if locked:
+                _recover(segdir)
+    for path in segment_paths(segdir):
+        footer = read_footer(path)
+        if footer is None or not _matches(footer, since, until, projects, hooks, actions):
+            stats["segments_skipped"] += 1
+            continue
+        stats["segments_read"] += 1
+        for line in read_segment(path, footer):
+            event = parse_line(line)
+            if event is not None and wanted(event):
+                yield event
+    if include_live:
+        try:
+            with open(log_path, "rb") as fh:
+                for line in fh:
+                    event = parse_line(line)
+                    if event is not None and wanted(event):
+                        yield event
+        except OSError:
+            return
+
+
+def _bucket_index(elapsed: int) -> int:
+    for index, bound in enumerate(LATENCY_BOUNDS_MS):
+        if elapsed <= bound:
+            return index
+    return len(LATENCY_BOUNDS_MS)
+
+
+def histogram_quantile(hist: Sequence[int], q: float) -> Optional[int]:
+    """Upper bound (ms) of the bucket holding the nearest-rank quantile; None past the last bound."""
+    total = sum(hist)
+    if not total:
+        return None
+    rank = max(1, math.ceil(q * total))
+    seen = 0
+    for index, count in enumerate(hist):
+        seen += count
+        if seen >= rank:
+            return LATENCY_BOUNDS_MS[index] if index < len(LATENCY_BOUNDS_MS) else None
+    return None
+
+
+def _connect_rollups(segdir: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(os.path.join(segdir, ROLLUPS_FILE), timeout=5)
+    conn.executescript(ROLLUP_SCHEMA)
+    return conn
+
+
+def _rollup_segment(conn: sqlite3.Connection, lines: Sequence[bytes]) -> None:
+    counts: Counter = Counter()
+    latency: dict[tuple, list[int]] = {}
+    for line in lines:
+        event = parse_line(line)
+        if event is None or not isinstance(event.get("ts"), str):
+            continue
+        names = tuple(str(event.get(key) or "") for key in ("project", "hook", "action"))
+        elapsed = event.get("elapsed_ms")
+        for granularity, width in GRANULARITIES.items():
+            key = (granularity, event["ts"][:width], *names)
+            counts[key] += 1
+            hist = latency.setdefault(key, [0] * (len(LATENCY_BOUNDS_MS) + 2))
+            if isinstance(elapsed, (int, float)) and not isinstance(elapsed, bool):
+                hist[_bucket_index(int(elapsed))] += 1
+                hist[-1] += int(elapsed)
+    for key, total in counts.items():
+        row = conn.execute(
+            "SELECT count, latency_n, latency_sum, hist FROM rollups "
+            "WHERE granularity = ? AND bucket = ? AND project = ? AND hook = ? AND action = ?",
+            key,
+        ).fetchone()
+        hist = latency[key]
+        latency_sum = hist.pop()
+        if row:
+            total += row[0]
+            latency_sum += row[2]
+            hist = [a + b for a, b in zip(hist, json.loads(row[3]))]
+        conn.execute(
+            "INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (*key, total, sum(hist), latency_sum, json.dumps(hist)),
+        )
+
+
+def _write_journal(segdir: str, journal: dict[str, list]) -> None:
+    path = os.path.join(segdir, MERGE_JOURNAL)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(journal, fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def _apply_merge(segdir: str, journal: dict[str, list]) -> None:
+    """Move merged segments over the run and drop the rest; safe to repeat after a crash."""
+    for staged, target in journal["renames"]:
+        try:
+            os.replace(os.path.join(segdir, staged), os.path.join(segdir, target))
+        except FileNotFoundError:
+            pass  # already moved by the interrupted run
+    for name in journal["remove"]:
+        try:
+            os.unlink(os.path.join(segdir, name))
+        except FileNotFoundError:
+            pass
+    os.unlink(os.path.join(segdir, MERGE_JOURNAL))
+
+
+def _recover(segdir: str) -> None:
+    """Finish a merge whose journal was committed, or discard one that was not (store lock held)."""
+    try:
+        with open(os.path.join(segdir, MERGE_JOURNAL), encoding="utf-8") as fh:
+            journal = json.load(fh)
+    except FileNotFoundError:
+        journal = None
+    except ValueError:  # unreadable: treat the merge as never committed
+        journal = None
+        os.unlink(os.path.join(segdir, MERGE_JOURNAL))
+    if journal is not None:
+        _apply_merge(segdir, journal)
+    for name in os.listdir(segdir):
+        if name.endswith(MERGE_SUFFIX) or ".tmp-" in name:
+            os.unlink(os.path.join(segdir, name))
+
+
+def _compact_locked(segdir: str, segment_lines: int, stats: dict[str, int]) -> None:
+    _recover(segdir)
+    conn = _connect_rollups(segdir)
+    try:
+        footers = [(path, read_footer(path)) for path in segment_paths(segdir)]
+        footers = [(path, footer) for path, footer in footers if footer is not None]
+        for path, footer in footers:
+            if conn.execute("SELECT 1 FROM rolled WHERE uid = ?", (footer["uid"],)).fetchone():
+                continue
+            with conn:
+                _rollup_segment(conn, read_segment(path, footer))
+                conn.execute("INSERT INTO rolled (uid) VALUES (?)", (footer["uid"],))
+            stats["rolled_up"] += 1
+
+        runs: list[list[tuple[str, dict]]] = [[]]
+        for path, footer in footers:
+            if footer["lines"] < segment_lines:
+                runs[-1].append((path, footer))
+            elif runs[-1]:
+                runs.append([])
+        for run in runs:
+            if len(run) < 2:
+                continue
+            lines = [line for path, footer in run for line in read_segment(path, footer)]
+            codec = run[-1][1]["codec"]
+            targets = [os.path.basename(path) for path, _ in run]
+            # Merged segments reuse the run's names, so segment order stays chronological.
+            # They are staged under *.merge names first; the journal is the commit point, so a
+            # crash either leaves the run untouched or lets _recover finish the switch-over.
+            chunks = [lines[start : start + segment_lines] for start in range(0, len(lines), segment_lines)]
+            staged = [write_segment(os.path.join(segdir, name + MERGE_SUFFIX), chunk, codec)["uid"]
+                      for name, chunk in zip(targets, chunks)]
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO rolled (uid) VALUES (?)", [(uid,) for uid in staged])
+            used = len(chunks)
+            journal = {
+                "renames": [[name + MERGE_SUFFIX, name] for name in targets[:used]],
+                "remove": targets[used:],
+            }
+            _write_journal(segdir, journal)
+            _apply_merge(segdir, journal)
+            stats["merged"] += len(run) - used
+    finally:
+        conn.close()
+
+
+def compact(log_path: str, segment_lines: int = SEGMENT_LINES) -> dict[str, int]:
+    """Roll new segments up, then merge runs of undersized adjacent segments."""
+    segdir = segments_dir(log_path)
+    stats = {"rolled_up": 0, "merged": 0, "segments": 0}
+    # Runs detached after a seal; the store may have been removed meanwhile.
+    try:
+        with _store_lock(segdir, blocking=True):
+            _compact_locked(segdir, segment_lines, stats)
+            stats["segments"] = len(segment_paths(segdir))
+    except FileNotFoundError:
+        pass
+    return stats
+
+
+def rollups(
+    log_path: str,
+    granularity: str = "hour",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    projects: Sequence[str] = (),
+    hooks: Sequence[str] = (),
+    actions: Sequence[str] = (),
+) -> list[dict[str, Any]]:
+    """Rollup rows (oldest bucket first) with an approximate p95 from the histogram."""
+    path = os.path.join(segments_dir(log_path), ROLLUPS_FILE)
+    if granularity not in GRANULARITIES or not os.path.exists(path):
+        return []
+    clauses = ["granularity = ?"]
+    params: list = [granularity]
+    if since:
+        clauses.append("bucket >= ?")
+        params.append(since[: GRANULARITIES[granularity]])
+    if until:
+        clauses.append("bucket <= ?")
+        params.append(until[: GRANULARITIES[granularity]])
+    for column, values in (("project", projects), ("hook", hooks), ("action", actions)):
+        if values:
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    conn = sqlite3.connect(path, timeout=5)
+    try:
+        rows = conn.execute(
+            "SELECT bucket, project, hook, action, count, latency_n, latency_sum, hist FROM rollups "
+            f"WHERE {' AND '.join(clauses)} ORDER BY bucket, project, hook, action",
+            params,
+        ).fetchall()
+    finally:
+        conn.close()
+    result = []
+    for bucket, project, hook, action, total, latency_n, latency_sum, hist in rows:
+        hist = json.loads(hist)
+        result.append(
+            {
+                "bucket": bucket,
+                "project": project,
+                "hook": hook,
+                "action": action,
+                "count": total,
+                "latency_n": latency_n,
+                "avg_ms": latency_sum // latency_n if latency_n else None,
+                "p95_ms_le": histogram_quantile(hist, 0.95),
+                "hist": hist,
+            }
+        )
+    return result
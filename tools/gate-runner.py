@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Run the PreToolUse gates from hooks/manifest.json in one process.
+
+Register it once in ``.claude/settings.json`` (PreToolUse, matcher
+``Bash|Edit|Write``) in place of the individual gate scripts. The payload is
+read and parsed once, and the manifest's PreToolUse hooks whose matcher
+accepts the tool run in ``priority`` order. Hooks ported in pretool_gates.py
+run in-process; any other hook script in the chain runs as a subprocess with
+the same payload. The first block stops the chain with exit 2, and
+``BESTAI_DRY_RUN=1`` reports would-blocks and carries on, exactly like the
+scripts. Events from all gates are appended to the event log in one write.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import time
+
+from pretool_gates import GATES, Call, HookExit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DEFAULT_MANIFEST = os.path.join(ROOT_DIR, "hooks", "manifest.json")
+EVENT = "PreToolUse"
+
+
+def load_chain(manifest_path: str, only: set[str], skip: set[str]) -> list[tuple[str, str]]:
+    """(hook, matcher) for the manifest's PreToolUse hooks in priority order."""
+    with open(manifest_path, encoding="utf-8") as fh:
+        hooks = json.load(fh).get("hooks", {})
+    chain = [
+        (spec.get("priority", 100), name, spec.get("matcher", ""))
+        for name, spec in hooks.items()
+        if spec.get("event") == EVENT and (not only or name in only) and name not in skip
+    ]
+    return [(name, matcher) for _, name, matcher in sorted(chain)]
+
+
+def applies(matcher: str, tool_name: str) -> bool:
+    # An unnamed tool gets every gate, as when a script is run by hand.
+    return not tool_name or not matcher or re.fullmatch(matcher, tool_name) is not None
+
+
+def run_script(script: str, raw: str) -> int:
+    import subprocess  # only unported hooks pay for it
+
+    try:
+        proc = subprocess.run(["bash", script], input=raw.encode("utf-8", "surrogateescape"), stderr=None)
+    except OSError as exc:
+        print(f"[bestAI] gate-runner: cannot run {os.path.basename(script)}: {exc}", file=sys.stderr)
+        return 1
+    return proc.returncode
+
+
+def run_chain(raw: str, chain: list[tuple[str, str]], hooks_dir: str, timing: bool = False) -> int:
+    call = Call(raw)
+    code = 0
+    for name, matcher in chain:
+        if not applies(matcher, call.tool_name):
+            continue
+        started = time.perf_counter()
+        gate = GATES.get(name)
+        if gate is None:
+            script = os.path.join(hooks_dir, name)
+            result = run_script(script, raw) if os.path.isfile(script) else 0
+        else:
+            try:
+                gate(call)
+                result = 0
+            except HookExit as exc:
+                result = exc.code
+            except Exception as exc:  # a crashing hook script is a non-blocking error too
+                print(f"[bestAI] gate-runner: {name} failed: {exc}", file=sys.stderr)
+                result = 1
+        if timing:
+            print(f"[bestAI] gate-runner: {name} {1000 * (time.perf_counter() - started):.2f}ms", file=sys.stderr)
+        if result == 2:
+            code = 2
+            break
+    call.flush()
+    return code
+
+
+def parse_args(argv: list[str]):
+    if not argv:
+        # The hook registration passes no flags; skip argparse's import cost on every tool call.
+        from types import SimpleNamespace
+
+        return SimpleNamespace(manifest=DEFAULT_MANIFEST, only="", skip="", list=False, timing=False)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="bestAI PreToolUse gate runner (reads the hook payload on stdin)")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="Hook manifest (default: hooks/manifest.json)")
+    parser.add_argument("--only", default="", help="Comma-separated hooks to run (default: every PreToolUse hook)")
+    parser.add_argument("--skip", default="", help="Comma-separated hooks to leave out, e.g. circuit-breaker-gate.sh")
+    parser.add_argument("--list", action="store_true", help="Print the gate chain and exit")
+    parser.add_argument("--timing", action="store_true", help="Report per-gate latency on stderr")
+    return parser.parse_args(argv)
+
+
+def main() -> int:
+    args = parse_args(sys.argv[1:])
+
+    def names(value: str) -> set[str]:
+        return {name.strip() for name in value.split(",") if name.strip()}
+
+    manifest = args.manifest
+    try:
+        chain = load_chain(manifest, names(args.only), names(args.skip))
+    except (OSError, ValueError) as exc:
+        print(f"[bestAI] gate-runner: cannot read {manifest}: {exc}", file=sys.stderr)
+        return 1
+    if args.list:
+        for name, matcher in chain:
+            print(f"{name}\t{matcher}\t{'in-process' if name in GATES else 'script'}")
+        return 0
+    raw = sys.stdin.buffer.read().decode("utf-8", "surrogateescape")
+    return run_chain(raw, chain, os.path.dirname(os.path.abspath(manifest)), args.timing)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
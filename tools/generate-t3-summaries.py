@@ -1,51 +1,299 @@
 #!/usr/bin/env python3
-"""Generate a compact T3 directory summary for bestAI."""
+"""Generate a compact T3 directory summary for bestAI.
+
+The tree is walked with ``os.scandir``. Skipped directories (SKIP_DIR_MARKERS
+and anything matched by ``.gitignore`` files on the way down) are pruned
+before they are entered. Each directory is one task on a thread pool, so
+large subtrees are scanned and line-counted in parallel.
+
+File contents are only read for line counts. Each directory's stats are
+cached in ``<out>.cache.json`` under a signature of its visible files
+(name, size, mtime_ns). A directory whose files did not change reuses the
+previous run's numbers, so a re-run over an unchanged tree only stats files.
+"""
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
 import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
+from typing import Optional
 
 
 SKIP_DIR_MARKERS = (".git", ".bestai", ".claude", "__pycache__")
+CACHE_VERSION = 1
+READ_CHUNK = 1 << 20
+TOP_LANGUAGES = 3
+
+LANGUAGES = {
+    ".py": "Python", ".sh": "Shell", ".bash": "Shell", ".js": "JavaScript", ".mjs": "JavaScript",
+    ".cjs": "JavaScript", ".jsx": "JavaScript", ".ts": "TypeScript", ".tsx": "TypeScript", ".go": "Go",
+    ".rs": "Rust", ".rb": "Ruby", ".java": "Java", ".kt": "Kotlin", ".swift": "Swift", ".c": "C", ".h": "C",
+    ".cc": "C++", ".cpp": "C++", ".hpp": "C++", ".cs": "C#", ".php": "PHP", ".scala": "Scala", ".lua": "Lua",
+    ".sql": "SQL", ".html": "HTML", ".css": "CSS", ".scss": "CSS", ".vue": "Vue", ".svelte": "Svelte",
+    ".md": "Markdown", ".rst": "reST", ".json": "JSON", ".yaml": "YAML", ".yml": "YAML", ".toml": "TOML",
+}
+
 
+@dataclass
+class DirStats:
+    """Visible files directly in one directory."""
 
-def should_skip(path: Path) -> bool:
-    parts = set(path.parts)
-    return any(marker in parts for marker in SKIP_DIR_MARKERS)
+    signature: str = ""
+    files: int = 0
+    bytes: int = 0
+    lines: int = 0
+    extensions: list[str] = field(default_factory=list)
+    languages: dict[str, int] = field(default_factory=dict)
 
 
-def summarize_directory(root_dir: Path, output_file: Path) -> list[str]:
-    summaries: list[str] = ["# Cold Storage Index (T3 Summary)", ""]
+@dataclass(frozen=True)
+class IgnoreRule:
+    base: str
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+    anchored: bool
 
-    for dirpath, _dirnames, filenames in os.walk(root_dir):
-        current = Path(dirpath)
-        if should_skip(current):
+
+def _glob_regex(pattern: str) -> re.Pattern:
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
             continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return re.compile("".join(out))
 
-        visible_files = sorted(
-            f for f in filenames if not f.startswith(".") and (current / f).is_file()
-        )
-        if not visible_files:
+
+def read_gitignore(path: str, base: str) -> list[IgnoreRule]:
+    """Rules from one ``.gitignore``; ``base`` is its directory relative to the root."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as fh:
+            lines = fh.read().splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
             continue
+        negate = line.startswith("!")
+        if negate or line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        rules.append(IgnoreRule(base, _glob_regex(line.lstrip("/")), negate, dir_only, anchored))
+    return rules
+
 
-        relative_path = current.relative_to(root_dir)
-        if str(relative_path) == ".":
+def is_ignored(rel_path: str, name: str, is_dir: bool, rules: tuple[IgnoreRule, ...]) -> bool:
+    """gitignore semantics: the last matching rule wins; deeper files come later."""
+    ignored = False
+    for rule in rules:
+        if rule.dir_only and not is_dir:
             continue
+        target = name
+        if rule.anchored:
+            target = rel_path[len(rule.base) + 1 :] if rule.base else rel_path
+        if rule.regex.fullmatch(target):
+            ignored = not rule.negate
+    return ignored
 
-        extensions = sorted({Path(name).suffix or "<no-ext>" for name in visible_files})
-        ext_summary = ", ".join(extensions[:6])
-        if len(extensions) > 6:
-            ext_summary += ", ..."
 
+def count_lines(path: str) -> int:
+    """Newlines in a text file; 0 for binaries (a NUL in the first chunk)."""
+    lines = 0
+    try:
+        with open(path, "rb") as fh:
+            chunk = fh.read(READ_CHUNK)
+            if b"\0" in chunk:
+                return 0
+            while chunk:
+                lines += chunk.count(b"\n")
+                chunk = fh.read(READ_CHUNK)
+    except OSError:
+        return 0
+    return lines
+
+
+def scan_directory(
+    path: str, rel: str, rules: tuple[IgnoreRule, ...], cached: Optional[DirStats], use_gitignore: bool
+) -> tuple[DirStats, list[tuple[str, str, tuple[IgnoreRule, ...]]]]:
+    """Stats for the files in ``path`` plus the subdirectories still to walk."""
+    if use_gitignore:
+        rules = rules + tuple(read_gitignore(os.path.join(path, ".gitignore"), rel))
+    files: list[tuple[str, str, os.stat_result]] = []
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                child_rel = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name in SKIP_DIR_MARKERS or is_ignored(child_rel, entry.name, True, rules):
+                            continue
+                        subdirs.append((entry.path, child_rel, rules))
+                    elif not entry.name.startswith(".") and entry.is_file():
+                        if not is_ignored(child_rel, entry.name, False, rules):
+                            files.append((entry.name, entry.path, entry.stat()))
+                except OSError:
+                    continue
+    except OSError:
+        return DirStats(), []
+
+    files.sort()
+    signature = hashlib.sha1(
+        "\0".join(f"{name}\t{st.st_size}\t{st.st_mtime_ns}" for name, _, st in files).encode("utf-8", "surrogateescape")
+    ).hexdigest()
+    if cached is not None and cached.signature == signature:
+        return cached, subdirs
+
+    stats = DirStats(signature=signature, files=len(files))
+    extensions = set()
+    for name, file_path, st in files:
+        suffix = Path(name).suffix
+        extensions.add(suffix or "<no-ext>")
+        stats.bytes += st.st_size
+        stats.lines += count_lines(file_path)
+        language = LANGUAGES.get(suffix.lower())
+        if language:
+            stats.languages[language] = stats.languages.get(language, 0) + st.st_size
+    stats.extensions = sorted(extensions)
+    return stats, subdirs
+
+
+def load_cache(cache_file: Optional[Path], root_dir: Path) -> dict[str, DirStats]:
+    if cache_file is None:
+        return {}
+    try:
+        data = json.loads(cache_file.read_text(encoding="utf-8"))
+        if data.get("version") != CACHE_VERSION or data.get("root") != str(root_dir):
+            return {}
+        return {rel: DirStats(**entry) for rel, entry in data["dirs"].items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def save_cache(cache_file: Path, root_dir: Path, results: dict[str, DirStats]) -> None:
+    payload = {"version": CACHE_VERSION, "root": str(root_dir), "dirs": {rel: asdict(s) for rel, s in results.items()}}
+    tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}")
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, cache_file)
+
+
+def human_bytes(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{int(value)} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{size} B"
+
+
+def language_summary(languages: dict[str, int]) -> str:
+    total = sum(languages.values())
+    if not total:
+        return ""
+    ranked = sorted(languages.items(), key=lambda item: (-item[1], item[0]))[:TOP_LANGUAGES]
+    return "; " + ", ".join(f"{name} {round(100 * size / total)}%" for name, size in ranked)
+
+
+def summarize_directory(
+    root_dir: Path,
+    output_file: Path,
+    cache_file: Optional[Path] = None,
+    jobs: int = 0,
+    use_gitignore: bool = True,
+) -> list[str]:
+    previous = load_cache(cache_file, root_dir)
+    results: dict[str, DirStats] = {}
+    jobs = jobs or min(8, (os.cpu_count() or 1) + 4)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+
+        def submit(path: str, rel: str, rules: tuple[IgnoreRule, ...]):
+            future = pool.submit(scan_directory, path, rel, rules, previous.get(rel), use_gitignore)
+            pending[future] = rel
+
+        pending: dict = {}
+        submit(str(root_dir), "", ())
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rel = pending.pop(future)
+                stats, subdirs = future.result()
+                results[rel] = stats
+                for child in subdirs:
+                    submit(*child)
+
+    totals = DirStats()
+    for stats in results.values():
+        totals.files += stats.files
+        totals.bytes += stats.bytes
+        totals.lines += stats.lines
+        for language, size in stats.languages.items():
+            totals.languages[language] = totals.languages.get(language, 0) + size
+
+    summaries: list[str] = [
+        "# Cold Storage Index (T3 Summary)",
+        "",
+        f"Total: {totals.files} files, {totals.lines} lines, {human_bytes(totals.bytes)}"
+        f"{language_summary(totals.languages)}.",
+        "",
+    ]
+    for rel in sorted(results, key=lambda rel: rel.split("/")):
+        stats = results[rel]
+        if not rel or not stats.files:
+            continue
+        ext_summary = ", ".join(stats.extensions[:6])
+        if len(stats.extensions) > 6:
+            ext_summary += ", ..."
         summaries.append(
-            f"- `{relative_path.as_posix()}/`: "
-            f"Contains {len(visible_files)} files ({ext_summary})."
+            f"- `{rel}/`: "
+            f"Contains {stats.files} files ({ext_summary}). "
+            f"{stats.lines} lines, {human_bytes(stats.bytes)}{language_summary(stats.languages)}."
         )
 
     output_file.parent.mkdir(parents=True, exist_ok=True)
     output_file.write_text("\n".join(summaries) + "\n", encoding="utf-8")
+    if cache_file is not None:
+        save_cache(cache_file, root_dir, results)
     return summaries
 
 
@@ -57,11 +305,18 @@ def main() -> int:
         default=".bestai/T3-summary.md",
         help="Output summary markdown file",
     )
+    parser.add_argument("--cache", default=None, help="Per-directory stats cache (default: <out>.cache.json)")
+    parser.add_argument("--no-cache", action="store_true", help="Rescan every file; do not read or write the cache")
+    parser.add_argument("--jobs", type=int, default=0, help="Scanner threads (default: min(8, cpus + 4))")
+    parser.add_argument("--no-gitignore", action="store_true", help="Do not prune paths matched by .gitignore")
     args = parser.parse_args()
 
     root_dir = Path(args.dir).resolve()
     output_file = Path(args.out).resolve()
-    summarize_directory(root_dir, output_file)
+    cache_file = None
+    if not args.no_cache:
+        cache_file = Path(args.cache).resolve() if args.cache else output_file.with_name(output_file.name + ".cache.json")
+    summarize_directory(root_dir, output_file, cache_file, max(0, args.jobs), not args.no_gitignore)
     print(f"Generated T3 index at {output_file}")
     return 0
 
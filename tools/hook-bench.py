@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""Benchmark hook latency against the budgets in hooks/manifest.json.
+
+Every hook runs against synthetic payloads for its event (one per tool in its
+matcher) inside a throwaway HOME/project with a generated memory directory of
+``--memory-files`` files. Each (hook, tool, size) is run ``--runs`` times and
+p50/p95/p99 wall time is compared with ``estimated_latency_ms``; the summed
+p95 of all hooks that fire for one event + tool is compared with the event's
+``latency_budgets`` entry. Any p95 over budget x ``--tolerance`` is a
+regression and the exit status is 1.
+
+A stub ``claude`` that fails immediately is put first on PATH, so hooks with
+an LLM path (smart-preprocess-v2, observer) measure their fallback instead of
+model latency.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_MANIFEST = ROOT_DIR / "hooks" / "manifest.json"
+
+PROMPT = "fix the authentication token refresh error in the login flow"
+VOCABULARY = (
+    "auth token refresh login session database migration deploy rollback cache index "
+    "retry timeout queue worker config secret frozen schema api client server test "
+    "pipeline release review latency memory context router budget event hook"
+).split()
+CORE_FILES = ("MEMORY.md", "decisions.md", "pitfalls.md", "preferences.md", "session-log.md")
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def write_memory_dir(memory_dir: Path, files: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    memory_dir.mkdir(parents=True, exist_ok=True)
+    names = list(CORE_FILES[: min(files, len(CORE_FILES))])
+    names += [f"topic-{i:04d}.md" for i in range(files - len(names))]
+    for name in names:
+        tag = "[USER]" if rng.random() < 0.2 else "[AUTO]"
+        lines = [f"# {name[:-3]}"]
+        for _ in range(rng.randint(8, 40)):
+            lines.append(f"- {tag} " + " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(5, 14))))
+        (memory_dir / name).write_text("\n".join(lines) + "\n", encoding="utf-8")
+    (memory_dir / "frozen-fragments.md").write_text("# Frozen\n- `src/frozen.py`\n", encoding="utf-8")
+    (memory_dir / "ghost-hits.log").write_text("pitfalls.md\n", encoding="utf-8")
+    (memory_dir / ".session-counter").write_text("12\n", encoding="utf-8")
+
+
+class Sandbox:
+    """Temporary HOME + project + memory dir shared by all runs of one size."""
+
+    def __init__(self, memory_files: int):
+        self._tmp = tempfile.TemporaryDirectory(prefix="bestai-hook-bench.")
+        root = Path(self._tmp.name)
+        self.home = root / "home"
+        self.project = root / "project"
+        (self.project / ".claude").mkdir(parents=True)
+        (self.project / "src").mkdir()
+        (self.project / "src" / "app.py").write_text("def handler(event):\n    return event\n", encoding="utf-8")
+        key = str(self.project).replace("/", "-")
+        self.memory_dir = self.home / ".claude" / "projects" / key / "memory"
+        write_memory_dir(self.memory_dir, memory_files)
+
+        stub_bin = root / "bin"
+        stub_bin.mkdir()
+        stub = stub_bin / "claude"
+        stub.write_text("#!/bin/sh\nexit 1\n", encoding="utf-8")
+        stub.chmod(0o755)
+
+        self.env = dict(
+            os.environ,
+            HOME=str(self.home),
+            CLAUDE_PROJECT_DIR=str(self.project),
+            SMART_CONTEXT_MEMORY_DIR=str(self.memory_dir),
+            XDG_CACHE_HOME=str(root / "cache"),
+            BESTAI_EVENT_LOG=str(root / "events.jsonl"),
+            SMART_CONTEXT_DAEMON="0",
+            PATH=f"{stub_bin}{os.pathsep}{os.environ.get('PATH', '')}",
+        )
+
+    def close(self) -> None:
+        self._tmp.cleanup()
+
+    def payload(self, event: str, tool: Optional[str]) -> dict[str, Any]:
+        base: dict[str, Any] = {"session_id": "bench", "cwd": str(self.project), "hook_event_name": event}
+        if event == "UserPromptSubmit":
+            return {**base, "prompt": PROMPT}
+        if event == "SessionStart":
+            return {**base, "source": "startup"}
+        if event == "Stop":
+            return {**base, "stop_hook_active": False}
+        target = str(self.project / "src" / "app.py")
+        inputs = {
+            "Bash": {"command": "ls -la src && git status --short"},
+            "Edit": {"file_path": target, "old_string": "return event", "new_string": "return dict(event)"},
+            "Write": {"file_path": target, "content": "def handler(event):\n    return dict(event)\n"},
+            "Read": {"file_path": target},
+            "Grep": {"pattern": "handler", "path": str(self.project)},
+            "Glob": {"pattern": "**/*.py", "path": str(self.project)},
+        }
+        payload = {**base, "tool_name": tool, "tool_input": inputs.get(tool or "", {})}
+        if event == "PostToolUse":
+            payload["tool_response"] = {"stdout": "src/app.py\n", "stderr": "", "exit_code": 0}
+        return payload
+
+
+def hook_tools(spec: dict[str, Any]) -> list[Optional[str]]:
+    matcher = spec.get("matcher") or ""
+    return [tool for tool in matcher.split("|") if tool] or [None]
+
+
+def run_hook(hook_path: Path, payload: dict[str, Any], env: dict[str, str]) -> tuple[float, int]:
+    data = json.dumps(payload).encode("utf-8")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        ["bash", str(hook_path)],
+        input=data,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        cwd=env["CLAUDE_PROJECT_DIR"],
+    )
+    return (time.perf_counter() - started) * 1000, proc.returncode
+
+
+def bench(
+    manifest: dict[str, Any],
+    hooks_dir: Path,
+    sizes: list[int],
+    runs: int,
+    warmup: int,
+    tolerance: float,
+    only: list[str],
+) -> dict[str, Any]:
+    hooks = {
+        name: spec
+        for name, spec in manifest.get("hooks", {}).items()
+        if (not only or name in only) and spec.get("event") in ("PreToolUse", "PostToolUse", "UserPromptSubmit", "SessionStart", "Stop")
+    }
+    budgets = manifest.get("latency_budgets", {})
+    results: list[dict[str, Any]] = []
+    events: list[dict[str, Any]] = []
+
+    for size in sizes:
+        sandbox = Sandbox(size)
+        try:
+            per_event: dict[tuple[str, Optional[str]], float] = {}
+            for name, spec in sorted(hooks.items(), key=lambda item: (item[1]["event"], item[1].get("priority", 0))):
+                hook_path = hooks_dir / name
+                if not hook_path.is_file():
+                    continue
+                for tool in hook_tools(spec):
+                    payload = sandbox.payload(spec["event"], tool)
+                    for _ in range(warmup):
+                        run_hook(hook_path, payload, sandbox.env)
+                    samples: list[float] = []
+                    exit_codes: dict[str, int] = {}
+                    for _ in range(runs):
+                        elapsed, code = run_hook(hook_path, payload, sandbox.env)
+                        samples.append(elapsed)
+                        exit_codes[str(code)] = exit_codes.get(str(code), 0) + 1
+                    budget = spec.get("estimated_latency_ms")
+                    p95 = percentile(samples, 0.95)
+                    results.append(
+                        {
+                            "hook": name,
+                            "event": spec["event"],
+                            "tool": tool,
+                            "memory_files": size,
+                            "runs": runs,
+                            "p50_ms": round(percentile(samples, 0.50), 2),
+                            "p95_ms": round(p95, 2),
+                            "p99_ms": round(percentile(samples, 0.99), 2),
+                            "budget_ms": budget,
+                            "regression": budget is not None and p95 > budget * tolerance,
+                            "exit_codes": exit_codes,
+                        }
+                    )
+                    key = (spec["event"], tool)
+                    per_event[key] = per_event.get(key, 0.0) + p95
+            for (event, tool), total in sorted(per_event.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+                budget = budgets.get(event)
+                events.append(
+                    {
+                        "event": event,
+                        "tool": tool,
+                        "memory_files": size,
+                        "p95_sum_ms": round(total, 2),
+                        "budget_ms": budget,
+                        "regression": budget is not None and total > budget * tolerance,
+                    }
+                )
+        finally:
+            sandbox.close()
+
+    return {
+        "tolerance": tolerance,
+        "hooks": results,
+        "events": events,
+        "regressions": sum(1 for row in results + events if row["regression"]),
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(f"{'hook':<26} {'tool':<6} {'files':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'budget':>7}  status")
+    for row in report["hooks"]:
+        status = "REGRESSION" if row["regression"] else "ok"
+        print(
+            f"{row['hook']:<26} {row['tool'] or '-':<6} {row['memory_files']:>5} "
+            f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['budget_ms'] or '-':>7}  {status}"
+        )
+    print("")
+    print(f"{'event':<26} {'tool':<6} {'files':>5} {'p95 sum':>8} {'budget':>7}  status")
+    for row in report["events"]:
+        status = "REGRESSION" if row["regression"] else "ok"
+        print(
+            f"{row['event']:<26} {row['tool'] or '-':<6} {row['memory_files']:>5} "
+            f"{row['p95_sum_ms']:>8.1f} {row['budget_ms'] or '-':>7}  {status}"
+        )
+    print("")
+    print(f"Regressions: {report['regressions']} (tolerance x{report['tolerance']})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="bestAI hook latency benchmark")
+    parser.add_argument("--manifest", default=str(DEFAULT_MANIFEST), help="Hook manifest (default: hooks/manifest.json)")
+    parser.add_argument("--hooks-dir", help="Directory with hook scripts (default: next to the manifest)")
+    parser.add_argument("--hook", action="append", default=[], metavar="NAME", help="Only benchmark NAME; repeatable")
+    parser.add_argument(
+        "--memory-files", type=int, nargs="+", default=[10], metavar="N", help="Memory dir sizes to test (e.g. 10 100 1000)"
+    )
+    parser.add_argument("--runs", type=int, default=20, help="Timed runs per hook and tool (default: 20)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs first (default: 1)")
+    parser.add_argument(
+        "--tolerance", type=float, default=1.0, help="Flag a regression when p95 > budget x TOLERANCE (default: 1.0)"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    manifest_path = Path(args.manifest)
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        print(f"hook-bench: cannot read manifest: {exc}", file=sys.stderr)
+        return 2
+    hooks_dir = Path(args.hooks_dir) if args.hooks_dir else manifest_path.parent
+    unknown = [name for name in args.hook if name not in manifest.get("hooks", {})]
+    if unknown:
+        print(f"hook-bench: not in manifest: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    report = bench(
+        manifest,
+        hooks_dir,
+        sizes=[max(1, size) for size in args.memory_files],
+        runs=max(1, args.runs),
+        warmup=max(0, args.warmup),
+        tolerance=args.tolerance,
+        only=args.hook,
+    )
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+    return 1 if report["regressions"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,34 +1,376 @@
+#!/usr/bin/env python3
+"""bestAI JSON-RPC 2.0 server over stdio (``bestai mcp``).
+
+One request, or a batch array of requests, per stdin line; one response
+line per request that carries an ``id``. Requests are handled concurrently:
+file and index work runs on a thread pool while the reader keeps accepting
+lines, so responses may arrive out of order and clients match them by id.
+Lines without ``"jsonrpc"`` are the legacy protocol: always answered, with
+``{"result": ...}`` or ``{"error": "<message>"}`` and no id, as before.
+
+Methods::
+
+    get_version
+    get_project_state   [section] [etag | etags]   .bestai/GPS.json, per-section ETags
+    smart_context_query prompt [memory_dir]        [SMART_CONTEXT] block, scores (read-only)
+    event_stats         [by] [hooks] [actions] [since] [window] [quantile] [project_dir] [log]
+    list_memory_files   [memory_dir]               names, sizes, [USER] flags, .usage-log rows
+
+Everything read from disk sits in a cache revalidated by (mtime_ns, size,
+inode), so repeated calls re-read only files that changed. GPS sections are
+serialized once per change and spliced into replies: a poller that sends the
+``etag`` it last saw gets ``{"not_modified": true}`` after a single stat, and
+one that sends per-section ``etags`` gets back only the sections that changed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
 import json
-import sys
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
 
-def get_project_state():
-    try:
-        with open(".bestai/GPS.json", "r") as f:
-            return json.load(f)
-    except:
-        return {"error": "GPS.json not found"}
-
-def handle_request(request):
-    method = request.get("method")
-    if method == "get_project_state":
-        return {"result": get_project_state()}
-    elif method == "get_version":
-        return {"result": "bestAI v1.3.0 (MCP Edition)"}
-    else:
-        return {"error": "Method not supported"}
-
-def main():
-    print("bestAI MCP Server starting...", file=sys.stderr)
-    # Simple JSON-RPC-like interface over stdio
-    for line in sys.stdin:
+from cockpit_report import StatCache
+
+VERSION = "bestAI v1.3.0 (MCP Edition)"
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+NOT_FOUND = -32001
+
+WORKERS = 8
+
+
+class RpcError(Exception):
+    """A JSON-RPC error; ``legacy_result`` is what the legacy protocol returned as its result instead."""
+
+    def __init__(self, code: int, message: str, legacy_result: Any = None) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.legacy_result = legacy_result
+
+
+class Raw:
+    """Pre-serialized JSON spliced verbatim into a response."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+def dump(value: Any) -> str:
+    return value.text if isinstance(value, Raw) else json.dumps(value)
+
+
+def etag_of(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class GpsState:
+    """GPS.json serialized section by section, with a content ETag per section."""
+
+    def __init__(self, sections: dict[str, str]) -> None:
+        self.sections = sections
+        self.etags = {name: etag_of(text) for name, text in sections.items()}
+        self.etag = etag_of("\n".join(f"{name}\t{tag}" for name, tag in self.etags.items()))
+        # Byte-identical to json.dumps(document) as the one-shot server printed it.
+        self.document = "{" + ", ".join(f"{json.dumps(name)}: {text}" for name, text in sections.items()) + "}"
+
+    @classmethod
+    def load(cls, path: str) -> "GpsState":
+        with open(path, "r", encoding="utf-8") as fh:
+            document = json.load(fh)
+        if not isinstance(document, dict):
+            raise ValueError("top level is not an object")
+        return cls({name: json.dumps(value) for name, value in document.items()})
+
+
+def parse_usage_log(path: str) -> dict[str, dict[str, Any]]:
+    rows: dict[str, dict[str, Any]] = {}
+    with open(path, "r", encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 3 or not fields[0]:
+                continue
+            # file<TAB>last_session<TAB>count<TAB>tag, as memory-compiler.sh writes it
+            rows[fields[0]] = {
+                "uses": int(fields[2]) if fields[2].isdigit() else 0,
+                "last_session": int(fields[1]) if fields[1].isdigit() else 0,
+                "tag": fields[3] if len(fields) > 3 else "",
+            }
+    return rows
+
+
+class Server:
+    def __init__(self, project_dir: str, memory_dir: Optional[str], event_log: Optional[str]) -> None:
+        import smart_context
+
+        self.smart_context = smart_context
+        self.project_dir = project_dir
+        self.gps_path = os.environ.get("GPS_FILE") or os.path.join(project_dir, ".bestai", "GPS.json")
+        self.memory_dir = memory_dir or os.environ.get("SMART_CONTEXT_MEMORY_DIR") or os.path.join(
+            os.path.expanduser("~"), ".claude", "projects", project_dir.replace("/", "-"), "memory"
+        )
+        self.event_log = event_log
+        self.files = StatCache()
+        self.memory = smart_context.MemoryCache()
+        self.methods: dict[str, tuple[Callable[[dict], Any], bool]] = {
+            # name: (handler, runs on the thread pool)
+            "get_version": (lambda params: VERSION, False),
+            "get_project_state": (self.get_project_state, False),
+            "smart_context_query": (self.smart_context_query, True),
+            "event_stats": (self.event_stats, True),
+            "list_memory_files": (self.list_memory_files, True),
+        }
+
+    # --- methods ---------------------------------------------------------------
+
+    def get_project_state(self, params: dict) -> Any:
+        try:
+            state = self.files.get(self.gps_path, GpsState.load)
+        except (OSError, ValueError) as exc:
+            raise RpcError(INTERNAL_ERROR, f"cannot read {self.gps_path}: {exc}", {"error": "GPS.json not found"})
+        if state is None:
+            raise RpcError(NOT_FOUND, "GPS.json not found", {"error": "GPS.json not found"})
+        section = params.get("section")
+        if section is not None:
+            if section not in state.sections:
+                raise RpcError(INVALID_PARAMS, f"no such GPS section: {section}")
+            if params.get("etag") == state.etags[section]:
+                return {"not_modified": True, "etag": state.etags[section]}
+            return Raw(
+                f'{{"section": {json.dumps(section)}, "etag": "{state.etags[section]}", '
+                f'"value": {state.sections[section]}}}'
+            )
+        if "etag" not in params and "etags" not in params:
+            return Raw(state.document)
+        if params.get("etag") == state.etag:
+            return {"not_modified": True, "etag": state.etag}
+        known = params.get("etags") or {}
+        if not isinstance(known, dict):
+            raise RpcError(INVALID_PARAMS, "etags must be an object of section -> etag")
+        changed = [name for name, tag in state.etags.items() if known.get(name) != tag]
+        removed = [name for name in known if name not in state.etags]
+        if known and not changed and not removed:
+            return {"not_modified": True, "etag": state.etag}
+        return Raw(
+            f'{{"etag": "{state.etag}", "etags": {json.dumps(state.etags)}, '
+            f'"changed": {{{", ".join(f"{json.dumps(name)}: {state.sections[name]}" for name in changed)}}}, '
+            f'"removed": {json.dumps(removed)}}}'
+        )
+
+    def smart_context_query(self, params: dict) -> dict:
+        prompt = params.get("prompt")
+        if not isinstance(prompt, str) or not prompt:
+            raise RpcError(INVALID_PARAMS, "prompt is required")
+        sc = self.smart_context
+        result = sc.build_context(
+            params.get("memory_dir") or self.memory_dir,
+            sc.encode(prompt),
+            settings=sc.Settings.from_env(),
+            cache=self.memory,
+            update_usage=False,
+        )
+        return {
+            "output": sc.decode(result.output),
+            "top_score": result.top_score,
+            "intent": result.intent,
+            "scope": result.scope,
+            "scores": [{"file": os.path.basename(path), "score": score} for score, path in result.scores],
+        }
+
+    def event_stats(self, params: dict) -> dict:
+        import event_log
+
+        log_path = params.get("log") or self.event_log or event_log.default_log_path()
+        by = params.get("by", ["hook", "action"])
+        if isinstance(by, str):
+            by = [column for column in by.split(",") if column]
+        unknown = [column for column in by if column not in event_log.GROUP_COLUMNS]
+        if unknown:
+            raise RpcError(INVALID_PARAMS, f"cannot group by: {', '.join(map(str, unknown))}")
+        project_dirs = params.get("project_dir") or []
+        query = {
+            "projects": list(params.get("projects") or [])
+            + event_log.matching_hashes([project_dirs] if isinstance(project_dirs, str) else project_dirs),
+            "hooks": list(params.get("hooks") or []),
+            "since": params.get("since"),
+            "window": params.get("window"),
+        }
         try:
-            req = json.loads(line)
-            res = handle_request(req)
-            print(json.dumps(res))
-            sys.stdout.flush()
-        except:
-            pass
+            quantile = float(params.get("quantile", 0.95))
+        except (TypeError, ValueError):
+            quantile = -1.0
+        if not 0 <= quantile <= 1:
+            raise RpcError(INVALID_PARAMS, "quantile must be a number between 0 and 1")
+
+        def build(path: str) -> dict:
+            counts = event_log.count(path, by=by, actions=list(params.get("actions") or []), **query)
+            return {
+                "log": path,
+                "total": sum(counts.values()),
+                "counts": [dict(zip(by, key), count=n) for key, n in sorted(counts.items(), key=lambda kv: -kv[1])],
+                "latency": event_log.latency(path, quantile=quantile, **query),
+            }
+
+        key = json.dumps(params, sort_keys=True)
+        stats = self.files.get(log_path, build, key=key)
+        if stats is None:
+            return {"log": log_path, "total": 0, "counts": [], "latency": {}}
+        return stats
+
+    def list_memory_files(self, params: dict) -> dict:
+        memory_dir = params.get("memory_dir") or self.memory_dir
+        if not os.path.isdir(memory_dir):
+            raise RpcError(NOT_FOUND, f"memory dir not found: {memory_dir}")
+        try:
+            usage = self.files.get(os.path.join(memory_dir, ".usage-log"), parse_usage_log) or {}
+        except OSError:
+            usage = {}
+        files = []
+        with os.scandir(memory_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".md") or not entry.is_file():
+                    continue
+                info = self.memory.get(entry.path)
+                if info is None:
+                    continue
+                st = entry.stat()
+                files.append(
+                    {
+                        "name": entry.name,
+                        "size": st.st_size,
+                        "mtime": info.mtime,
+                        "lines": len(info.lines),
+                        "user": info.has_user,
+                        "usage": usage.get(entry.name),
+                    }
+                )
+        files.sort(key=lambda item: item["name"])
+        return {"memory_dir": memory_dir, "files": files}
+
+    # --- dispatch --------------------------------------------------------------
+
+    async def call(self, message: Any, pool: ThreadPoolExecutor) -> Optional[str]:
+        """Response line for one request object; None for JSON-RPC notifications."""
+        if not isinstance(message, dict):
+            return error_line(None, INVALID_REQUEST, "Invalid Request")
+        legacy = "jsonrpc" not in message
+        if not isinstance(message.get("method"), str):
+            if legacy:
+                return legacy_line(error="Method not supported")
+            return error_line(None, INVALID_REQUEST, "Invalid Request")
+        request_id = message.get("id")
+        notification = not legacy and "id" not in message
+        params = message.get("params")
+        try:
+            if params is None:
+                params = {}
+            elif not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, "params must be an object")
+            entry = self.methods.get(message["method"])
+            if entry is None:
+                raise RpcError(METHOD_NOT_FOUND, "Method not supported")
+            handler, blocking = entry
+            if blocking:
+                result = await asyncio.get_running_loop().run_in_executor(pool, handler, params)
+            else:
+                result = handler(params)
+        except RpcError as exc:
+            if legacy:
+                if exc.legacy_result is not None:
+                    return legacy_line(result=exc.legacy_result)
+                return legacy_line(error=exc.message)
+            return None if notification else error_line(request_id, exc.code, exc.message)
+        except Exception as exc:  # report, never kill the server
+            print(f"mcp-server: {message['method']} failed: {exc!r}", file=sys.stderr)
+            if legacy:
+                return legacy_line(error=str(exc) or type(exc).__name__)
+            return None if notification else error_line(request_id, INTERNAL_ERROR, str(exc) or type(exc).__name__)
+        if notification:
+            return None
+        if legacy:
+            return f'{{"result": {dump(result)}}}'
+        return f'{{"jsonrpc": "2.0", "id": {json.dumps(request_id)}, "result": {dump(result)}}}'
+
+    async def handle_line(self, line: bytes, pool: ThreadPoolExecutor) -> Optional[str]:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return error_line(None, PARSE_ERROR, "Parse error")
+        if isinstance(message, list):
+            if not message:
+                return error_line(None, INVALID_REQUEST, "Invalid Request")
+            replies = await asyncio.gather(*(self.call(item, pool) for item in message))
+            replies = [reply for reply in replies if reply is not None]
+            return f"[{', '.join(replies)}]" if replies else None
+        return await self.call(message, pool)
+
+
+def error_line(request_id: Any, code: int, message: str) -> str:
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}})
+
+
+def legacy_line(result: Any = None, error: Optional[str] = None) -> str:
+    """A legacy-protocol reply: ``{"error": "<message>"}`` or ``{"result": ...}``."""
+    return json.dumps({"error": error} if error is not None else {"result": result})
+
+
+async def serve(server: Server) -> None:
+    loop = asyncio.get_running_loop()
+    out = sys.stdout
+    pending: set[asyncio.Task] = set()
+
+    async def respond(line: bytes) -> None:
+        reply = await server.handle_line(line, pool)
+        if reply is not None:
+            out.write(reply + "\n")
+            out.flush()
+
+    # stdin may be a regular file, which the event loop cannot poll: read it on its own thread.
+    with ThreadPoolExecutor(max_workers=1) as reader, ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        while True:
+            line = await loop.run_in_executor(reader, sys.stdin.buffer.readline)
+            if not line:
+                break
+            if not line.strip():
+                continue
+            task = asyncio.create_task(respond(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="bestAI JSON-RPC server over stdio")
+    parser.add_argument(
+        "--project-dir",
+        default=os.environ.get("CLAUDE_PROJECT_DIR") or os.getcwd(),
+        help="Project whose .bestai/GPS.json is served (default: $CLAUDE_PROJECT_DIR or cwd)",
+    )
+    parser.add_argument("--memory-dir", default=None, help="Memory dir (default: as preprocess-prompt.sh resolves it)")
+    parser.add_argument(
+        "--event-log", default=None, help="Event log (default: $BESTAI_EVENT_LOG or ~/.cache/bestai/events.jsonl)"
+    )
+    args = parser.parse_args()
+
+    print("bestAI MCP Server starting...", file=sys.stderr)
+    try:
+        asyncio.run(serve(Server(args.project_dir, args.memory_dir, args.event_log)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
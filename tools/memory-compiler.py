@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Run the memory-compiler pipeline in one process (see tools/memory_compiler.py).
+
+    memory-compiler.py run --memory-dir DIR     what hooks/memory-compiler.sh runs
+        [--dry-run] [--gc-age N] [--no-etag] [--total-recall]
+    memory-compiler.py bench [--files N]        bash vs Python engine on a synthetic dir
+
+``run`` defaults come from the hook's env vars (MEMORY_COMPILER_DRY_RUN,
+MEMORY_COMPILER_GC_AGE, BESTAI_OPENCLAW) and also refreshes the inverted
+trigram index in-process. Exit status 3 means the engine could not be loaded
+(nothing was locked or written), the only case where the hook falls back to
+its shell pipeline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+EXIT_UNAVAILABLE = 3
+
+try:
+    from memory_compiler import Settings, compile_memory
+except (ImportError, SyntaxError) as exc:
+    print(f"memory-compiler: engine unavailable: {exc}", file=sys.stderr)
+    raise SystemExit(EXIT_UNAVAILABLE)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_fixture(memory_dir: str, files: int) -> None:
+    os.makedirs(memory_dir, exist_ok=True)
+    rows = []
+    for i in range(files):
+        name = "MEMORY.md" if i == 0 else f"topic-{i:04d}.md"
+        tag = "[USER] " if i % 7 == 0 else ""
+        with open(os.path.join(memory_dir, name), "w") as fh:
+            fh.write(f"# Topic {i}\n")
+            fh.write("".join(f"- {tag}note {j} about module{i % 13} and token refresh\n" for j in range(12)))
+        if i % 3:
+            rows.append(f"{name}\t{i % 40}\t{i % 5}\t{'USER' if tag else 'AUTO'}\n")
+    with open(os.path.join(memory_dir, ".usage-log"), "w") as fh:
+        fh.writelines(rows)
+    with open(os.path.join(memory_dir, ".session-counter"), "w") as fh:
+        fh.write("40\n")
+
+
+def bench(files: int) -> dict:
+    hook = os.path.join(ROOT_DIR, "hooks", "memory-compiler.sh")
+    timings = {}
+    with tempfile.TemporaryDirectory(prefix="bestai-memory-compiler.") as tmp:
+        for engine in ("bash", "python"):
+            memory_dir = os.path.join(tmp, engine)
+            write_fixture(memory_dir, files)
+            env = dict(
+                os.environ,
+                SMART_CONTEXT_MEMORY_DIR=memory_dir,
+                MEMORY_COMPILER_ENGINE=engine,
+                BESTAI_EVENT_LOG_DISABLED="1",
+                HOME=tmp,
+            )
+            started = time.perf_counter()
+            subprocess.run(["bash", hook], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, env=env, check=True)
+            timings[engine] = time.perf_counter() - started
+        same = [
+            name
+            for name in (".usage-log", ".session-counter", "MEMORY.md", "gc-archive.md")
+            if _read(os.path.join(tmp, "bash", name)) == _read(os.path.join(tmp, "python", name))
+        ]
+        shutil.rmtree(os.path.join(tmp, "bash"), ignore_errors=True)
+    return {
+        "files": files,
+        "bash_ms": round(timings["bash"] * 1000, 1),
+        "python_ms": round(timings["python"] * 1000, 1),
+        "speedup": round(timings["bash"] / timings["python"], 1) if timings["python"] else None,
+        "identical": same,
+    }
+
+
+def _read(path: str):
+    try:
+        with open(path, "rb") as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+
+def main() -> int:
+    defaults = Settings.from_env()
+    parser = argparse.ArgumentParser(description="bestAI memory compiler")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Score, index and garbage-collect a memory directory")
+    run_parser.add_argument("--memory-dir", required=True, help="Memory directory")
+    run_parser.add_argument("--dry-run", action="store_true", default=defaults.dry_run, help="Print actions only")
+    run_parser.add_argument("--gc-age", type=int, default=defaults.gc_age, help="Sessions without use before GC")
+    run_parser.add_argument("--no-etag", action="store_true", help="Skip the .file-metadata / .trigram-cache update")
+    run_parser.add_argument(
+        "--total-recall", action="store_true", default=defaults.total_recall, help="Index only: no GC, no trimming"
+    )
+    bench_parser = sub.add_parser("bench", help="Time the bash and Python engines on the same fixture")
+    bench_parser.add_argument("--files", type=int, default=200, help="Memory files in the fixture (default: 200)")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        print(json.dumps(bench(max(1, args.files))))
+        return 0
+
+    if not os.path.isdir(args.memory_dir):
+        print(f"memory-compiler: not a directory: {args.memory_dir}", file=sys.stderr)
+        return 1
+    settings = Settings(
+        dry_run=args.dry_run,
+        gc_age=args.gc_age,
+        total_recall=args.total_recall,
+        etag=not args.no_etag,
+        collate=defaults.collate,
+    )
+    if settings.total_recall:
+        print("[bestAI] [OPENCLAW] Total Recall active. Bypassing GC and Memory Trimming.", file=sys.stderr)
+    report = compile_memory(args.memory_dir, settings)
+    sys.stdout.write("".join(report.messages))
+    if not settings.dry_run:
+        try:
+            from memory_index import build_index
+
+            build_index(args.memory_dir)
+        except Exception:  # the index is an optional accelerator, as in the hook
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
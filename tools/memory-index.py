@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Build and query the inverted memory index (see tools/memory_index.py).
+
+    memory-index.py build --memory-dir DIR            incremental rebuild (memory-compiler.sh)
+    memory-index.py trigram-scores --memory-dir DIR   prompt on stdin -> "score<TAB>file" lines
+        [--bm25-keywords FILE]                        ... plus a third column of BM25F points
+    memory-index.py bench --memory-dir DIR            index vs per-file `comm -12` timing
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from memory_index import bm25_points, bm25_scores, build_index, file_head, memory_files, trigram_scores
+from smart_context import trigrams
+
+BENCH_PROMPT = "fix the authentication token refresh error in the login flow"
+
+# The per-file path preprocess-prompt.sh takes when the E-Tag cache is valid.
+COMM_LOOP = r"""
+runs=$1; shift; tri_dir=$1; shift
+prompt_sorted=$(cat)
+for _ in $(seq "$runs"); do
+    for name in "$@"; do
+        score=$(comm -12 <(echo "$prompt_sorted") <(sort "$tri_dir/$name.tri") | wc -l)
+        echo "$((score + 0))	$name"
+    done
+done
+"""
+
+
+def read_prompt(args: argparse.Namespace) -> bytes:
+    if getattr(args, "prompt", None) is not None:
+        return os.fsencode(args.prompt)
+    return sys.stdin.buffer.read()
+
+
+def bench(memory_dir: str, prompt: bytes, runs: int) -> dict:
+    build_index(memory_dir)
+    names = sorted(memory_files(memory_dir))
+    prompt_grams = trigrams(prompt)
+
+    with tempfile.TemporaryDirectory() as tri_dir:
+        for name in names:
+            with open(os.path.join(memory_dir, name), "rb") as fh:
+                grams = sorted(trigrams(file_head(fh.read())))
+            with open(os.path.join(tri_dir, name + ".tri"), "wb") as out:
+                out.write(b"".join(gram + b"\n" for gram in grams))
+        env = dict(os.environ, LC_ALL="C")
+        started = time.perf_counter()
+        proc = subprocess.run(
+            ["bash", "-c", COMM_LOOP, "comm-bench", str(runs), tri_dir, *names],
+            input=b"\n".join(sorted(prompt_grams)) + b"\n",
+            stdout=subprocess.PIPE,
+            env=env,
+            check=True,
+        )
+        comm_s = (time.perf_counter() - started) / runs
+
+    comm_scores: dict[str, int] = {}
+    for line in proc.stdout.decode("utf-8", "surrogateescape").splitlines()[: len(names)]:
+        score, name = line.split("\t", 1)
+        comm_scores[name] = int(score)
+
+    started = time.perf_counter()
+    for _ in range(runs):
+        index_scores = trigram_scores(memory_dir, prompt_grams)
+    index_s = (time.perf_counter() - started) / runs
+
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "trigram-scores", "--memory-dir", memory_dir],
+        input=prompt,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    cold_s = time.perf_counter() - started
+
+    return {
+        "files": len(names),
+        "prompt_trigrams": len(prompt_grams),
+        "runs": runs,
+        "comm_ms_per_query": round(comm_s * 1000, 3),
+        "index_ms_per_query": round(index_s * 1000, 3),
+        "index_cold_process_ms": round(cold_s * 1000, 3),
+        "speedup": round(comm_s / index_s, 1) if index_s else None,
+        "scores_match": comm_scores == index_scores,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="bestAI memory index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+        ("build", "Incrementally (re)build the index"),
+        ("trigram-scores", "Score every indexed file against a prompt read from stdin"),
+        ("bench", "Compare index scoring against the per-file comm path"),
+    ):
+        sub_parser = sub.add_parser(name, help=help_text)
+        sub_parser.add_argument("--memory-dir", required=True, help="Memory directory")
+    sub.choices["trigram-scores"].add_argument(
+        "--bm25-keywords", metavar="FILE", help="Also print BM25F points for the keywords in FILE (one per line)"
+    )
+    sub.choices["bench"].add_argument("--prompt", default=BENCH_PROMPT, help="Prompt to score")
+    sub.choices["bench"].add_argument("--runs", type=int, default=20, help="Queries per path (default: 20)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.memory_dir):
+        print(f"memory-index: not a directory: {args.memory_dir}", file=sys.stderr)
+        return 1
+
+    if args.command == "build":
+        stats = build_index(args.memory_dir)
+        print(
+            f"memory-index: {stats['files']} files "
+            f"({stats['updated']} updated, {stats['unchanged']} unchanged, {stats['removed']} removed)"
+        )
+        return 0
+    if args.command == "trigram-scores":
+        scores = trigram_scores(args.memory_dir, trigrams(read_prompt(args)))
+        if not args.bm25_keywords:
+            sys.stdout.write("".join(f"{score}\t{name}\n" for name, score in sorted(scores.items())))
+            return 0
+        with open(args.bm25_keywords, "rb") as fh:
+            keywords = [line for line in fh.read().split(b"\n") if line]
+        bm25 = bm25_scores(args.memory_dir, keywords)
+        sys.stdout.write(
+            "".join(
+                f"{score}\t{name}\t{bm25_points(bm25[name])}\n"
+                for name, score in sorted(scores.items())
+                if name in bm25
+            )
+        )
+        return 0
+    print(json.dumps(bench(args.memory_dir, read_prompt(args), max(1, args.runs))))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
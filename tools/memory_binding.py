@@ -0,0 +1,286 @@
+"""Task-memory binding over a line-level index of the project's memory.
+
+task-memory-binding.sh grepped every memory file, the state file and GPS.json
+with ``grep -iFf`` for the task's keywords. Then, for every matched line, it
+forked tr, sed, cut, grep and date to clean the excerpt, classify it
+HARD/SOFT, find a date hint and turn that into an epoch. ``BindingIndex``
+does that work once per line and keeps it in
+``.bestai/memory-binding-index.json``::
+
+    files  path -> {mtime_ns, size, lines: [[line_no, text, level, date, epoch], ...]}
+
+``text`` is the whitespace-collapsed line; ``level``, ``date`` and ``epoch``
+are computed from its 220-byte excerpt as the script did, with the file name's
+date as the fallback hint. Files whose (mtime_ns, size) did not change keep
+their entries, so binding a task is a keyword scan over cached text plus
+the TTL arithmetic, and one process can bind many tasks (``bind`` per task).
+
+``bind`` returns the same object as ``task-memory-binding.sh --json``.
+Keyword matching is ASCII case-insensitive substring search, as ``grep -iF``
+with the script's ASCII keywords, and files rank by matching line count.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from bisect import bisect_right
+
+INDEX_FILE = os.path.join(".bestai", "memory-binding-index.json")
+INDEX_VERSION = 1
+EXCERPT_BYTES = 220
+MIN_KEYWORD_LENGTH = 4
+
+STOPWORDS = frozenset(
+    "this that with from have will would could should about into your please task problem issue which"
+    " kiedy gdzie jest oraz który ktory zeby very more less".split()
+)
+_UPPER = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", b"abcdefghijklmnopqrstuvwxyz")
+_UPPER_STR = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+_KEYWORD_SPLIT = re.compile(rb"[^a-z0-9_-]+")
+HARD_RE = re.compile(r"\[hard\]|\[policy\]|\bmust\b|\bnie wolno\b|\bzakaz\b", re.IGNORECASE)
+LINE_DATE_RE = re.compile(r"[0-9]{4}[-/][0-9]{2}[-/][0-9]{2}")
+FILE_DATE_RE = re.compile(r"[0-9]{4}[-_][0-9]{2}[-_][0-9]{2}")
+_DATE_SEPARATORS = str.maketrans("/_", "--")
+
+CONFIDENCE = {
+    # (level, dated) -> confidence, as task-memory-binding.sh assigned them
+    ("HARD", True): 0.92,
+    ("HARD", False): 0.62,
+    ("SOFT", True): 0.84,
+    ("SOFT", False): 0.58,
+    ("OVERRIDDEN", True): 0.45,
+    ("OVERRIDDEN", False): 0.45,
+}
+COUNT_KEYS = ("hard_count", "soft_count", "overridden_count", "dropped_expired_count")
+
+
+def keywords(task: str) -> list[str]:
+    """The task's search terms: ASCII-lowercased ``[a-z0-9_-]`` runs of 4+ characters, minus stopwords."""
+    words = _KEYWORD_SPLIT.split(task.encode("utf-8", "surrogateescape").translate(_UPPER))
+    return sorted({w.decode() for w in words if len(w) >= MIN_KEYWORD_LENGTH and w.decode() not in STOPWORDS})
+
+
+def date_hint(text: str, pattern: re.Pattern = LINE_DATE_RE) -> str:
+    match = pattern.search(text)
+    return match.group(0).translate(_DATE_SEPARATORS) if match else ""
+
+
+def _days_from_civil(year: int, month: int, day: int) -> int:
+    """Days since 1970-01-01 in the proleptic Gregorian calendar (year 0 included, like GNU date)."""
+    year -= month <= 2
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    return era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + doy - 719468
+
+
+def to_epoch(date: str) -> int | None:
+    """``date -u -d YYYY-MM-DD +%s``, or None for a date that does not exist."""
+    year, month, day = (int(part) for part in date.split("-"))
+    if not 1 <= month <= 12 or day < 1:
+        return None
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if day > (31, 29 if leap else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)[month - 1]:
+        return None
+    return _days_from_civil(year, month, day) * 86400
+
+
+def excerpt(text: str) -> str:
+    """``cut -c1-220`` of the cleaned line: GNU cut counts bytes."""
+    return text.encode("utf-8", "surrogateescape")[:EXCERPT_BYTES].decode("utf-8", "replace")
+
+
+def index_lines(data: bytes, file_date: str) -> list[list]:
+    """[line_no, text, level, date, epoch] for every non-blank line of ``data``."""
+    entries = []
+    lines = data.split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    for number, raw in enumerate(lines, 1):
+        cleaned = b" ".join(raw.split())
+        if not cleaned:
+            continue
+        text = cleaned.decode("utf-8", "surrogateescape")
+        shown = excerpt(text)
+        date = date_hint(shown) or file_date
+        entries.append([number, text, "HARD" if HARD_RE.search(shown) else "SOFT", date, to_epoch(date) if date else None])
+    return entries
+
+
+class _File:
+    """One indexed file: its entries plus a lowercased blob for keyword search."""
+
+    __slots__ = ("path", "lines", "blob", "starts")
+
+    def __init__(self, path: str, lines: list[list]) -> None:
+        self.path = path
+        self.lines = lines
+        self.blob = "\n".join(entry[1] for entry in lines).translate(_UPPER_STR)
+        self.starts = []
+        offset = 0
+        for entry in lines:
+            self.starts.append(offset)
+            offset += len(entry[1]) + 1
+
+    def matches(self, words: list[str]) -> list[int]:
+        """Indexes into ``lines`` of the entries containing any of ``words``, in file order."""
+        hit: set[int] = set()
+        blob, starts = self.blob, self.starts
+        for word in words:
+            position = blob.find(word)
+            while position >= 0:
+                line = bisect_right(starts, position) - 1
+                hit.add(line)
+                # Resume on the next line: one hit is enough to select this one.
+                position = blob.find(word, starts[line + 1]) if line + 1 < len(starts) else -1
+        return sorted(hit)
+
+
+class BindingIndex:
+    """Line index over the memory files, state file and GPS.json of one project."""
+
+    def __init__(self, project_dir: str, memory_dir: str | None = None, index_path: str | None = None) -> None:
+        self.project_dir = os.path.abspath(project_dir)
+        self.memory_dir = memory_dir or os.path.join(
+            os.path.expanduser("~"), ".claude", "projects", self.project_dir.replace("/", "-"), "memory"
+        )
+        self.index_path = index_path or os.path.join(self.project_dir, INDEX_FILE)
+        self.files: list[_File] = []
+        self.stats = {"files": 0, "unchanged": 0, "updated": 0, "removed": 0}
+
+    def candidates(self) -> list[str]:
+        """Memory ``*.md`` files in name order, then the state file and GPS.json."""
+        found = []
+        try:
+            entries = sorted(os.scandir(self.memory_dir), key=lambda entry: entry.name)
+        except OSError:
+            entries = []
+        for entry in entries:
+            if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False):
+                found.append(entry.path)
+        for extra in (
+            os.path.join(self.project_dir, ".claude", "state-of-system-now.md"),
+            os.path.join(self.project_dir, ".bestai", "GPS.json"),
+        ):
+            if os.path.isfile(extra):
+                found.append(extra)
+        return found
+
+    def _load(self) -> dict:
+        try:
+            with open(self.index_path, encoding="utf-8") as fh:
+                index = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+            return {}
+        return index.get("files", {})
+
+    def _save(self, files: dict) -> None:
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp = f"{self.index_path}.{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"version": INDEX_VERSION, "files": files}, fh, separators=(",", ":"))
+        os.replace(tmp, self.index_path)
+
+    def refresh(self) -> "BindingIndex":
+        """Re-index changed files, drop vanished ones and save the index if anything moved."""
+        indexed = self._load()
+        current: dict = {}
+        for path in self.candidates():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            self.stats["files"] += 1
+            entry = indexed.get(path)
+            if entry and (entry.get("mtime_ns"), entry.get("size")) == (st.st_mtime_ns, st.st_size):
+                current[path] = entry
+                self.stats["unchanged"] += 1
+                continue
+            try:
+                with open(path, "rb") as fh:
+                    data = fh.read()
+            except OSError:
+                continue
+            name = os.path.basename(path)
+            file_date = date_hint(name) or date_hint(name, FILE_DATE_RE)
+            current[path] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "lines": index_lines(data, file_date)}
+            self.stats["updated"] += 1
+        self.stats["removed"] = len(indexed.keys() - current.keys())
+        if self.stats["updated"] or self.stats["removed"]:
+            try:
+                self._save(current)
+            except OSError:
+                pass  # read-only project: bind from the fresh entries without caching them
+        self.files = [_File(path, entry["lines"]) for path, entry in current.items()]
+        return self
+
+    def _source(self, path: str) -> str:
+        for root in (self.project_dir, self.memory_dir):
+            if path.startswith(root + "/"):
+                return path[len(root) + 1 :]
+        return path
+
+    def bind(
+        self,
+        task: str,
+        max_files: int = 3,
+        max_lines: int = 12,
+        now: int = 0,
+        hard_ttl_days: int = 0,
+        soft_ttl_days: int = 0,
+        allow_hard_override: bool = False,
+    ) -> dict:
+        """task-memory-binding.sh's JSON object for ``task``; ``now`` is the epoch ages are measured at."""
+        counts = dict.fromkeys(COUNT_KEYS, 0)
+        bindings: list[dict] = []
+        words = keywords(task)
+        if words:
+            scored = []
+            for f in self.files:
+                hits = f.matches(words)
+                if hits:
+                    scored.append((len(hits), f, hits))
+            scored.sort(key=lambda item: (-item[0], item[1].path))
+            for score, f, hits in scored[: max(max_files, 0)]:
+                for line in hits:
+                    number, text, base_level, date, epoch = f.lines[line]
+                    dated = epoch is not None
+                    age_days = max((now - epoch) // 86400, 0) if dated else None
+                    ttl_days = hard_ttl_days if base_level == "HARD" else soft_ttl_days
+                    if dated and ttl_days > 0 and age_days > ttl_days:
+                        counts["dropped_expired_count"] += 1
+                        continue
+                    level = "OVERRIDDEN" if base_level == "HARD" and allow_hard_override else base_level
+                    counts[f"{level.lower()}_count"] += 1
+                    bindings.append(
+                        {
+                            "level": level,
+                            "base_level": base_level,
+                            "source": f"{self._source(f.path)}:{number}",
+                            "excerpt": excerpt(text),
+                            "score": score,
+                            "confidence": CONFIDENCE[(level, dated)],
+                            "date_status": "dated" if dated else "missing",
+                            "decision_date": date or None,
+                            "age_days": age_days,
+                        }
+                    )
+                    if len(bindings) >= max_lines:
+                        break
+                if len(bindings) >= max_lines:
+                    break
+        return {"task": task, "bindings": bindings, **counts, "metadata": dict(counts)}
+
+
+def render_text(result: dict) -> str:
+    """The script's non-JSON output: a markdown block, or "" when nothing bound."""
+    if not result["bindings"]:
+        return ""
+    lines = ["### Binding Context (auto)"]
+    for item in result["bindings"]:
+        lines.append(f"[{item['level']}] {item['source']} — {item['excerpt']} (confidence={item['confidence']})")
+    return "\n".join(lines)
@@ -0,0 +1,595 @@
+"""Python port of the hooks/memory-compiler.sh Stop hook pipeline.
+
+``compile_memory`` runs the same steps as the bash hook (session counter,
+folding ``.usage-log.delta`` into ``.usage-log``, GC,
+scoring + ``context-index.md``, the 200-line ``MEMORY.md`` cap, E-Tag cache)
+and leaves the memory directory in the same state, but reads ``.usage-log``
+and every memory file once, applies all updates in memory and writes each
+output file once (atomically). Shell quirks are mirrored the way
+tools/smart_context.py does it:
+
+- ``while read`` loops collapse tab runs and never see an unterminated last
+  line, while ``awk``/``cut`` lookups in ``score_entry`` do;
+- the hook rewrites the usage log after every file, so rows get one
+  normalization pass per file before the next file is scored;
+- arithmetic expansion reads a leading 0 as octal, ``[ -gt ]`` does not;
+- ``find | sort`` order follows ``LC_COLLATE``.
+
+The only intended differences are the ``Generated:`` timestamp and the row
+order of ``.file-metadata`` (bash writes associative-array order; here rows
+are sorted).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import hashlib
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from smart_context import DIGITS_RE, Collator, split_lines, trigrams
+
+MAX_MEMORY_LINES = 200
+MAX_OVERFLOW_LINES = 500
+TRIGRAM_HEAD_LINES = 100
+GC_HEAD_LINES = 20
+SKIPPED_FILES = ("context-index.md", "gc-archive.md")
+CLUSTERS = (
+    ("core", ("MEMORY.md", "frozen-fragments.md")),
+    ("decisions", ("decisions.md", "preferences.md")),
+    ("operational", ("pitfalls.md", "session-log.md", "observations.md")),
+    ("other", ()),
+)
+METADATA_HEADER = b"# filename\tmtime\tsize\tetag\thas_user\ttrigram_file\n"
+USAGE_DELTA = ".usage-log.delta"
+SEALED_DELTA_RE = re.compile(r"\.usage-log\.delta\.[0-9]")
+LOCK_FILE = ".memory-compiler.lock"
+LOCK_TIMEOUT_S = 30
+
+
+@dataclass
+class Settings:
+    dry_run: bool = False
+    gc_age: int = 20
+    total_recall: bool = False
+    etag: bool = True
+    collate: str = "C"
+
+    @classmethod
+    def from_env(cls, env: Optional[dict] = None) -> "Settings":
+        env = os.environ if env is None else env
+        try:
+            gc_age = int(env.get("MEMORY_COMPILER_GC_AGE") or 20)
+        except ValueError:
+            gc_age = 20
+        return cls(
+            dry_run=(env.get("MEMORY_COMPILER_DRY_RUN") or env.get("BESTAI_DRY_RUN") or "0") != "0",
+            gc_age=gc_age,
+            total_recall=env.get("BESTAI_OPENCLAW", "0") == "1",
+            collate=env.get("LC_ALL") or env.get("LC_COLLATE") or env.get("LANG") or "C",
+        )
+
+
+@dataclass
+class Report:
+    session: int = 0
+    archived: list[str] = field(default_factory=list)
+    indexed: int = 0
+    trimmed_lines: int = 0
+    messages: list[str] = field(default_factory=list)
+
+
+# --- shell-equivalent helpers --------------------------------------------------------
+
+
+def read_fields(line: bytes, count: int) -> list[bytes]:
+    """``IFS=$'\\t' read -r a b ...``: tab runs collapse, the last name takes the rest."""
+    fields = re.split(rb"\t+", line.strip(b"\t"), maxsplit=count - 1) if line.strip(b"\t") else []
+    return fields + [b""] * (count - len(fields))
+
+
+def arith(value: bytes) -> int:
+    """``$((value))`` for the digit strings the hook feeds it (leading 0 = octal)."""
+    if not DIGITS_RE.fullmatch(value):
+        return 0
+    if len(value) > 1 and value.startswith(b"0"):
+        try:
+            return int(value, 8)
+        except ValueError:
+            return 0
+    return int(value)
+
+
+def head_lines(data: bytes, count: int) -> bytes:
+    """``head -n COUNT``."""
+    end = -1
+    for _ in range(count):
+        end = data.find(b"\n", end + 1)
+        if end < 0:
+            return data
+    return data[: end + 1]
+
+
+def tail_lines(data: bytes, count: int) -> bytes:
+    """``tail -n COUNT`` (an unterminated last line counts as a line)."""
+    end = len(data) - 1 if data.endswith(b"\n") else len(data)
+    start = end
+    for _ in range(count):
+        start = data.rfind(b"\n", 0, start)
+        if start < 0:
+            return data
+    return data[start + 1 :]
+
+
+def append_once(path: str, data: bytes) -> None:
+    """``>> path`` with everything in a single write."""
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, data: bytes, private: bool = False) -> None:
+    """Replace ``path`` in one rename; ``private`` gives ``mktemp``'s 0600 mode."""
+    directory = os.path.dirname(path) or "."
+    if private:
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    else:
+        tmp = f"{path}.tmp.{os.getpid()}"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# --- .usage-log ----------------------------------------------------------------------
+
+
+class UsageLog:
+    """``.usage-log`` rows held in memory; ``dirty`` once the hook would have rewritten it."""
+
+    def __init__(self, data: Optional[bytes]):
+        self.exists = data is not None
+        lines, terminated = split_lines(data or b"")
+        # `while read` never sees an unterminated last row; awk in score_entry does.
+        self.rows = lines if terminated else lines[:-1]
+        self.tail = None if terminated else lines[-1]
+        self.stable = False
+        self.dirty = False
+
+    def lookup(self, filename: bytes) -> Optional[list[bytes]]:
+        """``awk -F'\\t' '$1 == fn'`` + ``cut -f2/-f3/-f4`` on the first matching row."""
+        for row in self.rows + ([self.tail] if self.tail is not None else []):
+            if row.split(b"\t", 1)[0] == filename:
+                if b"\t" not in row:
+                    return [row, row, row]  # cut prints delimiter-less lines whole
+                fields = row.split(b"\t")
+                return [fields[i] if i < len(fields) else b"" for i in (1, 2, 3)]
+        return None
+
+    def _normalize(self) -> None:
+        """One ``while read`` rewrite pass: numeric fields, default tag, tail dropped."""
+        if not self.stable:
+            rows = []
+            for row in self.rows:
+                fname, last_sess, count, tag = read_fields(row, 4)
+                rows.append(
+                    b"\t".join(
+                        (
+                            fname,
+                            last_sess if DIGITS_RE.fullmatch(last_sess) else b"0",
+                            count if DIGITS_RE.fullmatch(count) else b"0",
+                            tag or b"AUTO",
+                        )
+                    )
+                )
+            self.stable = rows == self.rows and self.tail is None
+            self.rows, self.tail = rows, None
+
+    def ensure(self, filename: bytes, tag: bytes, session: int) -> None:
+        """``ensure_usage_entry``: bootstrap a missing row, never downgrade USER."""
+        self._normalize()
+        found = False
+        for i, row in enumerate(self.rows):
+            fname, last_sess, count, entry_tag = row.split(b"\t", 3)
+            if fname == filename:
+                found = True
+                if tag == b"USER" and entry_tag != b"USER":
+                    self.rows[i] = b"\t".join((fname, last_sess, count, b"USER"))
+        if not found:
+            self.rows.append(b"\t".join((filename, str(session).encode(), b"1", tag)))
+        self.exists = self.dirty = True
+
+    def drop(self, filenames: set[bytes]) -> None:
+        """``run_gc`` clean-up: ``read -r fname rest`` rewrite without archived rows."""
+        rows = []
+        for row in self.rows:
+            fname, rest = read_fields(row, 2)
+            if fname not in filenames or not fname:
+                rows.append(fname + b"\t" + rest)
+        self.rows, self.tail, self.stable = rows, None, False
+        self.dirty = True
+
+    def fold(self, deltas: list[bytes]) -> None:
+        """Apply ``file<TAB>session<TAB>hits<TAB>tag`` deltas in one rewrite pass."""
+        hits: dict[bytes, int] = {}
+        last: dict[bytes, bytes] = {}
+        tags: dict[bytes, bytes] = {}
+        for line in deltas:
+            fname, sess, count, tag = read_fields(line, 4)
+            if not fname:
+                continue
+            hits[fname] = hits.get(fname, 0) + (int(count) if DIGITS_RE.fullmatch(count) else 1)
+            last[fname] = sess if DIGITS_RE.fullmatch(sess) else b"0"
+            tags.setdefault(fname, b"AUTO")
+            if tag == b"USER":
+                tags[fname] = b"USER"
+        if not hits:
+            return
+        rows = []
+        found: set[bytes] = set()
+        for row in self.rows:
+            fname, sess, count, tag = read_fields(row, 4)
+            if not fname:
+                continue
+            sess = sess if DIGITS_RE.fullmatch(sess) else b"0"
+            count = count if DIGITS_RE.fullmatch(count) else b"0"
+            tag = tag or b"AUTO"
+            if fname in hits:
+                found.add(fname)
+                if tags[fname] == b"USER":
+                    tag = b"USER"
+                rows.append(b"\t".join((fname, last[fname], str(arith(count) + hits[fname]).encode(), tag)))
+            else:
+                rows.append(b"\t".join((fname, sess, count, tag)))
+        for fname, count in hits.items():
+            if fname not in found:
+                rows.append(b"\t".join((fname, last[fname], str(count).encode(), tags[fname])))
+        self.rows, self.tail, self.stable = rows, None, False
+        self.exists = self.dirty = True
+
+    def dump(self) -> bytes:
+        return b"".join(row + b"\n" for row in self.rows)
+
+
+class UsageDeltas:
+    """Pending ``.usage-log.delta`` lines (see the fold step in memory-compiler.sh).
+
+    With ``seal`` the live delta is renamed to ``.usage-log.delta.<id>`` so new
+    appends start a fresh file; ``.usage-log.delta.done`` records how many lines
+    of each sealed file are folded, and ``commit`` deletes sealed files that
+    gained nothing since the previous run. Without ``seal`` (dry runs) nothing is
+    renamed and the live delta counts as pending too.
+    """
+
+    def __init__(self, memory_dir: str, seal: bool):
+        self.memory_dir = memory_dir
+        self.live = os.path.join(memory_dir, USAGE_DELTA)
+        self.done_path = self.live + ".done"
+        self.done: dict[str, int] = {}
+        self.now: dict[str, tuple[int, bool]] = {}
+        self.pending: list[bytes] = []
+        lines, _ = split_lines(_read(self.done_path) or b"")
+        for line in lines:
+            name, count = read_fields(line, 2)
+            if DIGITS_RE.fullmatch(count):
+                self.done[os.fsdecode(name)] = int(count)
+        if seal and os.path.exists(self.live):
+            sealed_id = int(f"{int(time.time())}{os.getpid():07d}")
+            while os.path.exists(f"{self.live}.{sealed_id}"):
+                sealed_id += 1
+            try:
+                os.rename(self.live, f"{self.live}.{sealed_id}")
+            except OSError:
+                pass
+        for name in sorted(n for n in os.listdir(memory_dir) if SEALED_DELTA_RE.match(n)):
+            data = _read(os.path.join(memory_dir, name))
+            if data is None:
+                continue
+            complete, terminated = split_lines(data)
+            if not terminated:
+                complete = complete[:-1]
+            self.now[name] = (len(complete), terminated)
+            self.pending.extend(complete[self.done.get(name, 0) :])
+        if not seal:
+            complete, terminated = split_lines(_read(self.live) or b"")
+            self.pending.extend(complete if terminated else complete[:-1])
+
+    def commit(self) -> None:
+        rows = []
+        for name, (count, terminated) in sorted(self.now.items()):
+            if self.done.get(name) == count and terminated:
+                try:
+                    os.unlink(os.path.join(self.memory_dir, name))
+                except OSError:
+                    pass
+            else:
+                rows.append(f"{name}\t{count}\n".encode())
+        if rows:
+            atomic_write(self.done_path, b"".join(rows), private=True)
+        else:
+            try:
+                os.unlink(self.done_path)
+            except OSError:
+                pass
+
+
+@contextlib.contextmanager
+def compiler_lock(memory_dir: str):
+    """``flock -w 30`` on ``.memory-compiler.lock``; yields False on timeout."""
+    fd = os.open(os.path.join(memory_dir, LOCK_FILE), os.O_WRONLY | os.O_CREAT, 0o666)
+    try:
+        deadline = time.monotonic() + LOCK_TIMEOUT_S
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    yield False
+                    return
+                time.sleep(0.05)
+        yield True
+    finally:
+        os.close(fd)
+
+
+# --- E-Tag cache ---------------------------------------------------------------------
+
+
+class ETagCache:
+    """modules/etag-cache-lib.sh: ``.file-metadata`` rows plus ``.trigram-cache/*.tri``."""
+
+    def __init__(self, memory_dir: str):
+        self.memory_dir = memory_dir
+        self.path = os.path.join(memory_dir, ".file-metadata")
+        self.entries: dict[bytes, bytes] = {}
+        self.tri_files: dict[str, bytes] = {}
+        self.removed: list[str] = []
+        try:
+            with open(self.path, "rb") as fh:
+                lines, terminated = split_lines(fh.read())
+        except OSError:
+            lines, terminated = [], True
+        if not terminated:
+            lines = lines[:-1]
+        for line in lines:
+            fields = read_fields(line, 6)
+            if not fields[0] or fields[0].startswith(b"#"):
+                continue
+            self.entries[fields[0]] = b"\t".join(fields[1:])
+
+    def compute(self, filename: bytes, path: str, data: bytes) -> None:
+        st = os.stat(path)
+        has_user = b"1" if b"[USER]" in data else b"0"
+        grams = set()
+        for gram in trigrams(head_lines(data, TRIGRAM_HEAD_LINES)):
+            grams.add(gram)
+        tri_file = b".trigram-cache/" + filename + b".tri"
+        self.tri_files[os.fsdecode(tri_file)] = b"".join(gram + b"\n" for gram in sorted(grams))
+        etag = hashlib.md5(data).hexdigest().encode()
+        self.entries[filename] = b"\t".join(
+            (str(int(st.st_mtime)).encode(), str(st.st_size).encode(), etag, has_user, tri_file)
+        )
+
+    def remove(self, filename: bytes) -> None:
+        entry = self.entries.pop(filename, None)
+        if entry is not None:
+            tri_file = entry.split(b"\t")[4] if entry.count(b"\t") >= 4 else b""
+            if tri_file:
+                self.removed.append(os.fsdecode(tri_file))
+
+    def persist(self) -> None:
+        for tri_file in self.removed:
+            try:
+                os.unlink(os.path.join(self.memory_dir, tri_file))
+            except OSError:
+                pass
+        if self.tri_files:
+            os.makedirs(os.path.join(self.memory_dir, ".trigram-cache"), exist_ok=True)
+        for tri_file, data in self.tri_files.items():
+            atomic_write(os.path.join(self.memory_dir, tri_file), data)
+        rows = [name + b"\t" + self.entries[name] + b"\n" for name in sorted(self.entries)]
+        atomic_write(self.path, METADATA_HEADER + b"".join(rows), private=True)
+
+
+# --- pipeline ------------------------------------------------------------------------
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as fh:
+            return fh.read()
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+
+
+def memory_files(memory_dir: str, collator: Collator) -> list[str]:
+    """``find "$MEMORY_DIR" -maxdepth 1 -type f -name '*.md' | sort`` minus skipped names."""
+    with os.scandir(memory_dir) as entries:
+        paths = [
+            entry.path
+            for entry in entries
+            if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False)
+        ]
+    ordered = [path for _key, path in sorted(zip(collator.keys(paths), paths), key=lambda pair: pair[0])]
+    return [
+        path
+        for path in ordered
+        if not os.path.basename(path).startswith(".") and os.path.basename(path) not in SKIPPED_FILES
+    ]
+
+
+def score_entry(usage: Optional[list[bytes]], has_user: bool, session: int, gc_age: int) -> int:
+    last_sess, use_count, tag = usage if usage is not None else (b"0", b"0", b"AUTO")
+    base_weight = 5
+    if has_user:
+        tag, base_weight = b"USER", 10
+    sessions_ago = session - arith(last_sess)
+    recency_bonus = 3 if sessions_ago <= 3 else 1 if sessions_ago <= 10 else 0
+    # `[ -gt 20 ]` compares in decimal, the sum uses arithmetic expansion.
+    effective_use = 20 if DIGITS_RE.fullmatch(use_count) and int(use_count) > 20 else arith(use_count)
+    age_penalty = 0
+    if sessions_ago > gc_age and tag == b"AUTO":
+        age_penalty = min((sessions_ago - gc_age) // 2, 15)
+    return max(0, base_weight + recency_bonus + effective_use - age_penalty)
+
+
+def _session(memory_dir: str) -> int:
+    raw = _read(os.path.join(memory_dir, ".session-counter"))
+    raw = (raw or b"").rstrip(b"\n")
+    return arith(raw) + 1 if DIGITS_RE.fullmatch(raw) else 1
+
+
+def compile_memory(memory_dir: str, settings: Optional[Settings] = None) -> Report:
+    settings = settings or Settings()
+    if settings.dry_run:
+        return _compile(memory_dir, settings)
+    with compiler_lock(memory_dir) as locked:
+        return _compile(memory_dir, settings) if locked else Report()
+
+
+def _compile(memory_dir: str, settings: Settings) -> Report:
+    collator = Collator(settings.collate)
+    report = Report(session=_session(memory_dir))
+    session = report.session
+    usage_path = os.path.join(memory_dir, ".usage-log")
+    usage = UsageLog(_read(usage_path))
+    deltas = UsageDeltas(memory_dir, seal=not settings.dry_run)
+    usage.fold(deltas.pending)
+    etag = ETagCache(memory_dir) if settings.etag else None
+    contents: dict[str, Optional[bytes]] = {}
+    writes: list[tuple[str, bytes, bool]] = []
+    archive = b""
+
+    def content(name: str) -> Optional[bytes]:
+        if name not in contents:
+            path = os.path.join(memory_dir, name)
+            contents[name] = _read(path) if os.path.isfile(path) else None
+        return contents[name]
+
+    if not settings.dry_run:
+        writes.append((os.path.join(memory_dir, ".session-counter"), f"{session}\n".encode(), False))
+
+    # Step 5 runs first: GC before index generation bootstraps missing usage rows.
+    deleted: list[str] = []
+    if not settings.total_recall and usage.exists:
+        archived: set[bytes] = set()
+        for row in usage.rows:
+            fname, last_sess, use_count, tag = read_fields(row, 4)
+            if not fname:
+                continue
+            name = os.fsdecode(fname)
+            data = content(name)
+            if tag == b"USER" or (data is not None and b"[USER]" in data):
+                continue
+            sessions_ago = session - arith(last_sess)
+            uses = int(use_count) if DIGITS_RE.fullmatch(use_count) else 0
+            if sessions_ago > settings.gc_age and uses < 2:
+                if settings.dry_run:
+                    report.messages.append(f"[DRY RUN] Would archive: {name} (age={sessions_ago}, uses={uses})\n")
+                    continue
+                archive += f"\n## Archived: {name} (session {session})\n- age: {sessions_ago} sessions, uses: {uses}\n".encode(
+                    "utf-8", "surrogateescape"
+                )
+                if data is not None:
+                    archive += head_lines(data, GC_HEAD_LINES)
+                report.archived.append(name)
+                if etag is not None:
+                    etag.remove(fname)
+                if data is not None:
+                    deleted.append(name)
+                    contents[name] = None
+                archived.add(fname)
+        if archived:
+            usage.drop(archived)
+        if report.archived:
+            report.messages.append(f"memory-compiler: archived {len(report.archived)} old entries to gc-archive.md\n")
+
+    # Steps 2-3: score every memory file and write context-index.md.
+    clusters: dict[str, list[bytes]] = {name: [] for name, _ in CLUSTERS}
+    for path in memory_files(memory_dir, collator):
+        name = os.path.basename(path)
+        if name in deleted:
+            continue
+        fname = os.fsencode(name)
+        data = content(name)
+        if data is None:
+            continue
+        has_user = b"[USER]" in data
+        score = score_entry(usage.lookup(fname), has_user, session, settings.gc_age)
+        if not settings.dry_run:
+            usage.ensure(fname, b"USER" if has_user else b"AUTO", session)
+            if etag is not None:
+                etag.compute(fname, path, data)
+        cluster = next((c for c, names in CLUSTERS if name in names), "other")
+        clusters[cluster].append(b"- `" + fname + b"` (score=" + str(score).encode() + b")\n")
+        report.indexed += 1
+
+    index = [
+        b"# Context Index (auto-generated)\n",
+        f"# Session: {session} | Generated: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}\n\n".encode(),
+    ]
+    for cluster, _names in CLUSTERS:
+        if clusters[cluster]:
+            index.append(f"## {cluster}\n".encode() + b"".join(clusters[cluster]) + b"\n")
+    if settings.dry_run:
+        report.messages.append("[DRY RUN] Would write context-index.md:\n")
+        report.messages.append(b"".join(index).decode("utf-8", "surrogateescape"))
+    else:
+        writes.append((os.path.join(memory_dir, "context-index.md"), b"".join(index), True))
+
+    # Step 4: 200-line cap on MEMORY.md, overflow into memory-overflow.md.
+    memory = content("MEMORY.md")
+    if not settings.total_recall and memory is not None:
+        line_count = memory.count(b"\n")
+        if line_count > MAX_MEMORY_LINES:
+            if settings.dry_run:
+                report.messages.append(
+                    f"[DRY RUN] MEMORY.md has {line_count} lines (cap={MAX_MEMORY_LINES}), would trim\n"
+                )
+            else:
+                kept = head_lines(memory, MAX_MEMORY_LINES)
+                overflow_path = os.path.join(memory_dir, "memory-overflow.md")
+                previous = _read(overflow_path)
+                overflow = f"# Memory Overflow (auto-generated)\n# Moved from MEMORY.md at session {session}\n\n".encode()
+                if previous is not None:
+                    overflow += previous + b"\n"
+                overflow += memory[len(kept) :]
+                if overflow.count(b"\n") > MAX_OVERFLOW_LINES:
+                    overflow = tail_lines(overflow, MAX_OVERFLOW_LINES)
+                writes.append((overflow_path, overflow, False))
+                writes.append((os.path.join(memory_dir, "MEMORY.md"), kept, False))
+                report.trimmed_lines = line_count - MAX_MEMORY_LINES
+
+    if settings.dry_run:
+        return report
+
+    if archive:
+        append_once(os.path.join(memory_dir, "gc-archive.md"), archive)
+    for name in deleted:
+        try:
+            os.unlink(os.path.join(memory_dir, name))
+        except OSError:
+            pass
+    if usage.dirty:
+        writes.append((usage_path, usage.dump(), True))
+    for path, data, private in writes:
+        atomic_write(path, data, private)
+    deltas.commit()
+    if etag is not None:
+        etag.persist()
+    return report
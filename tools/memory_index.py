@@ -0,0 +1,318 @@
+"""Inverted index over the memory files in ``$MEMORY_DIR``.
+
+One SQLite file (``.memory-index.sqlite``) replaces the per-file
+``.trigram-cache/*.tri`` lists for query-time scoring::
+
+    files     id, name, mtime_ns, size, title_len, body_len
+    trigrams  trigram -> (file_id, tf)              first 100 lines
+    postings  term -> (file_id, tf_title, tf_body)  whole file, for BM25F
+    terms     term -> (df, idf)                     recomputed on every build
+    meta      version, doc_count, avg_title_len, avg_body_len
+
+Trigrams come from the first 100 lines of each file, tokenized exactly like
+``generate_trigrams`` in hooks/preprocess-prompt.sh (see ``smart_context``),
+so ``trigram_scores`` returns the same shared-trigram counts as the
+``comm -12`` path: all files are scored with one join over the postings.
+
+Terms are tokenized like the hook's keywords (lowercase, split outside
+``[a-z0-9_-]``). Heading lines (``# ...``) form the title field, everything
+else the body; ``bm25_scores`` runs BM25F with ``FIELD_WEIGHTS`` using one
+posting lookup per keyword.
+
+``build_index`` is incremental: files whose (mtime_ns, size) did not change
+keep their postings, changed files are re-tokenized, vanished files dropped.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from typing import Iterable, Optional
+
+from smart_context import ALNUM_SPLIT_RE, KEYWORD_SPLIT_RE, TRIGRAM_HEAD_LINES, split_lines
+
+INDEX_FILE = ".memory-index.sqlite"
+INDEX_VERSION = "2"
+
+HEADING_RE = re.compile(rb"#{1,6}\s")
+MIN_TERM_LENGTH = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+FIELD_WEIGHTS = {"title": 2.0, "body": 1.0}
+# BM25 points replace grep line counts in the hook, whose boosts are small
+# integers; x3 puts one strong keyword hit near a handful of matching lines.
+BM25_SCALE = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title_len INTEGER NOT NULL DEFAULT 0,
+    body_len INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    trigram BLOB NOT NULL,
+    file_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (trigram, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigrams_by_file ON trigrams (file_id);
+CREATE TABLE IF NOT EXISTS postings (
+    term BLOB NOT NULL,
+    file_id INTEGER NOT NULL,
+    tf_title INTEGER NOT NULL,
+    tf_body INTEGER NOT NULL,
+    PRIMARY KEY (term, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_file ON postings (file_id);
+CREATE TABLE IF NOT EXISTS terms (
+    term BLOB PRIMARY KEY,
+    df INTEGER NOT NULL,
+    idf REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def index_path(memory_dir: str) -> str:
+    return os.path.join(memory_dir, INDEX_FILE)
+
+
+def trigram_counts(text: bytes) -> Counter:
+    """Occurrences of every trigram; its key set equals ``smart_context.trigrams``."""
+    counts: Counter = Counter()
+    for word in ALNUM_SPLIT_RE.split(text.lower()):
+        for i in range(len(word) - 2):
+            counts[word[i : i + 3]] += 1
+    return counts
+
+
+def file_head(data: bytes) -> bytes:
+    """``head -100``: the text trigram scoring looks at."""
+    return b"\n".join(split_lines(data)[0][:TRIGRAM_HEAD_LINES])
+
+
+def field_terms(data: bytes) -> tuple[Counter, Counter]:
+    """Term frequencies of the title (heading lines) and body fields."""
+    title: Counter = Counter()
+    body: Counter = Counter()
+    for line in split_lines(data)[0]:
+        field = title if HEADING_RE.match(line) else body
+        field.update(term for term in KEYWORD_SPLIT_RE.split(line.lower()) if len(term) >= MIN_TERM_LENGTH)
+    return title, body
+
+
+def idf(doc_count: int, df: int) -> float:
+    """Non-negative BM25 IDF (the Lucene form)."""
+    return math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+
+def bm25_points(score: float) -> int:
+    return int(score * BM25_SCALE + 0.5)
+
+
+def memory_files(memory_dir: str) -> dict[str, os.stat_result]:
+    """Every ``*.md`` file preprocess-prompt.sh may score, keyed by basename."""
+    found: dict[str, os.stat_result] = {}
+    try:
+        entries = list(os.scandir(memory_dir))
+    except OSError:
+        return found
+    for entry in entries:
+        if not entry.name.endswith(".md"):
+            continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        if entry.is_file():
+            found[entry.name] = st
+    return found
+
+
+def _version(conn: sqlite3.Connection) -> Optional[str]:
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.DatabaseError:
+        return None
+    return row[0] if row else None
+
+
+def connect(memory_dir: str, create: bool = False) -> Optional[sqlite3.Connection]:
+    path = index_path(memory_dir)
+    if not create and not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path, timeout=5)
+    if _version(conn) == INDEX_VERSION:
+        return conn
+    if not create:
+        conn.close()
+        return None
+    # Missing or older layout: start over, the next build re-tokenizes everything.
+    with conn:
+        for table in ("meta", "files", "trigrams", "postings", "terms"):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('version', ?)", (INDEX_VERSION,))
+    return conn
+
+
+def _refresh_stats(conn: sqlite3.Connection) -> None:
+    """Recompute df/idf and average field lengths after postings changed."""
+    doc_count, avg_title, avg_body = conn.execute(
+        "SELECT COUNT(*), COALESCE(AVG(title_len), 0), COALESCE(AVG(body_len), 0) FROM files"
+    ).fetchone()
+    conn.execute("DELETE FROM terms")
+    conn.executemany(
+        "INSERT INTO terms (term, df, idf) VALUES (?, ?, ?)",
+        (
+            (term, df, idf(doc_count, df))
+            for term, df in conn.execute("SELECT term, COUNT(*) FROM postings GROUP BY term").fetchall()
+        ),
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        (("doc_count", str(doc_count)), ("avg_title_len", repr(avg_title)), ("avg_body_len", repr(avg_body))),
+    )
+
+
+def build_index(memory_dir: str) -> dict[str, int]:
+    """Bring the index in line with ``memory_dir``; returns update counts."""
+    conn = connect(memory_dir, create=True)
+    assert conn is not None
+    stats = {"files": 0, "unchanged": 0, "updated": 0, "removed": 0}
+    try:
+        with conn:
+            indexed = {
+                name: (file_id, mtime_ns, size)
+                for file_id, name, mtime_ns, size in conn.execute("SELECT id, name, mtime_ns, size FROM files")
+            }
+            current = memory_files(memory_dir)
+            for name in sorted(set(indexed) - set(current)):
+                file_id = indexed[name][0]
+                for table in ("trigrams", "postings"):
+                    conn.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+                conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                stats["removed"] += 1
+
+            for name, st in sorted(current.items()):
+                stats["files"] += 1
+                previous = indexed.get(name)
+                if previous is not None and previous[1:] == (st.st_mtime_ns, st.st_size):
+                    stats["unchanged"] += 1
+                    continue
+                try:
+                    with open(os.path.join(memory_dir, name), "rb") as fh:
+                        data = fh.read()
+                except OSError:
+                    continue
+                title, body = field_terms(data)
+                row = (st.st_mtime_ns, st.st_size, sum(title.values()), sum(body.values()))
+                if previous is None:
+                    file_id = conn.execute(
+                        "INSERT INTO files (name, mtime_ns, size, title_len, body_len) VALUES (?, ?, ?, ?, ?)",
+                        (name, *row),
+                    ).lastrowid
+                else:
+                    file_id = previous[0]
+                    for table in ("trigrams", "postings"):
+                        conn.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+                    conn.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ?, title_len = ?, body_len = ? WHERE id = ?",
+                        (*row, file_id),
+                    )
+                conn.executemany(
+                    "INSERT INTO trigrams (trigram, file_id, tf) VALUES (?, ?, ?)",
+                    ((gram, file_id, tf) for gram, tf in trigram_counts(file_head(data)).items()),
+                )
+                conn.executemany(
+                    "INSERT INTO postings (term, file_id, tf_title, tf_body) VALUES (?, ?, ?, ?)",
+                    ((term, file_id, title[term], body[term]) for term in title.keys() | body.keys()),
+                )
+                stats["updated"] += 1
+
+            if stats["updated"] or stats["removed"]:
+                _refresh_stats(conn)
+    finally:
+        conn.close()
+    return stats
+
+
+def _fresh_files(conn: sqlite3.Connection, memory_dir: str) -> dict[int, tuple[str, int, int]]:
+    """Indexed files unchanged on disk since the last build: id -> (name, title_len, body_len).
+
+    Changed or new files are left out so callers fall back to scoring them
+    directly.
+    """
+    fresh: dict[int, tuple[str, int, int]] = {}
+    for file_id, name, mtime_ns, size, title_len, body_len in conn.execute(
+        "SELECT id, name, mtime_ns, size, title_len, body_len FROM files"
+    ):
+        try:
+            st = os.stat(os.path.join(memory_dir, name))
+        except OSError:
+            continue
+        if (st.st_mtime_ns, st.st_size) == (mtime_ns, size):
+            fresh[file_id] = (name, title_len, body_len)
+    return fresh
+
+
+def _query_table(conn: sqlite3.Connection, values: Iterable[bytes]) -> None:
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS query (value BLOB PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.query")
+    conn.executemany("INSERT OR IGNORE INTO temp.query (value) VALUES (?)", ((v,) for v in values))
+
+
+def trigram_scores(memory_dir: str, prompt_trigrams: Iterable[bytes]) -> dict[str, int]:
+    """Shared-trigram count per fresh indexed file (uncapped, like ``comm -12 | wc -l``)."""
+    conn = connect(memory_dir)
+    if conn is None:
+        return {}
+    try:
+        _query_table(conn, prompt_trigrams)
+        hits = dict(
+            conn.execute(
+                "SELECT t.file_id, COUNT(*) FROM temp.query q JOIN trigrams t ON t.trigram = q.value GROUP BY t.file_id"
+            )
+        )
+        return {name: hits.get(file_id, 0) for file_id, (name, _t, _b) in _fresh_files(conn, memory_dir).items()}
+    finally:
+        conn.close()
+
+
+def bm25_scores(memory_dir: str, keywords: Iterable[bytes]) -> dict[str, float]:
+    """BM25F score per fresh indexed file (0.0 when no keyword occurs)."""
+    conn = connect(memory_dir)
+    if conn is None:
+        return {}
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        avg_len = {
+            "title": float(meta.get("avg_title_len", 0)) or 1.0,
+            "body": float(meta.get("avg_body_len", 0)) or 1.0,
+        }
+        fresh = _fresh_files(conn, memory_dir)
+        scores = {name: 0.0 for name, _t, _b in fresh.values()}
+        _query_table(conn, keywords)
+        rows = conn.execute(
+            "SELECT p.file_id, p.tf_title, p.tf_body, t.idf FROM temp.query q "
+            "JOIN terms t ON t.term = q.value JOIN postings p ON p.term = q.value"
+        )
+        for file_id, tf_title, tf_body, term_idf in rows:
+            if file_id not in fresh:
+                continue
+            name, title_len, body_len = fresh[file_id]
+            weighted = 0.0
+            for field, tf, length in (("title", tf_title, title_len), ("body", tf_body, body_len)):
+                if tf:
+                    norm = 1 - BM25_B + BM25_B * length / avg_len[field]
+                    weighted += FIELD_WEIGHTS[field] * tf / norm
+            scores[name] += term_idf * weighted / (BM25_K1 + weighted)
+        return scores
+    finally:
+        conn.close()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Routing history for task-router.sh from incrementally maintained aggregates.
+
+Prints the same JSON object as task-router.sh's jq ``read_route_history`` for
+the last ``--window`` lines of the decision log. The aggregates live in
+``<log>.stats.json`` (see tools/route_stats.py) and only lines appended since
+the previous call are read.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from route_stats import route_history
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="bestAI routing history statistics")
+    parser.add_argument("--log", required=True, help="Decision log (.bestai/router-decisions.jsonl)")
+    parser.add_argument("--task-norm", default="", help="Normalized task text to match")
+    parser.add_argument("--complexity", default="", help="Complexity to match")
+    parser.add_argument("--window", type=int, default=240, help="Last N log lines (default: 240)")
+    parser.add_argument("--state", default=None, help="Aggregate cache (default: <log>.stats.json)")
+    args = parser.parse_args()
+
+    try:
+        history = route_history(args.log, args.task_norm, args.complexity, args.window, args.state)
+    except OSError as exc:
+        print(f"route-stats: {exc}", file=sys.stderr)
+        return 1
+    print(json.dumps(history, separators=(",", ":")))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
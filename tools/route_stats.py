@@ -0,0 +1,318 @@
+"""Incremental routing statistics over ``.bestai/router-decisions.jsonl``.
+
+task-router.sh used to ``tail -n $window`` the decision log into jq on every
+route, re-parsing the window and regrouping it for each statistic.
+``RouteStats`` keeps those aggregates for the last ``window`` log lines:
+
+* per normalized task: count, confidence sum, vendor and depth counts;
+* per complexity: count, vendor and depth counts;
+* the vendor switches between consecutive decisions, and the newest decision.
+
+The saved state is those aggregates plus two byte offsets into the log: where
+the window starts and how far it has been read. Rows are not copied into the
+state, because the log already holds them. A route parses the ``k`` lines
+appended since the previous one, adds them, and subtracts the ``k`` oldest
+lines, which it re-reads at the window-start offset. Its I/O therefore scales
+with the new lines, not with the window. ``lookup`` is a few dict reads.
+
+The numbers always match what the jq pipeline computed for the same window.
+That pipeline counted blank and malformed lines against the window and skipped
+them, and so does this. A rotated, truncated or replaced log, or a new window
+size, rebuilds the state from the log's last ``window`` lines.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import re
+
+STATE_VERSION = 2
+HEAD_BYTES = 4096
+_UPPER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+EMPTY = {
+    "total": 0,
+    "same_task_count": 0,
+    "same_task_vendor": "",
+    "same_task_depth": "",
+    "same_task_avg_confidence": 0,
+    "complexity_count": 0,
+    "complexity_vendor": "",
+    "complexity_depth": "",
+    "vendor_switch_pct": 0,
+    "recent_vendor": "",
+    "recent_depth": "",
+}
+
+
+def norm_task(task: object) -> str:
+    """jq's ``norm_task``: ASCII-lowercase, non-alphanumeric runs to one space, trimmed."""
+    if not isinstance(task, str):
+        task = "" if task is None or task is False else json.dumps(task)
+    return _NON_ALNUM.sub(" ", task.translate(_UPPER)).strip(" ")
+
+
+def _text(value: object, default: str) -> str:
+    """``.key // default`` as the string the router reads back from jq -r."""
+    if value is None or value is False:
+        return default
+    return value if isinstance(value, str) else json.dumps(value, separators=(",", ":"))
+
+
+def _number(value: object) -> float:
+    """``(.confidence // 0) | tonumber``; unparseable values count as 0."""
+    if isinstance(value, bool) or value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return int(number) if number.is_integer() else number
+
+
+def _top(counts: dict[str, int]) -> str:
+    """jq's ``top_value``: the most frequent value, ties going to the greatest."""
+    return max(counts.items(), key=lambda item: (item[1], item[0]))[0] if counts else ""
+
+
+def _bump(counts: dict[str, int], key: str, delta: int) -> None:
+    counts[key] = counts.get(key, 0) + delta
+    if counts[key] <= 0:
+        del counts[key]
+
+
+def parse_row(line: bytes) -> list | None:
+    """The fields the stats use: [task, complexity, vendor, depth, confidence, raw vendor, raw depth].
+
+    ``vendor``/``depth`` fall back to "unknown" as in top_value; the raw ones to ""
+    as in the switch count and recent_vendor/recent_depth.
+    """
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(row, dict):
+        return None
+    complexity = row.get("complexity")
+    if not isinstance(complexity, str) and complexity is not None and complexity is not False:
+        complexity = "\0" + json.dumps(complexity)  # never equal to the router's complexity string
+    return [
+        norm_task(row.get("task")),
+        complexity or "",
+        _text(row.get("vendor"), "unknown"),
+        _text(row.get("depth"), "unknown"),
+        _number(row.get("confidence")),
+        _text(row.get("vendor"), ""),
+        _text(row.get("depth"), ""),
+    ]
+
+
+class RouteStats:
+    """Aggregates over the last ``window`` lines of the decision log."""
+
+    def __init__(self, window: int, state: dict | None = None) -> None:
+        state = state or {}
+        self.window = window
+        self.count = state.get("count", 0)  # lines in the window, blank and malformed ones included
+        self.total = state.get("total", 0)
+        self.switches = state.get("switches", 0)
+        self.tasks: dict[str, list] = state.get("tasks", {})
+        self.complexities: dict[str, list] = state.get("complexities", {})
+        self.last: list | None = state.get("last")
+
+    def state(self) -> dict:
+        return {
+            "window": self.window,
+            "count": self.count,
+            "total": self.total,
+            "switches": self.switches,
+            "tasks": self.tasks,
+            "complexities": self.complexities,
+            "last": self.last,
+        }
+
+    def _apply(self, row: list, sign: int) -> None:
+        task, complexity, vendor, depth, confidence = row[:5]
+        entry = self.tasks.setdefault(task, [0, 0, {}, {}])
+        entry[0] += sign
+        entry[1] += sign * confidence
+        _bump(entry[2], vendor, sign)
+        _bump(entry[3], depth, sign)
+        if entry[0] <= 0:
+            del self.tasks[task]
+        entry = self.complexities.setdefault(complexity, [0, {}, {}])
+        entry[0] += sign
+        _bump(entry[1], vendor, sign)
+        _bump(entry[2], depth, sign)
+        if entry[0] <= 0:
+            del self.complexities[complexity]
+
+    def push(self, row: list | None) -> None:
+        """Add the newest log line (None for a blank or malformed one)."""
+        self.count += 1
+        if row is None:
+            return
+        if self.total:
+            self.switches += row[5] != self.last[5]
+        self.total += 1
+        self._apply(row, 1)
+        self.last = row
+
+    def evict(self, row: list | None, following: list | None) -> None:
+        """Drop the oldest log line; ``following`` is the next valid row still in the window."""
+        self.count -= 1
+        if row is None:
+            return
+        self.total -= 1
+        self._apply(row, -1)
+        if following is not None:
+            self.switches -= row[5] != following[5]
+        if not self.total:
+            self.last = None
+            self.switches = 0
+
+    def lookup(self, task_norm: str, complexity: str) -> dict:
+        """read_route_history's JSON object for one task and complexity."""
+        if not self.total:
+            return dict(EMPTY)
+        same = self.tasks.get(task_norm, [0, 0, {}, {}])
+        cx = self.complexities.get(complexity, [0, {}, {}])
+        return {
+            "total": self.total,
+            "same_task_count": same[0],
+            "same_task_vendor": _top(same[2]),
+            "same_task_depth": _top(same[3]),
+            "same_task_avg_confidence": math.floor(same[1] / same[0]) if same[0] else 0,
+            "complexity_count": cx[0],
+            "complexity_vendor": _top(cx[1]),
+            "complexity_depth": _top(cx[2]),
+            "vendor_switch_pct": (self.switches * 100) // (self.total - 1) if self.total > 1 else 0,
+            "recent_vendor": self.last[5],
+            "recent_depth": self.last[6],
+        }
+
+
+def _row(line: bytes) -> list | None:
+    return parse_row(line) if line.strip() else None
+
+
+def default_state_path(log_path: str) -> str:
+    base = log_path[: -len(".jsonl")] if log_path.endswith(".jsonl") else log_path
+    return base + ".stats.json"
+
+
+def load_state(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            state = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) and state.get("version") == STATE_VERSION else {}
+
+
+def save_state(path: str, state: dict) -> None:
+    tmp = f"{path}.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(state, fh, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _tail_offset(fh, size: int, lines: int) -> int:
+    """Offset where ``tail -n lines`` of a newline-terminated file starts."""
+    position, newlines = size, 0
+    while position > 0:
+        step = min(65536, position)
+        position -= step
+        fh.seek(position)
+        block = fh.read(step)
+        end = len(block)
+        if position + end == size and block.endswith(b"\n"):
+            end -= 1  # the final newline ends the last line, it does not start one
+        index = end
+        while True:
+            index = block.rfind(b"\n", 0, index)
+            if index < 0:
+                break
+            newlines += 1
+            if newlines == lines:
+                return position + index + 1
+    return 0
+
+
+def _evict(fh, stats: RouteStats, start: int, end: int) -> int:
+    """Drop lines from the window's front until it is ``window`` long; returns the new start offset."""
+    fh.seek(start)
+    leaving = []
+    while stats.count - len(leaving) > stats.window:
+        line = fh.readline()
+        start += len(line)
+        leaving.append(_row(line.rstrip(b"\n")))
+    following = None
+    if any(row is not None for row in leaving):
+        # The first valid row that stays, needed for the last vendor switch leaving the window.
+        position = start
+        while following is None and position < end:
+            line = fh.readline()
+            position += len(line)
+            following = _row(line.rstrip(b"\n"))
+    for index, row in enumerate(leaving):
+        if row is not None:
+            after = next((later for later in leaving[index + 1 :] if later is not None), following)
+            stats.evict(row, after)
+        else:
+            stats.evict(None, None)
+    return start
+
+
+def refresh(log_path: str, window: int, state_path: str | None = None) -> RouteStats:
+    """Stats for the last ``window`` complete lines of ``log_path``, updated from the saved offsets."""
+    state_path = state_path or default_state_path(log_path)
+    state = load_state(state_path)
+    with open(log_path, "rb") as fh:
+        st = os.fstat(fh.fileno())
+        head = hashlib.sha1(fh.read(state.get("head_len", HEAD_BYTES))).hexdigest()
+        offset = state.get("offset", 0)
+        if (
+            state.get("window") != window
+            or (state.get("inode"), state.get("head")) != (st.st_ino, head)
+            or offset > st.st_size
+        ):
+            state = {}
+        stats = RouteStats(window, state)
+        if state:
+            start = state.get("start", 0)
+        else:
+            fh.seek(0)
+            start = offset = _tail_offset(fh, st.st_size, window) if window > 0 else st.st_size
+        fh.seek(offset)
+        data = fh.read(st.st_size - offset)
+        end = data.rfind(b"\n") + 1  # a line still being written waits for the next refresh
+        for line in data[:end].split(b"\n")[:-1]:
+            stats.push(_row(line))
+        offset += end
+        if stats.count > window:
+            start = _evict(fh, stats, start, offset)
+        fh.seek(0)
+        head_len = min(offset, HEAD_BYTES)
+        head = hashlib.sha1(fh.read(head_len)).hexdigest()
+    try:
+        save_state(
+            state_path,
+            {"version": STATE_VERSION, "inode": st.st_ino, "head": head, "head_len": head_len,
+             "start": start, "offset": offset, **stats.state()},
+        )
+    except OSError:
+        pass  # read-only project: the numbers are still right, just not cached
+    return stats
+
+
+def route_history(log_path: str, task_norm: str, complexity: str, window: int, state_path: str | None = None) -> dict:
+    if window <= 0 or not os.path.isfile(log_path):
+        return dict(EMPTY)
+    return refresh(log_path, window, state_path).lookup(task_norm, complexity)
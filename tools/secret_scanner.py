@@ -0,0 +1,261 @@
+"""Multi-pattern secret scanner shared by the secret-guard gate and secret-scan.py.
+
+The patterns of hooks/secret-guard.sh are grouped into rule families. Each rule
+is compiled once as its own regex and lists literal anchors (``ghp_``,
+``akia``, ``begin `` …). A scan looks for the anchors in the lower-cased text
+with ``str.find`` first. If none occurs, the family's regexes are skipped, so
+clean text costs a few ``str.find`` calls. Otherwise each anchor hit is
+confirmed by the rules that start with that anchor, at that offset, or, for
+families whose rules do not start with an anchor, each rule is searched on its
+own. The hits are merged in text order (see ``Family``).
+
+Rules keep grep's semantics: they never cross a newline (``[^\\S\\n]`` instead of
+``\\s``), case-folding and ``\\b`` are ASCII, and ``^``/``$`` are line anchors.
+One search over a whole text therefore agrees with ``grep -Eqi`` run line by
+line. Large texts and files are scanned in line-aligned chunks. A line longer
+than a chunk is cut and the next chunk repeats the last ``overlap`` characters.
+It starts further back, up to a chunk, for a whitespace-free run the cut split
+and for a match held back at the cut (one whose rule ends in ``$`` or ``\\b``,
+so the text after the cut decides it).
+"""
+
+from __future__ import annotations
+
+import io
+import re
+
+CHUNK_SIZE = 1 << 20
+OVERLAP = 512
+SP = r"[^\S\n]"  # grep's [[:space:]] within one line
+VALUE = r"[A-Za-z0-9_\\/+=]"  # secret-guard.sh's [A-Za-z0-9_\-\/+=]: '\-' is a literal backslash in ERE
+
+# family -> [(rule, pattern, anchors)]. Anchors are lower-case literals; a rule
+# can only match text that contains one of them.
+RULES: dict[str, list[tuple[str, str, tuple[str, ...]]]] = {
+    "secret": [
+        ("github-token", r"ghp_[A-Za-z0-9]{36}", ("ghp_",)),
+        ("aws-access-key", r"AKIA[0-9A-Z]{16}", ("akia",)),
+        ("aws-secret-key", r"aws_secret_access_key", ("aws_secret_access_key",)),
+        ("private-key", r"BEGIN (RSA|OPENSSH|EC|DSA) PRIVATE KEY", ("begin ",)),
+        ("api-key", rf"api[_-]?key{SP}*[:=]{SP}*{VALUE}{{10,}}", ("api",)),
+        ("secret-assignment", rf"secret{SP}*[:=]{SP}*{VALUE}{{10,}}", ("secret",)),
+        ("token-assignment", rf"token{SP}*[:=]{SP}*{VALUE}{{10,}}", ("token",)),
+        ("password-assignment", rf"password{SP}*[:=]{SP}*{VALUE}{{8,}}", ("password",)),
+    ],
+    "secret-file": [
+        ("env-file", rf"(^|{SP}|/)\.env(\.[A-Za-z0-9_-]+)?({SP}|$)", (".env",)),
+        ("ssh-key", rf"(^|{SP}|/)(id_rsa|id_ed25519)({SP}|$)", ("id_rsa", "id_ed25519")),
+        # grep's ".*\.pem" after a space or "/": the match can always restart after
+        # the last space, so "\S*" finds the same lines without backtracking.
+        ("key-file", rf"(^|{SP}|/)\S*\.(pem|p12|key)({SP}|$)", (".pem", ".p12", ".key")),
+    ],
+    "exfil": [
+        ("pipe", r"[|]", ("|",)),
+        (
+            "network-tool",
+            rf"(curl|wget|scp|rsync|sftp|ftp|nc|netcat|mail|sendmail){SP}",
+            ("curl", "wget", "scp", "rsync", "ftp", "nc", "netcat", "mail"),
+        ),
+        ("ssh", rf"ssh{SP}.*[@:]", ("ssh",)),
+        ("url", r"http[s]?://", ("http",)),
+        ("gist", rf"gh{SP}+gist", ("gist",)),
+        ("clipboard", r"xclip|pbcopy", ("xclip", "pbcopy")),
+    ],
+    "staging": [
+        ("redirect", r">", (">",)),
+        ("tee", rf"\|{SP}*tee\b", ("tee",)),
+        ("copy", r"\b(cp|mv|install|dd)\b", ("cp", "mv", "install", "dd")),
+        ("write-out", rf"\b(cat|printf)\b{SP}.*>", (">",)),
+    ],
+    "local-payload": [
+        ("at-file", r"@\S+", ("@",)),
+        ("upload-file", rf"--upload-file{SP}+\S+", ("--upload-file",)),
+        ("data-file", rf"--data(-binary)?{SP}+@\S+", ("@",)),
+        ("stdin-file", rf"<{SP}*\S+", ("<",)),
+    ],
+    "git-stage": [
+        ("git-stage", rf"git{SP}+(add|commit|push)", ("git",)),
+    ],
+}
+
+
+class Finding:
+    """One rule hit: ``line`` is 1-based, ``match`` the matched text."""
+
+    __slots__ = ("family", "rule", "line", "match")
+
+    def __init__(self, family: str, rule: str, line: int, match: str) -> None:
+        self.family = family
+        self.rule = rule
+        self.line = line
+        self.match = match
+
+    def __repr__(self) -> str:
+        return f"Finding({self.family}/{self.rule} line {self.line})"
+
+
+class Family:
+    """A rule family: literal anchors first, then the rules themselves.
+
+    When every rule starts with one of its anchors (the secret rules do), each
+    anchor hit found with ``str.find`` is confirmed by matching just those rules
+    at that offset. That is the Aho-Corasick-style prefilter without a
+    dependency. Python's ``re`` has no fast path for a long alternation, but
+    ``str.find`` does. Other families run once the anchor check passes, each
+    rule searched on its own and the hits merged in text order.
+    """
+
+    def __init__(self, name: str, rules: list[tuple[str, str, tuple[str, ...]]]) -> None:
+        self.name = name
+        self.rules = [rule for rule, _, _ in rules]
+        self.anchors = tuple(sorted({anchor for _, _, anchors in rules for anchor in anchors}))
+        flags = re.ASCII | re.MULTILINE | re.IGNORECASE
+        self.regexes = [re.compile(pattern, flags) for _, pattern, _ in rules]
+        self.prefixed = all(pattern.lower().startswith(anchors) for _, pattern, anchors in rules)
+        # Rules whose match at the end of a cut buffer depends on the text after it.
+        self.tail_sensitive = [pattern.endswith(("$", "$)", r"\b")) for _, pattern, _ in rules]
+        self.by_anchor: dict[str, list[int]] = {}
+        for index, (_, _, anchors) in enumerate(rules):
+            for anchor in anchors:
+                self.by_anchor.setdefault(anchor, []).append(index)
+
+    def possible(self, lowered: str) -> bool:
+        return any(anchor in lowered for anchor in self.anchors)
+
+    def finditer(self, text: str, lowered: str, pos: int = 0, held: list[int] | None = None):
+        """Yield ``(match, rule)`` in text order, at least the first match of every matching line.
+
+        ``lowered`` is ``_lower(text)``: the same length, so offsets carry over.
+        ``held`` is given when a long line was split at the end of ``text``. A
+        match that reaches the end of a rule ending in "$" or "\\b" is then not
+        yielded; its start goes into ``held`` and the next buffer settles it.
+        Any other match stands, whatever follows the cut.
+        """
+        end = len(text)
+        hits = []
+        if self.prefixed:
+            for anchor, indexes in self.by_anchor.items():
+                at = lowered.find(anchor, pos)
+                while at >= 0:
+                    for index in indexes:
+                        found = self.regexes[index].match(text, at)
+                        if found is None:
+                            continue
+                        if held is not None and found.end() == end and self.tail_sensitive[index]:
+                            held.append(at)
+                            continue
+                        hits.append((at, index, found))
+                        break
+                    at = lowered.find(anchor, at + 1)
+        elif self.possible(lowered):
+            for index, regex in enumerate(self.regexes):
+                at = pos
+                while True:
+                    found = regex.search(text, at)
+                    if found is None:
+                        break
+                    if held is not None and found.end() == end and self.tail_sensitive[index]:
+                        held.append(found.start())
+                        at = found.start() + 1
+                        continue
+                    hits.append((found.start(), index, found))
+                    # Only a line's first match matters: resume at the next line.
+                    at = text.find("\n", found.end()) + 1
+                    if not at:
+                        break
+        for _, index, found in sorted(hits, key=lambda hit: hit[:2]):
+            yield found, self.rules[index]
+
+    def match(self, text: str) -> str | None:
+        """Name of the first rule that matches ``text`` (``grep -Eqi``), or None."""
+        if len(text) > CHUNK_SIZE:
+            for finding in scan_text(text, (self.name,), first=True):
+                return finding.rule
+            return None
+        for _, rule in self.finditer(text, _lower(text)):
+            return rule
+        return None
+
+
+def _lower(text: str) -> str:
+    # str.lower() lengthens only U+0130; ASCII anchors never contain it.
+    return (text.replace("\u0130", "?") if "\u0130" in text else text).lower()
+
+
+FAMILIES = {name: Family(name, rules) for name, rules in RULES.items()}
+
+
+def _chunks(stream, chunk_size: int, overlap: int):
+    """Yield ``(text, start, line, cut)``: line-aligned buffers read from ``stream``.
+
+    ``line`` is the line number of ``text[0]``, and scanning starts at ``start``.
+    ``cut`` means a long line was split at the end of ``text``. The next buffer
+    then starts with the last ``overlap`` characters again, or earlier: at the
+    whitespace-free run the cut split, or at the offset sent back for the cut
+    buffer (a held-back match). It never starts more than ``chunk_size`` back,
+    and one character of context comes first.
+    """
+    carry, start, line = "", 0, 1
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            if len(carry) > start:
+                yield carry, start, line, False
+            return
+        buf = carry + block
+        end = buf.rfind("\n") + 1
+        if end > start:
+            yield buf[:end], start, line, False
+            line += buf.count("\n", 0, end)
+            carry, start = buf[end:], 0
+        elif len(buf) > chunk_size + overlap:
+            # One very long line: scan what we have and rescan its tail with the next block.
+            resume = yield buf, start, line, True
+            floor = len(buf) - chunk_size
+            # A path or value cut in two is rescanned whole, from the space before it.
+            keep = min(len(buf) - overlap, max(buf.rfind(c, floor) for c in " \t\r\f\v"))
+            if resume is not None:
+                keep = min(keep, resume)
+            carry, start = buf[max(keep, floor) - 1 :], 1
+        else:
+            carry = buf
+
+
+def scan_stream(
+    stream,
+    families=("secret",),
+    first: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = OVERLAP,
+):
+    """Yield a ``Finding`` for the first match of each family on every matching line.
+
+    ``stream`` is a text file object. With ``first`` the scan stops at the first hit.
+    """
+    compiled = [FAMILIES[name] for name in families]
+    seen = {name: 0 for name in families}
+    chunks = _chunks(stream, chunk_size, max(overlap, 1))
+    resume = None
+    while True:
+        try:
+            text, start, base, cut = chunks.send(resume)
+        except StopIteration:
+            return
+        lowered = _lower(text)
+        held: list[int] | None = [] if cut else None
+        for family in compiled:
+            line, counted = base, 0
+            for found, rule in family.finditer(text, lowered, start, held):
+                line += text.count("\n", counted, found.start())
+                counted = found.start()
+                if line != seen[family.name]:
+                    seen[family.name] = line
+                    yield Finding(family.name, rule, line, found.group())
+                    if first:
+                        return
+        # Restart a cut line's next buffer at the earliest match it could still settle.
+        resume = min(held) if held else None
+
+
+def scan_text(text: str, families=("secret",), first: bool = False, chunk_size: int = CHUNK_SIZE):
+    return scan_stream(io.StringIO(text), families, first, chunk_size)
@@ -1,33 +1,311 @@
+"""Learn anti-loop pitfalls from recurring BLOCK events.
+
+Each run reads only the project's BLOCK events past the checkpoint offset kept
+in ``<pitfalls dir>/.self-heal-state.json``, via ``event_log.scan``. Reasons
+are normalized (paths, numbers, hashes and quoted strings become
+placeholders) and near-duplicates are merged into one cluster by MinHash
+over word shingles. Each cluster keeps hourly counters covering the longest
+window, so the state stays bounded however long the log grows. Windows end
+at the newest logged block, so replaying an old log gives the same answer as
+running live.
+
+A cluster with at least ``--threshold`` blocks in the 30d window becomes a
+pitfall line. Lines are only appended when their normalized reason is not
+already in pitfalls.md.
+"""
+
+import argparse
+import hashlib
 import json
 import os
-from collections import Counter
+import random
+import re
+from calendar import timegm
+from functools import lru_cache
+from time import strptime
+
+from event_log import default_log_path, matching_hashes, scan
+
+WINDOWS = (("24h", 24), ("7d", 24 * 7), ("30d", 24 * 30))
+TRIGGER_WINDOW = "30d"
+THRESHOLD = 2
+STATE_VERSION = 1
+MAX_CLUSTERS = 256
+MAX_KEYS = 4096
+MAX_KEYS_PER_CLUSTER = 16
+HEAD_BYTES = 256
+
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+SIMILARITY = 0.6
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20260301)
+_COEFFS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(MINHASH_PERMUTATIONS)]
+
+QUOTED_RE = re.compile(r"'[^']*'|\"[^\"]*\"|`[^`]*`")
+PATH_RE = re.compile(r"[\w.~-]*(?:/[\w.@%+=:,~-]+)+/?")
+HEX_RE = re.compile(r"\b[0-9a-f]{7,}\b")
+NUM_RE = re.compile(r"\d+")
+SPACE_RE = re.compile(r"\s+")
+PITFALL_RE = re.compile(r"Prevents '(.*)'\. Verified by hook logs\.")
+
+
+def block_reason(event):
+    detail = event.get('detail')
+    reason = detail.get('reason') if isinstance(detail, dict) else None
+    return reason or f"{event.get('hook', 'unknown')} block"
+
+
+def normalize_reason(reason):
+    """Shape of a reason: "blocked rm -rf /tmp/a" and ".../tmp/b" both become "blocked rm -rf <path>"."""
+    text = reason.lower()
+    text = QUOTED_RE.sub("<str>", text)
+    text = PATH_RE.sub("<path>", text)
+    text = HEX_RE.sub("<hex>", text)
+    text = NUM_RE.sub("<n>", text)
+    return SPACE_RE.sub(" ", text).strip()
+
+
+def minhash(key):
+    words = key.split()
+    shingles = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])} or {key}
+    values = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles]
+    return [min((a * v + b) % _PRIME for v in values) for a, b in _COEFFS]
+
+
+def similarity(left, right):
+    return sum(1 for x, y in zip(left, right) if x == y) / MINHASH_PERMUTATIONS
+
+
+@lru_cache(maxsize=1024)
+def _hour(stamp):
+    try:
+        return timegm(strptime(stamp, "%Y-%m-%dT%H")) // 3600
+    except ValueError:
+        return None
+
+
+def event_hour(event):
+    """Hours since the epoch for the event's UTC ``ts``; parsed once per distinct hour."""
+    return _hour(str(event.get("ts", ""))[:13])
+
+
+def key_digest(key):
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class Clusters:
+    """Bounded set of reason clusters with hourly counters, persisted between runs."""
+
+    def __init__(self, state):
+        self.latest_hour = state.get("latest_hour", 0)
+        self.next_id = state.get("next_id", 0)
+        self.clusters = {c["id"]: c for c in state.get("clusters", [])}
+        self.keys = {}
+        self.bands = {}
+        for cluster in self.clusters.values():
+            cluster["buckets"] = {int(hour): n for hour, n in cluster["buckets"].items()}
+            for key in cluster["keys"]:
+                self.keys[key] = cluster["id"]
+            self._band(cluster)
+
+    def _bands_of(self, signature):
+        rows = MINHASH_PERMUTATIONS // LSH_BANDS
+        return [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(LSH_BANDS)]
 
-def analyze_and_heal(log_path=".claude/events.jsonl", pitfalls_path="memory/pitfalls.md"):
+    def _band(self, cluster):
+        for band in self._bands_of(cluster["minhash"]):
+            self.bands.setdefault(band, set()).add(cluster["id"])
+
+    def lookup(self, reason):
+        key = normalize_reason(reason)
+        cluster_id = self.keys.get(key)
+        if cluster_id in self.clusters:
+            return self.clusters[cluster_id]
+        signature = minhash(key)
+        candidates = set()
+        for band in self._bands_of(signature):
+            candidates |= self.bands.get(band, set())
+        best, best_score = None, SIMILARITY
+        for candidate in candidates:
+            cluster = self.clusters.get(candidate)
+            if cluster is not None:
+                score = similarity(signature, cluster["minhash"])
+                if score >= best_score:
+                    best, best_score = cluster, score
+        if best is None:
+            best = {"id": self.next_id, "reason": reason, "key": key, "minhash": signature,
+                    "keys": [], "buckets": {}, "total": 0, "last_hour": 0}
+            self.next_id += 1
+            self.clusters[best["id"]] = best
+            self._band(best)
+            self._evict(keep=best["id"])
+        if len(best["keys"]) < MAX_KEYS_PER_CLUSTER and key not in best["keys"]:
+            best["keys"].append(key)
+        if len(self.keys) >= MAX_KEYS:
+            self.keys.clear()
+        self.keys[key] = best["id"]
+        return best
+
+    def _evict(self, keep):
+        """Drop the stalest cluster other than ``keep``, the one just created (it has no counts yet)."""
+        if len(self.clusters) <= MAX_CLUSTERS:
+            return
+        victim = min((c for c in self.clusters.values() if c["id"] != keep),
+                     key=lambda c: (c["last_hour"], c["total"]))
+        del self.clusters[victim["id"]]
+        for band in self._bands_of(victim["minhash"]):
+            members = self.bands.get(band)
+            if members is not None:
+                members.discard(victim["id"])
+                if not members:
+                    del self.bands[band]
+
+    def add(self, reason, hour):
+        cluster = self.lookup(reason)
+        cluster["total"] += 1
+        if hour is not None:
+            cluster["buckets"][hour] = cluster["buckets"].get(hour, 0) + 1
+            cluster["last_hour"] = max(cluster["last_hour"], hour)
+            if hour > self.latest_hour:
+                self.latest_hour = hour
+                if hour % 24 == 0:
+                    self.prune()
+
+    def prune(self):
+        horizon = self.latest_hour - WINDOWS[-1][1]
+        for cluster in self.clusters.values():
+            cluster["buckets"] = {h: n for h, n in cluster["buckets"].items() if h > horizon}
+
+    def windows(self, cluster):
+        counts = {}
+        for name, hours in WINDOWS:
+            horizon = self.latest_hour - hours
+            counts[name] = sum(n for h, n in cluster["buckets"].items() if h > horizon)
+        return counts
+
+    def state(self):
+        self.prune()
+        clusters = []
+        for cluster in self.clusters.values():
+            clusters.append(dict(cluster, buckets={str(h): n for h, n in cluster["buckets"].items()}))
+        return {"latest_hour": self.latest_hour, "next_id": self.next_id, "clusters": clusters}
+
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if state.get("version") == STATE_VERSION else {}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def log_identity(log_path, length=HEAD_BYTES):
+    """(inode, size, digest of the first ``length`` bytes) to notice a rotated or replaced log."""
+    with open(log_path, "rb") as f:
+        st = os.fstat(f.fileno())
+        return st.st_ino, st.st_size, hashlib.sha1(f.read(length)).hexdigest()
+
+
+def recorded_pitfalls(pitfalls_path):
+    """Digests of the normalized reasons already in pitfalls.md."""
+    recorded = set()
+    try:
+        with open(pitfalls_path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                match = PITFALL_RE.search(line)
+                text = match.group(1) if match else line.lstrip("- ").strip()
+                if text:
+                    recorded.add(key_digest(normalize_reason(text)))
+    except OSError:
+        pass
+    return recorded
+
+
+def analyze_and_heal(log_path=None, pitfalls_path="memory/pitfalls.md", state_path=None, threshold=THRESHOLD,
+                     full=False):
     print("\033[1;35m🩹 bestAI Self-Heal: Analyzing failures...\033[0m")
-    
+
+    log_path = log_path or default_log_path()
     if not os.path.exists(log_path):
         return
+    state_path = state_path or os.path.join(os.path.dirname(pitfalls_path), ".self-heal-state.json")
+
+    project_dirs = [os.environ.get("CLAUDE_PROJECT_DIR", ""), os.getcwd()]
+    projects = matching_hashes(p for p in project_dirs if p)
+    state = {} if full else load_state(state_path)
+    offset = state.get("offset", -1)
+    inode, size, head = log_identity(log_path, state.get("head_len", HEAD_BYTES))
+    if (state.get("log"), state.get("projects")) != (log_path, projects):
+        state, offset = {}, -1
+    elif (state.get("inode"), state.get("head")) != (inode, head) or offset >= size:
+        # Rotated or truncated: the counters stay, the new file is read from the start.
+        offset = -1
+    inode, size, head = log_identity(log_path)
+    clusters = Clusters(state)
 
-    # Count blocks per hook
-    with open(log_path, 'r') as f:
-        blocks = [json.loads(line) for line in f if '"type":"BLOCK"' in line]
-    
-    if not blocks:
+    # Blocks since the checkpoint, streamed from the event log index.
+    seen = 0
+    for offset, event in scan(log_path, offset, projects=projects, actions=["BLOCK"]):
+        clusters.add(block_reason(event), event_hour(event))
+        seen += 1
+
+    save_state(state_path, {"version": STATE_VERSION, "log": log_path, "projects": projects, "inode": inode,
+                            "head": head, "head_len": min(size, HEAD_BYTES), "offset": offset, **clusters.state()})
+
+    ranked = sorted(
+        ((clusters.windows(c), c) for c in clusters.clusters.values()),
+        key=lambda item: (-item[0][TRIGGER_WINDOW], -item[1]["total"], item[1]["id"]),
+    )
+    recurring = [(counts, c) for counts, c in ranked if counts[TRIGGER_WINDOW] >= threshold]
+    if not ranked or not any(counts[TRIGGER_WINDOW] for counts, _ in ranked):
         print("No recent blocks found. System is healthy.")
         return
+    print(f"Scanned {seen} new block(s); {len(clusters.clusters)} reason cluster(s) tracked.")
+    for counts, cluster in ranked[:5]:
+        windows = " ".join(f"{name}={counts[name]}" for name, _ in WINDOWS)
+        print(f"   {windows} total={cluster['total']}  {cluster['reason']}")
+
+    recorded = recorded_pitfalls(pitfalls_path)
+    added = []
+    for counts, cluster in recurring:
+        print(f"Detected recurring violation ({counts[TRIGGER_WINDOW]} times): {cluster['reason']}")
+        digest = key_digest(cluster["key"])
+        if digest in recorded:
+            continue
+        recorded.add(digest)
+        added.append(f"\n- [AUTO-HEAL] Anti-loop rule: Prevents '{cluster['reason']}'. Verified by hook logs.\n")
 
-    reasons = [b.get('details', {}).get('reason', 'Unknown violation') for b in blocks]
-    most_common = Counter(reasons).most_common(1)[0]
-    
-    reason, count = most_common
-    if count >= 2: # Threshold for learning
-        print(f"Detected recurring violation ({count} times): {reason}")
-        
-        os.makedirs(os.path.dirname(pitfalls_path), exist_ok=True)
+    if added:
+        os.makedirs(os.path.dirname(pitfalls_path) or ".", exist_ok=True)
         with open(pitfalls_path, "a") as f:
-            f.write(f"\n- [AUTO-HEAL] Anti-loop rule: Prevents '{reason}'. Verified by hook logs.\n")
-        
+            f.write("".join(added))
         print(f"\033[1;32m✅ Knowledge base updated: {pitfalls_path}\033[0m")
+    elif recurring:
+        print(f"Already recorded in {pitfalls_path}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bestAI self-heal: learn pitfalls from recurring blocks")
+    parser.add_argument("--log", default=None, help="Event log (default: $BESTAI_EVENT_LOG or ~/.cache/bestai/events.jsonl)")
+    parser.add_argument("--pitfalls", default="memory/pitfalls.md", help="Pitfalls file (default: memory/pitfalls.md)")
+    parser.add_argument("--state", default=None, help="Checkpoint state (default: <pitfalls dir>/.self-heal-state.json)")
+    parser.add_argument("--threshold", type=int, default=THRESHOLD,
+                        help=f"Blocks in the {TRIGGER_WINDOW} window that make a pitfall (default: {THRESHOLD})")
+    parser.add_argument("--full", action="store_true", help="Ignore the checkpoint and rescan the whole log")
+    args = parser.parse_args()
+    analyze_and_heal(args.log, args.pitfalls, args.state, max(1, args.threshold), args.full)
+    return 0
+
 
 if __name__ == "__main__":
-    analyze_and_heal()
+    raise SystemExit(main())
@@ -1,63 +1,289 @@
 #!/usr/bin/env python3
-"""Replay agent session JSONL logs for debugging."""
+"""Replay agent session JSONL logs for debugging.
+
+The log is streamed, never loaded whole: playback starts at once and memory
+stays flat however long the session ran. Events are numbered from 1 by
+non-blank line, so ``--from``/``--until`` pick the same events with or
+without an index.
+
+``--index`` maintains ``<log>.replay-idx``, the byte offset of every event,
+so ``--from N`` seeks straight to event N. The sidecar is refreshed
+incrementally while the session log grows and rebuilt when it is replaced;
+once it exists it is used even without ``--index``.
+
+``--summary`` prints per-role event counts and per-tool call counts and
+output sizes, gathered in the same single streaming pass.
+"""
 
 import argparse
+import hashlib
 import json
+import os
+import re
 import sys
 import time
+from array import array
+
+INDEX_SUFFIX = ".replay-idx"
+INDEX_MAGIC = b"bestai-replay-idx 1"
+CHUNK_SIZE = 1 << 20
+HEAD_BYTES = 256
 
 
 def colored(text: str, color_code: str) -> str:
     return f"\033[{color_code}m{text}\033[0m"
 
 
-def replay_session(log_file: str, delay: float = 0.5, max_tool_output: int = 500) -> None:
+def iter_lines(fh, start: int = 0):
+    """(offset, line) for every line from ``start``, including an unterminated tail."""
+    fh.seek(start)
+    pos = start
+    pending = b""
+    while True:
+        chunk = fh.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        data = pending + chunk
+        offset = pos - len(pending)
+        pos += len(chunk)
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            pending = data
+            continue
+        for line in data[:cut].split(b"\n"):
+            yield offset, line
+            offset += len(line) + 1
+        pending = data[cut + 1 :]
+    if pending:
+        yield pos - len(pending), pending
+
+
+def _index_header(st: os.stat_result, size: int, head: bytes) -> bytes:
+    digest = hashlib.sha1(head).hexdigest()
+    return b"%s %d %d %s\n" % (INDEX_MAGIC, st.st_ino, size, digest.encode())
+
+
+def load_index(fh, path: str, refresh: bool):
+    """Event offsets from the sidecar index, refreshed when ``refresh``; None when unusable."""
+    st = os.fstat(fh.fileno())
+    offsets = array("Q")
+    indexed = 0
+    try:
+        with open(path + INDEX_SUFFIX, "rb") as idx:
+            header = idx.readline()
+            parts = header.split()
+            if len(parts) == 5 and b" ".join(parts[:2]) == INDEX_MAGIC:
+                size = int(parts[3])
+                fh.seek(0)
+                if (
+                    int(parts[2]) == st.st_ino
+                    and size <= st.st_size
+                    and header == _index_header(st, size, fh.read(min(size, HEAD_BYTES)))
+                ):
+                    raw = idx.read()
+                    offsets.frombytes(raw[: len(raw) - len(raw) % offsets.itemsize])
+                    indexed = size
+    except (OSError, ValueError):
+        pass
+    if indexed == st.st_size or not refresh:
+        return offsets if indexed else None
+
+    if not indexed:
+        offsets = array("Q")
+    end = indexed
+    for offset, line in iter_lines(fh, indexed):
+        if offset + len(line) >= st.st_size:
+            break  # unterminated tail: the writer may still be mid-line
+        if line.strip():
+            offsets.append(offset)
+        end = offset + len(line) + 1
+    fh.seek(0)
+    header = _index_header(st, end, fh.read(min(end, HEAD_BYTES)))
+    tmp = f"{path}{INDEX_SUFFIX}.{os.getpid()}"
     try:
-        with open(log_file, "r", encoding="utf-8") as fh:
-            lines = fh.readlines()
+        with open(tmp, "wb") as idx:
+            idx.write(header)
+            offsets.tofile(idx)
+        os.replace(tmp, path + INDEX_SUFFIX)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+    return offsets
+
+
+def iter_session(log_file: str, first: int = 1, last: int = 0, use_index: bool = False):
+    """Stream (number, event) pairs for events ``first``..``last`` (0 = to the end)."""
+    try:
+        fh = open(log_file, "rb")
     except FileNotFoundError:
         print(f"File not found: {log_file}", file=sys.stderr)
         raise SystemExit(1)
+    with fh:
+        number, start = 0, 0
+        if first > 1:
+            offsets = load_index(fh, log_file, use_index)
+            if offsets:
+                # A stale index still covers a prefix: seek as far as it reaches.
+                number = min(first - 1, len(offsets) - 1)
+                start = offsets[number]
+        elif use_index:
+            load_index(fh, log_file, True)
+        for _, line in iter_lines(fh, start):
+            if not line.strip():
+                continue
+            number += 1
+            if number < first:
+                continue
+            if last and number > last:
+                break
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                yield number, event
+
 
+def content_text(content) -> str:
+    return content if isinstance(content, str) else ("" if content is None else json.dumps(content))
+
+
+class EventFilter:
+    """``--role``/``--tool-name``/``--grep``; tracks tool_call ids to name TOOL results."""
+
+    def __init__(self, role: str = "", tool_name: str = "", pattern: str = ""):
+        self.role = role.upper()
+        self.tool_name = tool_name
+        self.pattern = re.compile(pattern) if pattern else None
+        self.call_names: dict = {}
+
+    def tool_names(self, event: dict) -> list:
+        role = str(event.get("role", "unknown")).upper()
+        if role == "ASSISTANT":
+            names = []
+            for tool in event.get("tool_calls") or []:
+                name = (tool.get("function") or {}).get("name", "unknown")
+                if tool.get("id"):
+                    self.call_names[tool["id"]] = name
+                names.append(name)
+            return names
+        if role == "TOOL":
+            name = self.call_names.pop(event.get("tool_call_id"), None) or event.get("name")
+            return [name] if name else []
+        return []
+
+    def matches(self, event: dict, names: list) -> bool:
+        if self.role and str(event.get("role", "unknown")).upper() != self.role:
+            return False
+        if self.tool_name and self.tool_name not in names:
+            return False
+        if self.pattern:
+            texts = [content_text(event.get("content", ""))]
+            for tool in event.get("tool_calls") or []:
+                function = tool.get("function") or {}
+                texts.append(str(function.get("name", "")))
+                texts.append(str(function.get("arguments", "")))
+            if not any(self.pattern.search(text) for text in texts):
+                return False
+        return True
+
+
+def print_event(number: int, event: dict, max_tool_output: int) -> None:
+    role = str(event.get("role", "unknown")).upper()
+    content = event.get("content", "")
+    tool_calls = event.get("tool_calls") or []
+
+    if role == "USER":
+        print(colored(f"\n#{number} [USER] ->", "1;32"))
+        print(content)
+    elif role == "ASSISTANT":
+        print(colored(f"\n#{number} [AGENT] ->", "1;35"))
+        if content:
+            print(content)
+        for tool in tool_calls:
+            function = tool.get("function", {})
+            t_name = function.get("name", "unknown")
+            t_args = function.get("arguments", "{}")
+            print(colored(f"  TOOL CALL: {t_name}", "1;33"))
+            print(colored(f"    {t_args}", "33"))
+    elif role == "TOOL":
+        print(colored(f"\n#{number} [SYSTEM] -> Tool Result:", "1;36"))
+        output = content_text(content)
+        if len(output) > max_tool_output:
+            output = output[:max_tool_output] + "... [TRUNCATED]"
+        print(output)
+
+
+def replay_session(
+    log_file: str,
+    delay: float = 0.5,
+    max_tool_output: int = 500,
+    first: int = 1,
+    last: int = 0,
+    event_filter: EventFilter = None,
+    use_index: bool = False,
+) -> None:
+    event_filter = event_filter or EventFilter()
+    events = iter_session(log_file, first, last, use_index)
     print(colored(f"=== REPLAYING SESSION: {log_file} ===", "1;34"))
-    print("Press Ctrl+C to stop playback.\n")
+    if delay > 0:
+        print("Press Ctrl+C to stop playback.\n")
 
     try:
-        for line in lines:
-            try:
-                event = json.loads(line)
-            except json.JSONDecodeError:
+        for number, event in events:
+            if not event_filter.matches(event, event_filter.tool_names(event)):
                 continue
-
-            role = str(event.get("role", "unknown")).upper()
-            content = event.get("content", "")
-            tool_calls = event.get("tool_calls", [])
-
-            if role == "USER":
-                print(colored("\n[USER] ->", "1;32"))
-                print(content)
-            elif role == "ASSISTANT":
-                print(colored("\n[AGENT] ->", "1;35"))
-                if content:
-                    print(content)
-                for tool in tool_calls:
-                    function = tool.get("function", {})
-                    t_name = function.get("name", "unknown")
-                    t_args = function.get("arguments", "{}")
-                    print(colored(f"  TOOL CALL: {t_name}", "1;33"))
-                    print(colored(f"    {t_args}", "33"))
-            elif role == "TOOL":
-                print(colored("\n[SYSTEM] -> Tool Result:", "1;36"))
-                output = str(content)
-                if len(output) > max_tool_output:
-                    output = output[:max_tool_output] + "... [TRUNCATED]"
-                print(output)
-
-            time.sleep(delay)
+            print_event(number, event, max_tool_output)
+            if delay > 0:
+                sys.stdout.flush()
+                time.sleep(delay)
     except KeyboardInterrupt:
         print("\nPlayback interrupted by user.")
 
 
+def summarize_session(
+    log_file: str, first: int = 1, last: int = 0, event_filter: EventFilter = None, use_index: bool = False
+) -> dict:
+    event_filter = event_filter or EventFilter()
+    summary = {"events": 0, "first": 0, "last": 0, "roles": {}, "tools": {}}
+    for number, event in iter_session(log_file, first, last, use_index):
+        names = event_filter.tool_names(event)
+        if not event_filter.matches(event, names):
+            continue
+        summary["events"] += 1
+        summary["first"] = summary["first"] or number
+        summary["last"] = number
+        role = str(event.get("role", "unknown")).upper()
+        summary["roles"][role] = summary["roles"].get(role, 0) + 1
+        for name in names:
+            stats = summary["tools"].setdefault(name, {"calls": 0, "results": 0, "output_bytes": 0, "max_output_bytes": 0})
+            if role == "TOOL":
+                size = len(content_text(event.get("content", "")).encode("utf-8"))
+                stats["results"] += 1
+                stats["output_bytes"] += size
+                stats["max_output_bytes"] = max(stats["max_output_bytes"], size)
+            else:
+                stats["calls"] += 1
+    return summary
+
+
+def print_summary(log_file: str, summary: dict) -> None:
+    print(colored(f"=== SESSION SUMMARY: {log_file} ===", "1;34"))
+    print(f"Events: {summary['events']} (#{summary['first']}..#{summary['last']})")
+    for role, count in sorted(summary["roles"].items()):
+        print(f"  {role:<10} {count}")
+    if summary["tools"]:
+        print(f"\n{'TOOL':<24} {'CALLS':>7} {'RESULTS':>7} {'OUTPUT':>12} {'MAX':>10}")
+        ranked = sorted(summary["tools"].items(), key=lambda item: (-item[1]["output_bytes"], item[0]))
+        for name, stats in ranked:
+            print(
+                f"{name:<24} {stats['calls']:>7} {stats['results']:>7} "
+                f"{stats['output_bytes']:>12} {stats['max_output_bytes']:>10}"
+            )
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Replay agent JSONL session logs.")
     parser.add_argument("log_file", help="Path to the JSONL log file")
@@ -67,15 +293,43 @@ def main() -> int:
         default=0.5,
         help="Delay between events in seconds (default: 0.5)",
     )
+    parser.add_argument("--no-delay", action="store_true", help="Dump events at full I/O speed")
     parser.add_argument(
         "--max-tool-output",
         type=int,
         default=500,
         help="Max characters printed for TOOL output (default: 500)",
     )
+    parser.add_argument("--from", dest="first", type=int, default=1, metavar="N", help="First event number (default: 1)")
+    parser.add_argument("--until", dest="last", type=int, default=0, metavar="N", help="Last event number (default: end)")
+    parser.add_argument("--role", default="", help="Only events with this role (USER, ASSISTANT, TOOL)")
+    parser.add_argument("--tool-name", default="", help="Only calls to / results of this tool")
+    parser.add_argument("--grep", default="", metavar="REGEX", help="Only events whose content or tool call matches")
+    parser.add_argument("--index", action="store_true", help=f"Build/refresh the <log>{INDEX_SUFFIX} offset index")
+    parser.add_argument("--summary", action="store_true", help="Per-role and per-tool totals instead of playback")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
     args = parser.parse_args()
 
-    replay_session(args.log_file, args.speed, args.max_tool_output)
+    try:
+        event_filter = EventFilter(args.role, args.tool_name, args.grep)
+    except re.error as exc:
+        print(f"Invalid --grep pattern: {exc}", file=sys.stderr)
+        return 2
+    first = max(1, args.first)
+    try:
+        if args.summary or args.json:
+            summary = summarize_session(args.log_file, first, args.last, event_filter, args.index)
+            if args.json:
+                print(json.dumps(summary, sort_keys=True))
+            else:
+                print_summary(args.log_file, summary)
+        else:
+            delay = 0.0 if args.no_delay else args.speed
+            replay_session(args.log_file, delay, args.max_tool_output, first, args.last, event_filter, args.index)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # `session-replay.py --no-delay log | head`: stop quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
     return 0
 
 
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Long-lived Smart Context scorer for hooks/preprocess-prompt.sh.
+
+``serve`` listens on a Unix socket and keeps parsed memory files (lines,
+trigram sets, [USER] flags) in memory, revalidating them by stat on each
+request, so a prompt costs one round-trip instead of dozens of forked
+grep/sed/sort pipelines. ``query`` is the thin client the hook calls; it
+exits 3 when no daemon answers so the hook can fall back to bash scoring.
+
+Protocol: one JSON object per line in each direction.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+EXIT_UNAVAILABLE = 3
+MAX_REQUEST_BYTES = 4 << 20
+
+
+def default_socket() -> str:
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.environ.get("BESTAI_SMART_CONTEXT_SOCKET") or os.path.join(
+        runtime, f"bestai-smart-context-{os.getuid()}.sock"
+    )
+
+
+def request(sock_path: str, payload: dict, timeout: float) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(sock_path)
+        sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    return json.loads(b"".join(chunks) or b"{}")
+
+
+# --- server ------------------------------------------------------------------
+
+
+def serve(sock_path: str, idle_timeout: float) -> int:
+    import smart_context
+
+    try:
+        request(sock_path, {"op": "ping"}, timeout=0.5)
+        print(f"smart-context-daemon: already running on {sock_path}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError):
+        pass
+    if os.path.exists(sock_path):
+        os.unlink(sock_path)  # stale socket from a dead daemon
+
+    cache = smart_context.MemoryCache()
+    started = time.time()
+    served = 0
+
+    def handle(message: dict) -> dict:
+        nonlocal served
+        op = message.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "uptime_s": round(time.time() - started, 3), "served": served}
+        if op == "stop":
+            return {"ok": True, "stopping": True}
+        if op != "query":
+            return {"ok": False, "error": f"unknown op: {op}"}
+        settings = smart_context.Settings.from_env(message.get("env") or {})
+        # Resolve the memory dir like the client would; paths stay as given
+        # because `sort -rn` tie-breaks compare them as text.
+        os.chdir(message.get("cwd") or "/")
+        result = smart_context.build_context(
+            message.get("memory_dir", ""),
+            smart_context.encode(message.get("prompt", "")),
+            settings=settings,
+            cache=cache,
+        )
+        served += 1
+        return {
+            "ok": True,
+            "output": smart_context.decode(result.output),
+            "top_score": result.top_score,
+            "scope": result.scope,
+        }
+
+    old_umask = os.umask(0o077)
+    try:
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(sock_path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    if idle_timeout > 0:
+        server.settimeout(idle_timeout)
+
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                break
+            with conn:
+                conn.settimeout(5)
+                try:
+                    buf = b""
+                    while b"\n" not in buf and len(buf) < MAX_REQUEST_BYTES:
+                        data = conn.recv(65536)
+                        if not data:
+                            break
+                        buf += data
+                    message = json.loads(buf.split(b"\n", 1)[0] or b"{}")
+                    reply = handle(message)
+                except Exception as exc:  # keep serving; the client falls back to bash
+                    reply = {"ok": False, "error": str(exc)}
+                try:
+                    conn.sendall(json.dumps(reply).encode("utf-8") + b"\n")
+                except OSError:
+                    pass
+                if reply.get("stopping"):
+                    break
+    finally:
+        server.close()
+        try:
+            os.unlink(sock_path)
+        except OSError:
+            pass
+    return 0
+
+
+def spawn_background(sock_path: str, idle_timeout: float) -> int:
+    cmd = [sys.executable, os.path.abspath(__file__), "serve", "--socket", sock_path, "--idle-timeout", str(idle_timeout)]
+    subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        try:
+            request(sock_path, {"op": "ping"}, timeout=0.5)
+            print(f"smart-context-daemon: listening on {sock_path}")
+            return 0
+        except (OSError, ValueError):
+            time.sleep(0.05)
+    print("smart-context-daemon: daemon did not come up", file=sys.stderr)
+    return 1
+
+
+# --- client ------------------------------------------------------------------
+
+
+def query(sock_path: str, memory_dir: str, timeout: float) -> int:
+    prompt = sys.stdin.buffer.read().decode("utf-8", "surrogateescape")
+    env = {
+        name: os.environ[name]
+        for name in (
+            "SMART_CONTEXT_MAX_FILES",
+            "SMART_CONTEXT_MAX_TOKENS",
+            "SMART_CONTEXT_MIN_SCORE",
+            "SMART_CONTEXT_RANKER",
+            "LC_ALL",
+            "LC_COLLATE",
+            "LANG",
+        )
+        if name in os.environ
+    }
+    payload = {"op": "query", "cwd": os.getcwd(), "memory_dir": memory_dir, "prompt": prompt, "env": env}
+    try:
+        reply = request(sock_path, payload, timeout)
+    except (OSError, ValueError):
+        return EXIT_UNAVAILABLE
+    if not reply.get("ok"):
+        return EXIT_UNAVAILABLE
+    sys.stdout.buffer.write(reply.get("output", "").encode("utf-8", "surrogateescape"))
+    return 0
+
+
+def main() -> int:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--socket", default=default_socket(), help="Unix socket path")
+    parser = argparse.ArgumentParser(description="bestAI Smart Context daemon")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_p = sub.add_parser("serve", parents=[common], help="Run the daemon")
+    serve_p.add_argument("--background", action="store_true", help="Detach and return once listening")
+    serve_p.add_argument("--idle-timeout", type=float, default=0, help="Exit after N idle seconds (default: never)")
+    query_p = sub.add_parser("query", parents=[common], help="Score a prompt read from stdin")
+    query_p.add_argument("--memory-dir", required=True, help="Memory directory to score")
+    query_p.add_argument("--timeout", type=float, default=2.0, help="Socket timeout in seconds")
+    sub.add_parser("status", parents=[common], help="Print daemon status as JSON")
+    sub.add_parser("stop", parents=[common], help="Stop the daemon")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        if args.background:
+            return spawn_background(args.socket, args.idle_timeout)
+        return serve(args.socket, args.idle_timeout)
+    if args.command == "query":
+        return query(args.socket, args.memory_dir, args.timeout)
+    try:
+        reply = request(args.socket, {"op": "ping" if args.command == "status" else "stop"}, timeout=2.0)
+    except (OSError, ValueError):
+        print(f"smart-context-daemon: not running ({args.socket})", file=sys.stderr)
+        return 1
+    print(json.dumps(reply))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -52,8 +52,11 @@ case "$DEPTH" in
 esac
 
 # Build binding context from historical memory/decisions.
-BINDING_CONTEXT=$(bash "$SCRIPT_DIR/task-memory-binding.sh" --task "$TASK" --project-dir "$PROJECT_DIR" --max-files 3 --max-lines 10 2>/dev/null || true)
 BINDING_JSON=$(bash "$SCRIPT_DIR/task-memory-binding.sh" --task "$TASK" --project-dir "$PROJECT_DIR" --max-files 3 --max-lines 10 --json 2>/dev/null || echo '{"bindings":[],"hard_count":0,"soft_count":0}')
+BINDING_CONTEXT=$(printf '%s' "$BINDING_JSON" | jq -r '
+    if (.bindings | length) > 0
+    then "### Binding Context (auto)", (.bindings[] | "[\(.level)] \(.source) — \(.excerpt) (confidence=\(.confidence))")
+    else empty end' 2>/dev/null || true)
 
 mkdir -p "$PROJECT_DIR/.bestai"
 HANDOFF_FILE="$PROJECT_DIR/.bestai/handoff-latest.json"
@@ -0,0 +1,221 @@
+"""SQLite-backed lease locks for swarm agents editing one working tree.
+
+Replaces the jq-rewritten ``.bestai/swarm_locks.json``. Every operation runs
+in one ``BEGIN IMMEDIATE`` transaction on a WAL database. Writers are
+serialised by SQLite itself, so "check the holder, then insert" is an atomic
+compare-and-set even with dozens of agents racing. Readers (``status``) never
+block.
+
+A lock is a lease: it carries ``expires_at`` and lapses on its own unless its
+agent renews it. Re-locking your own path renews it, as swarm-lock.sh did.
+A path ending in ``/`` locks a directory: it conflicts with any lock inside
+it, and any path inside it conflicts with the directory lock. ``acquire``
+and ``release`` take many paths at once, all or nothing.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import posixpath
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+DEFAULT_DB = os.path.join(".bestai", "swarm_locks.db")
+LEGACY_DB = os.path.join(".bestai", "swarm_locks.json")
+DEFAULT_TTL = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS locks (
+    path TEXT PRIMARY KEY,
+    agent TEXT NOT NULL,
+    locked_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS locks_expiry ON locks (expires_at);
+"""
+
+
+class LockError(Exception):
+    """A lock operation was refused; ``conflicts`` lists (path, held_path, agent)."""
+
+    def __init__(self, message: str, conflicts: Optional[list[tuple[str, str, str]]] = None) -> None:
+        super().__init__(message)
+        self.conflicts = conflicts or []
+
+
+def normalize(path: str) -> str:
+    """Repo-relative key: ``./src//a.ts`` -> ``src/a.ts``; directories keep one trailing ``/``."""
+    directory = path.endswith("/")
+    key = posixpath.normpath(path.replace(os.sep, "/")) if path.strip("/") else "."
+    if key.startswith("./"):
+        key = key[2:]
+    if directory or key == ".":
+        return "./" if key == "." else key.rstrip("/") + "/"
+    return key
+
+
+def ancestors(key: str) -> list[str]:
+    """Directory locks that cover ``key``: ``src/a/b.ts`` -> ``./``, ``src/``, ``src/a/``."""
+    parts = key.rstrip("/").split("/")
+    found = ["./"] if key != "./" else []
+    for depth in range(1, len(parts)):
+        found.append("/".join(parts[:depth]) + "/")
+    return found
+
+
+def _inside(directory: str) -> tuple[str, str]:
+    """Key range [low, high) of every path below ``directory``."""
+    if directory == "./":
+        return "", "\U0010ffff"
+    return directory, directory[:-1] + chr(ord("/") + 1)
+
+
+def _iso(ts: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+
+class LockManager:
+    """Lease locks in ``db_path``; one connection per manager."""
+
+    def __init__(self, db_path: str = DEFAULT_DB, ttl: int = DEFAULT_TTL, busy_timeout: float = 30.0) -> None:
+        self.db_path = db_path
+        self.ttl = ttl
+        parent = os.path.dirname(db_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        fresh = not os.path.exists(db_path)
+        self.conn = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+        if fresh:
+            self._import_legacy(os.path.join(parent, os.path.basename(LEGACY_DB)))
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "LockManager":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # IMMEDIATE takes the write lock up front: the checks and the writes see one state.
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _import_legacy(self, legacy_path: str) -> None:
+        """Carry unexpired locks over from swarm-lock.sh's JSON file, once."""
+        try:
+            with open(legacy_path, encoding="utf-8") as fh:
+                legacy = json.load(fh)
+        except (OSError, ValueError):
+            return
+        if not isinstance(legacy, dict):
+            return
+        now = time.time()
+        rows = []
+        for path, entry in legacy.items():
+            if not isinstance(entry, dict) or not isinstance(entry.get("locked_at_unix"), (int, float)):
+                continue
+            expires = entry["locked_at_unix"] + self.ttl
+            if expires > now:
+                rows.append((normalize(path), str(entry.get("agent", "UnknownAgent")), entry["locked_at_unix"], expires))
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO locks VALUES (?, ?, ?, ?)", rows)
+
+    def _conflicts(self, conn: sqlite3.Connection, key: str, agent: str, now: float) -> list[tuple[str, str, str]]:
+        covering = [key] + ancestors(key)
+        marks = ",".join("?" * len(covering))
+        rows = conn.execute(
+            f"SELECT path, agent FROM locks WHERE path IN ({marks}) AND agent != ? AND expires_at > ?",
+            (*covering, agent, now),
+        ).fetchall()
+        if key.endswith("/"):
+            low, high = _inside(key)
+            rows += conn.execute(
+                "SELECT path, agent FROM locks WHERE path >= ? AND path < ? AND path != ? AND agent != ? AND expires_at > ?",
+                (low, high, key, agent, now),
+            ).fetchall()
+        return [(key, held, holder) for held, holder in rows]
+
+    def acquire(self, paths: Iterable[str], agent: str, ttl: Optional[int] = None) -> list[str]:
+        """Lock (or renew) every path for ``agent``, or none; raises LockError listing the holders."""
+        keys = list(dict.fromkeys(normalize(path) for path in paths))
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM locks WHERE expires_at <= ?", (now,))
+            conflicts = [conflict for key in keys for conflict in self._conflicts(conn, key, agent, now)]
+            if conflicts:
+                raise LockError("already locked", conflicts)
+            conn.executemany(
+                "INSERT INTO locks VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET expires_at = excluded.expires_at",
+                [(key, agent, now, expires) for key in keys],
+            )
+        return keys
+
+    def renew(self, paths: Iterable[str], agent: str, ttl: Optional[int] = None) -> list[str]:
+        """Extend ``agent``'s live leases; raises LockError for paths it does not hold."""
+        keys = list(dict.fromkeys(normalize(path) for path in paths))
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._transaction() as conn:
+            missing = []
+            for key in keys:
+                renewed = conn.execute(
+                    "UPDATE locks SET expires_at = ? WHERE path = ? AND agent = ? AND expires_at > ?",
+                    (expires, key, agent, now),
+                )
+                if renewed.rowcount == 0:
+                    missing.append(key)
+            if missing:
+                raise LockError("not held", [(key, key, agent) for key in missing])
+        return keys
+
+    def release(self, paths: Iterable[str], agent: Optional[str] = None) -> list[str]:
+        """Drop the locks on ``paths`` (only ``agent``'s when given); returns the keys released."""
+        keys = list(dict.fromkeys(normalize(path) for path in paths))
+        if not keys:
+            return []
+        now = time.time()
+        with self._transaction() as conn:
+            if agent is not None:
+                foreign = conn.execute(
+                    f"SELECT path, agent FROM locks WHERE path IN ({','.join('?' * len(keys))}) "
+                    "AND agent != ? AND expires_at > ?",
+                    (*keys, agent, now),
+                ).fetchall()
+                if foreign:
+                    raise LockError("held by another agent", [(path, path, holder) for path, holder in foreign])
+            released = [
+                key for key in keys if conn.execute("DELETE FROM locks WHERE path = ?", (key,)).rowcount
+            ]
+        return released
+
+    def status(self) -> dict[str, dict]:
+        """Live locks in swarm_locks.json's shape, plus the lease expiry."""
+        now = time.time()
+        rows = self.conn.execute(
+            "SELECT path, agent, locked_at, expires_at FROM locks WHERE expires_at > ? ORDER BY path", (now,)
+        ).fetchall()
+        return {
+            path: {
+                "agent": agent,
+                "locked_at": _iso(locked_at),
+                "locked_at_unix": int(locked_at),
+                "expires_at_unix": int(expires_at),
+            }
+            for path, agent, locked_at, expires_at in rows
+        }
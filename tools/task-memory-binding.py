@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Build binding context for a task from project history and memory.
+
+A drop-in replacement for the grep/jq pipeline that was task-memory-binding.sh,
+with the same options, text block and ``--json`` object (including
+``hard_count``, ``soft_count``, ``overridden_count`` and
+``dropped_expired_count``). Memory lines are classified once and cached in
+``.bestai/memory-binding-index.json`` (see memory_binding.py).
+
+``--tasks-file`` binds many tasks in one process: one task per line ("-" for
+stdin), one compact JSON object per task on stdout, in input order.
+
+TTLs and overrides come from BESTAI_BINDING_HARD_TTL_DAYS,
+BESTAI_BINDING_SOFT_TTL_DAYS and BESTAI_BINDING_ALLOW_HARD_OVERRIDE=1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from memory_binding import BindingIndex, render_text
+
+
+def _ttl_days(name: str) -> int:
+    raw = os.environ.get(name, "0")
+    return int(raw) if raw.isascii() and raw.isdigit() else 0
+
+
+def _read_tasks(path: str) -> list[str]:
+    if path == "-":
+        return [line.rstrip("\r\n") for line in sys.stdin if line.strip()]
+    with open(path, encoding="utf-8") as fh:
+        return [line.rstrip("\r\n") for line in fh if line.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bind project memory and decisions to a task")
+    parser.add_argument("--task", default="", help="Task description")
+    parser.add_argument("--tasks-file", help="Bind every line of this file ('-': stdin); prints JSON Lines")
+    parser.add_argument("--project-dir", default=".", help="Project directory (default: .)")
+    parser.add_argument("--max-files", type=int, default=3, help="Most-matching files to bind from (default: 3)")
+    parser.add_argument("--max-lines", type=int, default=12, help="Bindings per task (default: 12)")
+    parser.add_argument("--json", action="store_true", help="Print the binding object as JSON")
+    parser.add_argument("--index", help="Line index path (default: <project>/.bestai/memory-binding-index.json)")
+    args = parser.parse_args()
+
+    if not args.task and not args.tasks_file:
+        print(
+            f"Usage: {sys.argv[0]} --task 'description' [--project-dir .] [--max-files N] [--max-lines N] [--json]",
+            file=sys.stderr,
+        )
+        return 1
+    if not os.path.isdir(args.project_dir):
+        print(f"task-memory-binding: {args.project_dir}: No such directory", file=sys.stderr)
+        return 1
+    try:
+        tasks = _read_tasks(args.tasks_file) if args.tasks_file else [args.task]
+    except OSError as exc:
+        print(f"task-memory-binding: {args.tasks_file}: {exc.strerror}", file=sys.stderr)
+        return 1
+
+    index = BindingIndex(args.project_dir, index_path=args.index).refresh()
+    options = {
+        "max_files": args.max_files,
+        "max_lines": args.max_lines,
+        "now": int(time.time()),
+        "hard_ttl_days": _ttl_days("BESTAI_BINDING_HARD_TTL_DAYS"),
+        "soft_ttl_days": _ttl_days("BESTAI_BINDING_SOFT_TTL_DAYS"),
+        "allow_hard_override": os.environ.get("BESTAI_BINDING_ALLOW_HARD_OVERRIDE", "0") == "1",
+    }
+    if args.tasks_file:
+        for task in tasks:
+            print(json.dumps(index.bind(task, **options), ensure_ascii=False, separators=(",", ":")))
+        return 0
+
+    result = index.bind(args.task, **options)
+    if args.json:
+        # Same layout as before: jq -c for an empty result, jq's pretty-printing otherwise.
+        if result["bindings"]:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+        else:
+            print(json.dumps(result, ensure_ascii=False, separators=(",", ":")))
+    else:
+        text = render_text(result)
+        if text:
+            print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
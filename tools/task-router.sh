@@ -86,6 +86,15 @@ read_route_history() {
         return 0
     fi
 
+    # Incremental aggregates (route_stats.py): reads only lines appended since the last route.
+    local history
+    if command -v python3 >/dev/null 2>&1 && [ -f "$_ROUTER_SCRIPT_DIR/route-stats.py" ] \
+        && history=$(python3 "$_ROUTER_SCRIPT_DIR/route-stats.py" --log "$route_file" \
+            --task-norm "$task_norm" --complexity "$complexity" --window "$window" 2>/dev/null); then
+        printf '%s\n' "$history"
+        return 0
+    fi
+
     tail -n "$window" "$route_file" 2>/dev/null | jq -Rsc --arg task_norm "$task_norm" --arg complexity "$complexity" '
         def norm_task:
             ((. // "") | ascii_downcase | gsub("[^a-z0-9]+"; " ") | gsub("^ +| +$"; ""));
@@ -136,6 +145,24 @@ read_event_signal() {
         return 0
     fi
 
+    local counts
+    if command -v python3 >/dev/null 2>&1 && [ -f "$_ROUTER_SCRIPT_DIR/event-log.py" ] \
+        && counts=$(python3 "$_ROUTER_SCRIPT_DIR/event-log.py" --log "$event_file" count --by action \
+            --project "$project_hash_raw" --project "$project_hash_abs" --window "$window" --json 2>/dev/null); then
+        printf '%s' "$counts" | jq -c '
+            (map({key: (.action // ""), value: .count}) | from_entries) as $by
+            | ([.[].count] | add // 0) as $total
+            | (($by.BLOCK // 0) + ($by.OPEN // 0) + ($by.ERROR // 0)) as $block_like
+            | {
+                total: $total,
+                block_like: $block_like,
+                allow_like: ($by.ALLOW // 0),
+                block_pct: (if $total > 0 then ((($block_like * 100) / $total) | floor) else 0 end),
+                open_events: ($by.OPEN // 0),
+                error_events: ($by.ERROR // 0)
+              }' && return 0
+    fi
+
     tail -n "$window" "$event_file" 2>/dev/null | jq -Rsc --arg hash_raw "$project_hash_raw" --arg hash_abs "$project_hash_abs" '
         (split("\n")
          | map(fromjson?)
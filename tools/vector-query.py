@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Query the local bestAI vector store and print the top-k chunks as JSON.
+
+``--batch`` reads one query per stdin line and prints one JSON object per line,
+opening the store and loading the embedding model once for all of them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from embeddings import get_embedding, load_sentence_transformer
+from vector_store import VectorStore, open_store
+
+
+def embed_query(store: VectorStore, text: str) -> list[float]:
+    """Embed ``text`` with the provider the store was built with."""
+    model = None
+    if store.meta.get("provider") == "sentence-transformers":
+        model = load_sentence_transformer(store.meta.get("model", ""))
+        if model is None:
+            raise RuntimeError(
+                "Store was built with sentence-transformers, which is not installed; "
+                "re-index with the hash fallback or install sentence-transformers"
+            )
+    return get_embedding(text, model=model, dims=store.dims)
+
+
+def query_store(
+    store_dir: Path,
+    text: str,
+    top_k: int = 5,
+    path_globs: Sequence[str] = (),
+    min_score: Optional[float] = None,
+    with_content: bool = False,
+    store: Optional[VectorStore] = None,
+) -> dict[str, Any]:
+    started = time.perf_counter()
+    store = store or open_store(store_dir)
+    opened = time.perf_counter()
+    vector = embed_query(store, text)
+    embedded = time.perf_counter()
+    hits = store.query(vector, top_k=top_k, path_globs=path_globs, min_score=min_score)
+    finished = time.perf_counter()
+
+    results = []
+    for index, score in hits:
+        record = store.row(index, with_content=with_content)
+        record["score"] = round(score, 6)
+        results.append(record)
+
+    return {
+        "query": text,
+        "provider": store.meta.get("provider", "hash-fallback"),
+        "rows": len(store),
+        "results": results,
+        "timing_ms": {
+            "open": round((opened - started) * 1000, 3),
+            "embed": round((embedded - opened) * 1000, 3),
+            "search": round((finished - embedded) * 1000, 3),
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="bestAI vector store query")
+    parser.add_argument("query", nargs="?", help="Prompt to search for (default: read stdin)")
+    parser.add_argument("--store", default=".bestai/vector-store", help="Vector store directory")
+    parser.add_argument("-k", "--top-k", type=int, default=5, help="Number of results (default: 5)")
+    parser.add_argument(
+        "--path",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Only score rows whose path matches GLOB (absolute or relative to the indexed dir); repeatable",
+    )
+    parser.add_argument("--min-score", type=float, help="Drop results scoring below this cosine value")
+    parser.add_argument("--with-content", action="store_true", help="Include chunk text in results")
+    parser.add_argument("--batch", action="store_true", help="One query per stdin line; prints JSON Lines")
+    args = parser.parse_args()
+
+    if args.batch:
+        texts = [line.rstrip("\n") for line in sys.stdin if line.strip()]
+    else:
+        texts = [args.query if args.query is not None else sys.stdin.read()]
+        if not texts[0].strip():
+            parser.error("empty query")
+
+    try:
+        store_dir = Path(args.store).resolve()
+        store = open_store(store_dir) if args.batch else None
+        for text in texts:
+            result = query_store(
+                store_dir,
+                text,
+                top_k=max(1, args.top_k),
+                path_globs=args.path,
+                min_score=args.min_score,
+                with_content=args.with_content,
+                store=store,
+            )
+            print(json.dumps(result, ensure_ascii=False))
+    except (FileNotFoundError, RuntimeError, ValueError) as exc:
+        print(f"vector-query: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
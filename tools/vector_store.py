@@ -0,0 +1,379 @@
+"""Binary, memory-mapped vector store shared by the bestAI vector tools.
+
+Layout of a store directory (default ``.bestai/vector-store/``)::
+
+    meta.json       provider/model/dims/dtype, row count, path table and the
+                    per-file manifest (mtime_ns, size, etag, row range)
+    embeddings.bin  row-major little-endian float32/float16 matrix (rows x dims)
+    rows.bin        fixed-width row records (see ROW_FORMAT)
+    content.bin     UTF-8 chunk text addressed by (offset, length) from rows.bin
+
+Opening a store only parses ``meta.json``; the matrix and row table are mapped,
+not copied. NumPy is optional: without it the loader falls back to ``mmap`` +
+``memoryview`` so the store stays readable on a bare Python install.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import heapq
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, Optional, Sequence
+
+STORE_VERSION = 2
+META_FILE = "meta.json"
+EMBEDDINGS_FILE = "embeddings.bin"
+ROWS_FILE = "rows.bin"
+CONTENT_FILE = "content.bin"
+
+# path_id, chunk, content_offset, content_length, start_line, end_line
+ROW_FORMAT = "<IIQIII"
+ROW_SIZE = struct.calcsize(ROW_FORMAT)
+ROW_FIELDS = ("path_id", "chunk", "offset", "length", "start_line", "end_line")
+
+DTYPES = {"float32": ("<f4", 4), "float16": ("<f2", 2)}
+
+
+def load_numpy() -> Optional[Any]:
+    try:
+        import numpy
+    except Exception:
+        return None
+    return numpy
+
+
+def _pack_vector(vector: Sequence[float], dtype: str) -> bytes:
+    if dtype == "float16":
+        return struct.pack(f"<{len(vector)}e", *vector)
+    if hasattr(vector, "astype"):
+        return vector.astype("<f4").tobytes()
+    packed = array("f", vector)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+class VectorStoreWriter:
+    """Stream rows into a fresh store directory and swap it in atomically."""
+
+    def __init__(self, store_dir: Path, dims: int, dtype: str = "float32", meta: Optional[dict] = None):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype} (expected one of {', '.join(DTYPES)})")
+        self.store_dir = Path(store_dir)
+        self.dims = dims
+        self.dtype = dtype
+        self.meta = dict(meta or {})
+        self.paths: list[str] = []
+        self.files: dict[str, dict[str, Any]] = {}
+        self._path_ids: dict[str, int] = {}
+        self._path_rows: dict[str, list[int]] = {}
+        self._rows = 0
+        self._content_offset = 0
+
+        self.store_dir.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_dir = self.store_dir.with_name(f".{self.store_dir.name}.tmp-{os.getpid()}")
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        self._tmp_dir.mkdir()
+        self._embeddings: BinaryIO = open(self._tmp_dir / EMBEDDINGS_FILE, "wb")
+        self._row_table: BinaryIO = open(self._tmp_dir / ROWS_FILE, "wb")
+        self._content: BinaryIO = open(self._tmp_dir / CONTENT_FILE, "wb")
+
+    def __enter__(self) -> "VectorStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def path_id(self, path: str) -> int:
+        if path not in self._path_ids:
+            self._path_ids[path] = len(self.paths)
+            self.paths.append(path)
+            self._path_rows[path] = [self._rows, 0]
+        return self._path_ids[path]
+
+    def _append_row(self, path: str, chunk: int, encoded: bytes, start_line: int, end_line: int) -> None:
+        path_id = self.path_id(path)
+        self._row_table.write(
+            struct.pack(ROW_FORMAT, path_id, chunk, self._content_offset, len(encoded), start_line, end_line)
+        )
+        self._content.write(encoded)
+        self._content_offset += len(encoded)
+        self._path_rows[path][1] += 1
+        self._rows += 1
+
+    def add(
+        self,
+        path: str,
+        chunk: int,
+        content: str,
+        embedding: Sequence[float],
+        start_line: int = 0,
+        end_line: int = 0,
+    ) -> int:
+        if len(embedding) != self.dims:
+            raise ValueError(f"Embedding has {len(embedding)} dims, store expects {self.dims}")
+        self._embeddings.write(_pack_vector(embedding, self.dtype))
+        self._append_row(path, chunk, content.encode("utf-8"), start_line, end_line)
+        return self._rows - 1
+
+    def copy_rows(self, store: "VectorStore", path: str, first: int, count: int) -> None:
+        """Carry ``count`` rows starting at ``first`` over from an older store verbatim."""
+        if (store.dims, store.dtype) != (self.dims, self.dtype):
+            raise ValueError("Cannot copy rows between stores with different dims/dtype")
+        self._embeddings.write(store.embedding_bytes(first, count))
+        for index in range(first, first + count):
+            _path_id, chunk, _offset, _length, start_line, end_line = store._row_record(index)
+            self._append_row(path, chunk, store.content_bytes(index), start_line, end_line)
+
+    def commit(self) -> Path:
+        for handle in (self._embeddings, self._row_table, self._content):
+            handle.close()
+        meta = {
+            **self.meta,
+            "version": STORE_VERSION,
+            "dims": self.dims,
+            "dtype": self.dtype,
+            "rows": self._rows,
+            "paths": self.paths,
+            "files": {
+                path: {**self.files.get(path, {}), "rows": self._path_rows[path]}
+                for path in self.paths
+            },
+        }
+        (self._tmp_dir / META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+        old_dir = self.store_dir.with_name(f".{self.store_dir.name}.old-{os.getpid()}")
+        if self.store_dir.exists():
+            os.replace(self.store_dir, old_dir)
+        os.replace(self._tmp_dir, self.store_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return self.store_dir
+
+    def abort(self) -> None:
+        for handle in (self._embeddings, self._row_table, self._content):
+            handle.close()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+def _map_file(path: Path) -> Optional[mmap.mmap]:
+    if path.stat().st_size == 0:
+        return None
+    with open(path, "rb") as fh:
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class VectorStore:
+    """Read-only view over a store directory. Nothing is copied on open."""
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+        meta_path = self.store_dir / META_FILE
+        if not meta_path.is_file():
+            raise FileNotFoundError(f"Vector store not found: {self.store_dir}")
+        self.meta: dict[str, Any] = json.loads(meta_path.read_text(encoding="utf-8"))
+        if self.meta.get("version") != STORE_VERSION:
+            raise ValueError(
+                f"Unsupported vector store version: {self.meta.get('version')} "
+                f"(expected {STORE_VERSION}); re-run vectorize-codebase.py"
+            )
+
+        self.dims: int = int(self.meta["dims"])
+        self.dtype: str = self.meta["dtype"]
+        self.paths: list[str] = self.meta.get("paths", [])
+        self.files: dict[str, dict[str, Any]] = self.meta.get("files", {})
+        self._count: int = int(self.meta["rows"])
+        self._np = load_numpy()
+        self._content_map = _map_file(self.store_dir / CONTENT_FILE)
+
+        if self._np is not None:
+            np = self._np
+            shape = (self._count, self.dims)
+            if self._count:
+                self.embeddings = np.memmap(
+                    self.store_dir / EMBEDDINGS_FILE, dtype=DTYPES[self.dtype][0], mode="r", shape=shape
+                )
+                self.rows = np.memmap(
+                    self.store_dir / ROWS_FILE,
+                    dtype=np.dtype({"names": ROW_FIELDS, "formats": ["<u4", "<u4", "<u8", "<u4", "<u4", "<u4"]}),
+                    mode="r",
+                    shape=(self._count,),
+                )
+            else:
+                self.embeddings = np.zeros(shape, dtype=DTYPES[self.dtype][0])
+                self.rows = None
+        else:
+            if self.dtype != "float32":
+                raise RuntimeError("float16 vector stores require numpy")
+            self._embedding_map = _map_file(self.store_dir / EMBEDDINGS_FILE)
+            self._row_map = _map_file(self.store_dir / ROWS_FILE)
+            self.embeddings = memoryview(self._embedding_map).cast("f") if self._embedding_map else memoryview(b"").cast("f")
+            self.rows = self._row_map
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _row_record(self, index: int) -> tuple[int, ...]:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        if self._np is not None:
+            rec = self.rows[index]
+            return tuple(int(rec[field]) for field in ROW_FIELDS)
+        return struct.unpack_from(ROW_FORMAT, self._row_map, index * ROW_SIZE)
+
+    def vector(self, index: int) -> Sequence[float]:
+        if self._np is not None:
+            return self.embeddings[index]
+        return self.embeddings[index * self.dims : (index + 1) * self.dims]
+
+    def embedding_bytes(self, first: int, count: int) -> bytes:
+        if self._np is not None:
+            return self.embeddings[first : first + count].tobytes()
+        return self.embeddings[first * self.dims : (first + count) * self.dims].tobytes()
+
+    def content_bytes(self, index: int) -> bytes:
+        _path_id, _chunk, offset, length, _start, _end = self._row_record(index)
+        if not length or self._content_map is None:
+            return b""
+        return self._content_map[offset : offset + length]
+
+    def content(self, index: int) -> str:
+        return self.content_bytes(index).decode("utf-8", errors="replace")
+
+    def row(self, index: int, with_content: bool = True) -> dict[str, Any]:
+        path_id, chunk, _offset, _length, start_line, end_line = self._row_record(index)
+        record: dict[str, Any] = {
+            "path": self.paths[path_id],
+            "chunk": chunk,
+            "start_line": start_line,
+            "end_line": end_line,
+        }
+        if with_content:
+            record["content"] = self.content(index)
+        return record
+
+    def relative_path(self, path: str) -> str:
+        root = self.meta.get("root")
+        if root and path.startswith(root.rstrip("/") + "/"):
+            return path[len(root.rstrip("/")) + 1 :]
+        return path
+
+    def path_ids_matching(self, globs: Sequence[str]) -> list[int]:
+        """Path ids whose absolute or root-relative path matches any glob."""
+        return [
+            path_id
+            for path_id, path in enumerate(self.paths)
+            if any(
+                fnmatch.fnmatchcase(path, pattern) or fnmatch.fnmatchcase(self.relative_path(path), pattern)
+                for pattern in globs
+            )
+        ]
+
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int = 5,
+        path_globs: Sequence[str] = (),
+        min_score: Optional[float] = None,
+    ) -> list[tuple[int, float]]:
+        """Return ``(row_index, cosine_score)`` pairs, best first.
+
+        Stored rows and query vectors are L2-normalized, so the dot product is the
+        cosine score. With NumPy this is one matrix-vector product over the mapped
+        matrix plus an ``argpartition`` top-k; without it, a streaming heap.
+        """
+        if len(vector) != self.dims:
+            raise ValueError(f"Query has {len(vector)} dims, store expects {self.dims}")
+        if top_k <= 0 or not self._count:
+            return []
+
+        allowed: Optional[list[int]] = self.path_ids_matching(path_globs) if path_globs else None
+        if allowed is not None and not allowed:
+            return []
+
+        if self._np is None:
+            return self._query_python(vector, top_k, allowed, min_score)
+
+        np = self._np
+        query_vec = np.asarray(vector, dtype=np.float32)
+        if allowed is None:
+            candidates = None
+            scores = self.embeddings @ query_vec
+        else:
+            candidates = np.flatnonzero(np.isin(self.rows["path_id"], np.asarray(allowed, dtype=np.uint32)))
+            if not candidates.size:
+                return []
+            scores = self.embeddings[candidates] @ query_vec
+        scores = scores.astype(np.float32, copy=False)
+
+        if min_score is not None:
+            keep = np.flatnonzero(scores >= min_score)
+            scores = scores[keep]
+            candidates = keep if candidates is None else candidates[keep]
+        if not scores.size:
+            return []
+
+        k = min(top_k, scores.size)
+        best = np.argpartition(-scores, k - 1)[:k] if k < scores.size else np.arange(scores.size)
+        # Highest score first; ties resolve to the lower row index.
+        best = best[np.lexsort((best, -scores[best]))]
+        indices = best if candidates is None else candidates[best]
+        return [(int(index), float(score)) for index, score in zip(indices, scores[best])]
+
+    def _query_python(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        allowed: Optional[list[int]],
+        min_score: Optional[float],
+    ) -> list[tuple[int, float]]:
+        allowed_set = set(allowed) if allowed is not None else None
+        dims = self.dims
+
+        def scored() -> Iterator[tuple[float, int]]:
+            for index in range(self._count):
+                if allowed_set is not None and self._row_record(index)[0] not in allowed_set:
+                    continue
+                row = self.embeddings[index * dims : (index + 1) * dims]
+                score = sum(a * b for a, b in zip(row, vector))
+                if min_score is None or score >= min_score:
+                    yield score, -index
+
+        return [(-neg_index, score) for score, neg_index in heapq.nlargest(top_k, scored())]
+
+
+def open_store(store_dir: Path) -> VectorStore:
+    return VectorStore(store_dir)
+
+
+def export_json(store: VectorStore, output_file: Path) -> Path:
+    """Write the legacy ``vector-store.json`` layout from a binary store."""
+    provider = store.meta.get("provider", "hash-fallback")
+    rows: list[dict[str, Any]] = []
+    for index in range(len(store)):
+        record = store.row(index)
+        record["embedding"] = [float(v) for v in store.vector(index)]
+        record["provider"] = provider
+        rows.append(record)
+
+    meta = {
+        key: store.meta[key]
+        for key in ("provider", "model", "chunker", "chunk_size", "max_tokens", "overlap", "dims", "indexed_files")
+        if key in store.meta
+    }
+    meta["indexed_chunks"] = len(rows)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_text(json.dumps({"meta": meta, "rows": rows}, ensure_ascii=False), encoding="utf-8")
+    return output_file
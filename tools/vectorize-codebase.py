@@ -1,131 +1,227 @@
 #!/usr/bin/env python3
-"""Vectorize markdown/python files into a local JSON vector store."""
+"""Vectorize markdown/python files into a local binary vector store."""
 
 from __future__ import annotations
 
 import argparse
 import hashlib
-import json
 import os
+import time
 from pathlib import Path
 from typing import Any, Iterable, Optional
 
+from chunker import Chunk, chunk_file, chunk_fixed
+from embeddings import BatchEmbedder, load_sentence_transformer
+from vector_store import DTYPES, VectorStore, VectorStoreWriter, export_json, open_store
 
-def cosine_ready_hash_embedding(text: str, dims: int = 384) -> list[float]:
-    """Deterministic fallback embedding (no external model dependency)."""
-    vec = [0.0] * dims
-    words = text.lower().split()
-    if not words:
-        return vec
 
-    for token in words:
-        digest = hashlib.sha256(token.encode("utf-8")).digest()
-        idx = int.from_bytes(digest[:4], "big") % dims
-        sign = -1.0 if digest[4] % 2 else 1.0
-        vec[idx] += sign
-
-    # L2 normalize to make cosine similarity meaningful.
-    norm = sum(v * v for v in vec) ** 0.5
-    if norm > 0:
-        vec = [v / norm for v in vec]
-    return vec
+def iter_files(directory: Path) -> Iterable[Path]:
+    for suffix in ("*.md", "*.py"):
+        yield from directory.rglob(suffix)
 
 
-def load_sentence_transformer(model_name: str) -> Optional[Any]:
-    try:
-        from sentence_transformers import SentenceTransformer
-    except Exception:
-        return None
-    return SentenceTransformer(model_name)
+def iter_source_files(directory: Path) -> Iterable[Path]:
+    for path in sorted(iter_files(directory)):
+        if not path.is_file():
+            continue
+        if any(marker in path.parts for marker in (".git", ".bestai", ".claude", "__pycache__")):
+            continue
+        yield path
 
 
-def get_embedding(text: str, model: Optional[Any], dims: int = 384) -> list[float]:
-    if model is not None:
-        result = model.encode(text, normalize_embeddings=True)
-        return [float(v) for v in result]
-    return cosine_ready_hash_embedding(text, dims=dims)
+def read_source(raw: bytes) -> str:
+    # Same text Path.read_text(errors="ignore") yields, from bytes we already hashed.
+    return raw.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
 
 
-def iter_files(directory: Path) -> Iterable[Path]:
-    for suffix in ("*.md", "*.py"):
-        yield from directory.rglob(suffix)
+def open_previous_store(output_dir: Path, meta: dict[str, Any], dims: int, dtype: str) -> Optional[VectorStore]:
+    """Return the existing store when its rows can be reused for this run."""
+    try:
+        store = open_store(output_dir)
+    except (OSError, ValueError, RuntimeError):
+        return None
+    expected = {**meta, "dims": dims, "dtype": dtype}
+    if any(store.meta.get(key) != value for key, value in expected.items()):
+        print(f"Existing store at {output_dir} was built with different settings; re-indexing everything")
+        return None
+    return store
 
 
 def index_files(
     directory: Path,
-    output_file: Path,
+    output_dir: Path,
     chunk_size: int,
     model_name: str,
     dims: int,
+    dtype: str = "float32",
+    export_json_file: Optional[Path] = None,
+    incremental: bool = False,
+    batch_size: int = 64,
+    workers: int = 1,
+    chunker: str = "structure",
+    max_tokens: int = 256,
+    overlap: int = 32,
 ) -> int:
     model = load_sentence_transformer(model_name)
     provider = "sentence-transformers" if model is not None else "hash-fallback"
-    index: list[dict[str, Any]] = []
+    if model is not None:
+        # The model decides the matrix width; --dims only sizes the fallback.
+        dims = int(model.get_sentence_embedding_dimension() or dims)
+    meta = {
+        "provider": provider,
+        "model": model_name if model is not None else "hash-fallback",
+        "chunker": chunker,
+        "chunk_size": chunk_size,
+        "max_tokens": max_tokens,
+        "overlap": overlap,
+        "root": str(directory),
+    }
+    previous = open_previous_store(output_dir, meta, dims, dtype) if incremental else None
+    previous_files = previous.files if previous is not None else {}
     indexed_files = 0
-
-    for path in sorted(iter_files(directory)):
-        if not path.is_file():
-            continue
-        if any(marker in path.parts for marker in (".git", ".bestai", ".claude", "__pycache__")):
-            continue
-
-        content = path.read_text(encoding="utf-8", errors="ignore")
-        chunks = [content[i : i + chunk_size] for i in range(0, len(content), chunk_size)] or [""]
-        for i, chunk in enumerate(chunks):
-            index.append(
-                {
-                    "path": str(path),
-                    "chunk": i,
-                    "content": chunk,
-                    "embedding": get_embedding(chunk, model=model, dims=dims),
-                    "provider": provider,
-                }
-            )
-        indexed_files += 1
-
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-    output_file.write_text(
-        json.dumps(
-            {
-                "meta": {
-                    "provider": provider,
-                    "model": model_name if model is not None else "hash-fallback",
-                    "chunk_size": chunk_size,
-                    "dims": dims,
-                    "indexed_files": indexed_files,
-                    "indexed_chunks": len(index),
-                },
-                "rows": index,
-            },
-            ensure_ascii=False,
-        ),
-        encoding="utf-8",
-    )
-    print(f"Indexed {indexed_files} files into {output_file} ({provider})")
+    reused_files = 0
+
+    pending: list[tuple[str, int, Chunk]] = []
+    embedded_chunks = 0
+    embed_seconds = 0.0
+
+    with VectorStoreWriter(output_dir, dims=dims, dtype=dtype, meta=meta) as writer, BatchEmbedder(
+        model, dims=dims, batch_size=batch_size, workers=workers
+    ) as embedder:
+
+        def flush() -> None:
+            nonlocal embedded_chunks, embed_seconds
+            if not pending:
+                return
+            started = time.perf_counter()
+            vectors = embedder.embed([chunk.text for _key, _index, chunk in pending])
+            embed_seconds += time.perf_counter() - started
+            for (key, index, chunk), vector in zip(pending, vectors):
+                writer.add(key, index, chunk.text, vector, chunk.start_line, chunk.end_line)
+            embedded_chunks += len(pending)
+            pending.clear()
+
+        for path in iter_source_files(directory):
+            key = str(path)
+            stat = path.stat()
+            entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+            cached = previous_files.get(key)
+            raw: Optional[bytes] = None
+            if cached is not None and (cached.get("mtime_ns"), cached.get("size")) != (stat.st_mtime_ns, stat.st_size):
+                # Touched but possibly unchanged: fall back to the content hash.
+                raw = path.read_bytes()
+                if hashlib.md5(raw).hexdigest() != cached.get("etag"):
+                    cached = None
+
+            if cached is not None:
+                # Rows of one file must stay contiguous, so drain the batch first.
+                flush()
+                first, count = cached["rows"]
+                writer.copy_rows(previous, key, first, count)
+                writer.files[key] = {**entry, "etag": cached["etag"]}
+                indexed_files += 1
+                reused_files += 1
+                continue
+
+            if raw is None:
+                raw = path.read_bytes()
+            writer.files[key] = {**entry, "etag": hashlib.md5(raw).hexdigest()}
+            content = read_source(raw)
+            if chunker == "fixed":
+                chunks = chunk_fixed(content, chunk_size)
+            else:
+                chunks = chunk_file(path, content, max_tokens=max_tokens, overlap=overlap)
+            pending.extend((key, i, chunk) for i, chunk in enumerate(chunks))
+            if len(pending) >= embedder.batch_size:
+                flush()
+            indexed_files += 1
+        flush()
+        writer.meta["indexed_files"] = indexed_files
+
+    print(f"Indexed {indexed_files} files into {output_dir} ({provider})")
+    if embedded_chunks:
+        rate = embedded_chunks / embed_seconds if embed_seconds > 0 else float("inf")
+        print(
+            f"Embedded {embedded_chunks} chunks in {embed_seconds:.2f}s "
+            f"({rate:.1f} chunks/sec, batch={batch_size}, workers={workers})"
+        )
+    if previous is not None:
+        removed_files = len(set(previous_files) - set(writer.files))
+        print(
+            f"Incremental: {reused_files} unchanged, "
+            f"{indexed_files - reused_files} re-embedded, {removed_files} removed"
+        )
+    if export_json_file is not None:
+        export_json(open_store(output_dir), export_json_file)
+        print(f"Exported JSON vector store to {export_json_file}")
     return indexed_files
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="bestAI local vectorization tool")
     parser.add_argument("--dir", default=".", help="Directory to index")
-    parser.add_argument("--out", default=".bestai/vector-store.json", help="Output JSON file")
-    parser.add_argument("--chunk-size", type=int, default=1000, help="Chunk size in characters")
+    parser.add_argument("--out", default=".bestai/vector-store", help="Output store directory")
+    parser.add_argument(
+        "--chunker",
+        choices=("structure", "fixed"),
+        default="structure",
+        help="structure: split .py by AST node and .md by heading; fixed: --chunk-size slices",
+    )
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Chunk size in characters (fixed chunker)")
+    parser.add_argument("--max-tokens", type=int, default=256, help="Token budget per chunk (default: 256)")
+    parser.add_argument(
+        "--overlap",
+        type=int,
+        default=32,
+        help="Tokens repeated across cuts inside an oversized unit (default: 32)",
+    )
     parser.add_argument(
         "--model",
         default="sentence-transformers/all-MiniLM-L6-v2",
         help="Sentence-transformers model name",
     )
     parser.add_argument("--dims", type=int, default=384, help="Fallback embedding size")
+    parser.add_argument(
+        "--dtype",
+        choices=sorted(DTYPES),
+        default="float32",
+        help="Embedding matrix precision (default: float32)",
+    )
+    parser.add_argument(
+        "--export-json",
+        metavar="PATH",
+        help="Also export the legacy JSON layout (e.g. .bestai/vector-store.json)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Re-embed only files whose mtime/size/hash changed since the last run",
+    )
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding call (default: 64)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes for the hash fallback provider (0 = one per CPU, default: 1)",
+    )
     args = parser.parse_args()
 
     directory = Path(args.dir).resolve()
-    output_file = Path(args.out).resolve()
+    output_dir = Path(args.out).resolve()
     index_files(
         directory=directory,
-        output_file=output_file,
+        output_dir=output_dir,
         chunk_size=max(100, args.chunk_size),
         model_name=args.model,
         dims=max(32, args.dims),
+        dtype=args.dtype,
+        export_json_file=Path(args.export_json).resolve() if args.export_json else None,
+        incremental=args.incremental,
+        batch_size=max(1, args.batch_size),
+        workers=args.workers if args.workers > 0 else (os.cpu_count() or 1),
+        chunker=args.chunker,
+        max_tokens=max(16, args.max_tokens),
+        overlap=max(0, args.overlap),
     )
     return 0
 